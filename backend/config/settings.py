@@ -28,8 +28,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'sklad.metrics.MetricsMiddleware',
+    'sklad.db_routing.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'sklad.staticfiles.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -42,6 +44,7 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'config.urls'
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
 
 TEMPLATES = [
     {
@@ -66,8 +69,15 @@ if USE_SQLITE:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            # IMMEDIATE: транзакции сразу берут блокировку записи и ждут её (timeout),
+            # а не падают с «database is locked» при параллельных заказах.
+            'OPTIONS': {'timeout': 20, 'transaction_mode': 'IMMEDIATE'},
         }
     }
+    # Копия базы для чтения (локальная проверка реплики): manage.py sync_sqlite_replica
+    _replica_path = os.environ.get('SQLITE_REPLICA_PATH', '').strip()
+    if _replica_path:
+        DATABASES['replica'] = dict(DATABASES['default'], NAME=_replica_path)
 else:
     DATABASES = {
         'default': {
@@ -79,6 +89,30 @@ else:
             'PORT': os.environ.get('POSTGRES_PORT', '5432'),
         }
     }
+    # Реплика только для чтения (потоковая репликация), те же база и пользователь
+    _replica_host = os.environ.get('POSTGRES_REPLICA_HOST', '').strip()
+    if _replica_host:
+        DATABASES['replica'] = dict(
+            DATABASES['default'],
+            HOST=_replica_host,
+            PORT=os.environ.get('POSTGRES_REPLICA_PORT', DATABASES['default']['PORT']),
+        )
+
+if 'replica' in DATABASES:
+    # В тестах реплика — то же соединение, что и default
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+# Чтения безопасных запросов к этим view идут на реплику (sklad/db_routing.py), если она задана
+DATABASE_ROUTERS = ['sklad.db_routing.ReplicaRouter']
+_replica_views = os.environ.get('REPLICA_VIEWS', '').strip()
+REPLICA_VIEWS = frozenset(
+    [v.strip() for v in _replica_views.split(',') if v.strip()] if _replica_views else [
+        'public-items', 'public-item-detail', 'item-list', 'supply-list', 'order-list',
+        'export', 'stock-at', 'analytics-sales',
+    ]
+)
+# После записи клиент читает из основной базы столько секунд (запас на отставание реплики)
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', '5'))
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -99,6 +133,48 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Номера поставок: >1 — процесс заранее берёт блок номеров (меньше ожидания на счётчике, возможны пропуски)
+SUPPLY_NUMBER_BLOCK_SIZE = int(os.environ.get('SUPPLY_NUMBER_BLOCK_SIZE', '1'))
+
+# Кеш ответов публичного каталога (секунды); ключ включает версию каталога цеха
+CATALOG_CACHE_TIMEOUT = int(os.environ.get('CATALOG_CACHE_TIMEOUT', '300'))
+
+# LRU-кеш штрихкодов в памяти процесса: число записей и время жизни (секунды)
+BARCODE_CACHE_SIZE = int(os.environ.get('BARCODE_CACHE_SIZE', '10000'))
+BARCODE_CACHE_TTL = int(os.environ.get('BARCODE_CACHE_TTL', '60'))
+
+# Дельта-синхронизация: перекрытие окна (сек.) и порог изменений, после которого клиент перезагружает всё
+SYNC_OVERLAP_SECONDS = int(os.environ.get('SYNC_OVERLAP_SECONDS', '30'))
+SYNC_MAX_CHANGES = int(os.environ.get('SYNC_MAX_CHANGES', '5000'))
+# Сколько дней хранить журнал изменений (чистит manage.py prune_change_log); токен старше — reset
+SYNC_LOG_RETENTION_DAYS = int(os.environ.get('SYNC_LOG_RETENTION_DAYS', '30'))
+
+# Импорт каталога: строк в порции (проверка и запись порциями)
+IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', '2000'))
+
+# Метрики запросов (латентность, SQL, размер ответа) в памяти процесса; выдача — /api/metrics/ для staff
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+
+# Рекомендации дозаказа (manage.py compute_reorder): окно истории спроса, период полураспада веса дня,
+# срок поставки, на сколько дней брать запас сверх срока поставки, z-квантиль уровня сервиса (1.65 ≈ 95%)
+REORDER_HISTORY_DAYS = int(os.environ.get('REORDER_HISTORY_DAYS', '90'))
+REORDER_HALF_LIFE_DAYS = int(os.environ.get('REORDER_HALF_LIFE_DAYS', '28'))
+REORDER_LEAD_TIME_DAYS = int(os.environ.get('REORDER_LEAD_TIME_DAYS', '14'))
+REORDER_COVER_DAYS = int(os.environ.get('REORDER_COVER_DAYS', '14'))
+REORDER_SERVICE_Z = float(os.environ.get('REORDER_SERVICE_Z', '1.65'))
+
+# Сколько часов хранить ответы по Idempotency-Key (удаляет manage.py purge_idempotency_keys)
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.environ.get('IDEMPOTENCY_KEY_TTL_HOURS', '24'))
+
+# Очередь фоновых задач (manage.py run_worker): попыток до статуса dead, пауза перед повтором
+# (удваивается с каждой попыткой, не больше max), через сколько секунд running-задача считается зависшей,
+# как часто воркер проверяет очередь
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '5'))
+JOB_RETRY_BASE_SECONDS = int(os.environ.get('JOB_RETRY_BASE_SECONDS', '10'))
+JOB_RETRY_MAX_SECONDS = int(os.environ.get('JOB_RETRY_MAX_SECONDS', '3600'))
+JOB_TIMEOUT_SECONDS = int(os.environ.get('JOB_TIMEOUT_SECONDS', '600'))
+JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS', '1'))
+
 # CORS: на продакшене задайте CORS_ALLOWED_ORIGINS через запятую (например https://example.com,https://shop.example.com)
 _cors_origins = os.environ.get('CORS_ALLOWED_ORIGINS', '').strip()
 if _cors_origins:
@@ -110,7 +186,7 @@ else:
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'sklad.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -141,4 +217,8 @@ from datetime import timedelta
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=30),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=90),
+    'TOKEN_REFRESH_SERIALIZER': 'sklad.authentication.WorkshopTokenRefreshSerializer',
 }
+
+# Кеш пользователя и его цеха в CachedJWTAuthentication (секунды)
+AUTH_USER_CACHE_TTL = int(os.environ.get('AUTH_USER_CACHE_TTL', '60'))
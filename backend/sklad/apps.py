@@ -5,3 +5,6 @@ class SkladConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'sklad'
     verbose_name = 'Склад'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -4,15 +4,15 @@ from rest_framework import status
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
+from .authentication import tokens_for_user
 from .serializers import WorkshopSerializer
 from .services import get_workshop_for_user
 
 
 @extend_schema(
     summary='Вход',
-    description='Тело: username, password. Возвращает access, refresh (JWT), user (id, username), workshop (id, name). Дальнейшие запросы: заголовок Authorization: Bearer <access>.',
+    description='Тело: username, password. Возвращает access, refresh (JWT, с claim workshop_id), user (id, username), workshop (id, name). Дальнейшие запросы: заголовок Authorization: Bearer <access>.',
     tags=['Авторизация'],
 )
 class LoginView(APIView):
@@ -32,7 +32,7 @@ class LoginView(APIView):
                 {'detail': 'Неверный логин или пароль'},
                 status=status.HTTP_401_UNAUTHORIZED
             )
-        refresh = RefreshToken.for_user(user)
+        refresh = tokens_for_user(user)
         workshop = get_workshop_for_user(user)
         return Response({
             'access': str(refresh.access_token),
@@ -0,0 +1,88 @@
+"""
+JWT с цехом в claims и кешем пользователя.
+
+Токены несут claim workshop_id (выставляется при входе и перечитывается при refresh) —
+клиент знает свой цех без лишнего запроса. На сервере пользователь вместе с привязкой
+к цеху кешируется на AUTH_USER_CACHE_TTL секунд, и обычный запрос к API не делает
+SQL-запросов на аутентификацию и поиск цеха. Источником истины остаётся привязка,
+а не claim: access-токен живёт 30 дней, а переназначение цеха в админке должно
+вступать в силу сразу (в этом процессе) или в пределах TTL (в остальных).
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .services import get_workshop_for_user
+
+WORKSHOP_CLAIM = 'workshop_id'
+
+
+def _workshop_claim(workshop):
+    return str(workshop.pk) if workshop else None
+
+
+def tokens_for_user(user) -> RefreshToken:
+    """Refresh-токен (и производный access) с цехом пользователя в claims."""
+    refresh = RefreshToken.for_user(user)
+    refresh[WORKSHOP_CLAIM] = _workshop_claim(get_workshop_for_user(user))
+    return refresh
+
+
+def _user_cache_key(user_id):
+    return f'sklad:auth-user:{user_id}'
+
+
+def forget_user(user_id) -> None:
+    """Сбросить закешированного пользователя (смена привязки, пароля, активности)."""
+    cache.delete(_user_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication с кешем пользователя и его цеха."""
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            return super().get_user(validated_token)
+
+        key = _user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = (
+                get_user_model().objects
+                .select_related('workshop_assignment__workshop')
+                .filter(**{api_settings.USER_ID_FIELD: user_id})
+                .first()
+            )
+            if user is None:
+                raise AuthenticationFailed('Пользователь не найден', code='user_not_found')
+            # Привязка (или её отсутствие) попадает в кеш вместе с пользователем
+            get_workshop_for_user(user)
+            cache.set(key, user, getattr(settings, 'AUTH_USER_CACHE_TTL', 60))
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed('Пользователь неактивен', code='user_inactive')
+        return user
+
+
+class WorkshopTokenRefreshSerializer(TokenRefreshSerializer):
+    """Обновление токена с актуальным цехом пользователя в claims."""
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        refresh = self.token_class(data.get('refresh', attrs['refresh']))
+        user = get_user_model().objects.filter(
+            **{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]}
+        ).first()
+        refresh[WORKSHOP_CLAIM] = _workshop_claim(get_workshop_for_user(user) if user else None)
+        data['access'] = str(refresh.access_token)
+        if 'refresh' in data:
+            data['refresh'] = str(refresh)
+        return data
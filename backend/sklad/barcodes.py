@@ -0,0 +1,105 @@
+"""
+Поиск размеров по штрихкоду с LRU-кешем в памяти процесса.
+
+Кеш: (цех, штрихкод) → (item_id, size_label). При изменении размеров цеха
+поколение цеха увеличивается, и старые записи становятся недостижимы. Другие
+процессы увидят изменение не позже чем через BARCODE_CACHE_TTL секунд.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .models import SizeQuantity
+
+
+class BarcodeCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def _key(self, workshop_id, barcode):
+        return workshop_id, self._generations.get(workshop_id, 0), barcode
+
+    def get(self, workshop_id, barcode):
+        with self._lock:
+            key = self._key(workshop_id, barcode)
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, workshop_id, barcode, value):
+        with self._lock:
+            self._data[self._key(workshop_id, barcode)] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(self._key(workshop_id, barcode))
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, workshop_id):
+        """Размеры цеха изменились: все записи цеха устаревают (вытеснятся по LRU)."""
+        with self._lock:
+            self._generations[workshop_id] = self._generations.get(workshop_id, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+barcode_cache = BarcodeCache(
+    maxsize=getattr(settings, 'BARCODE_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'BARCODE_CACHE_TTL', 60),
+)
+
+
+def _cached(workshop_id, barcodes):
+    found, missing = {}, []
+    for barcode in barcodes:
+        hit = barcode_cache.get(workshop_id, barcode)
+        if hit is None:
+            missing.append(barcode)
+        else:
+            found[barcode] = hit
+    return found, missing
+
+
+def _missing_rows(workshop_id, missing):
+    return SizeQuantity.objects.filter(workshop_id=workshop_id, barcode__in=missing).values_list(
+        'barcode', 'item_id', 'size_label'
+    )
+
+
+def _remember(workshop_id, rows, found):
+    for barcode, item_id, size_label in rows:
+        value = (str(item_id), size_label)
+        barcode_cache.set(workshop_id, barcode, value)
+        found[barcode] = value
+    return found
+
+
+def resolve_barcodes(workshop_id, barcodes) -> dict:
+    """
+    {штрихкод: (item_id, size_label)} для найденных штрихкодов цеха.
+    Промахи кеша добираются одним запросом по индексу (workshop, barcode).
+    """
+    found, missing = _cached(workshop_id, barcodes)
+    if missing:
+        _remember(workshop_id, _missing_rows(workshop_id, missing), found)
+    return found
+
+
+async def aresolve_barcodes(workshop_id, barcodes) -> dict:
+    """resolve_barcodes для асинхронных view: промахи кеша читаются async ORM."""
+    found, missing = _cached(workshop_id, barcodes)
+    if missing:
+        _remember(workshop_id, [row async for row in _missing_rows(workshop_id, missing)], found)
+    return found
@@ -0,0 +1,99 @@
+"""Вспомогательные функции для команд-бенчмарков (bench_*, stress_orders) и тестов."""
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection
+from django.test.utils import CaptureQueriesContext
+
+from .models import Item, SizeQuantity, Workshop, WorkshopAssignment
+from .services import create_order
+from .stock_summary import rebuild_item_stock
+
+
+@contextmanager
+def bench_workshop(items: int = 0, sizes: tuple = ('S', 'M', 'L'), quantity: int = 0):
+    """
+    Временный цех с пользователем и товарами; всё удаляется после выхода.
+    Возвращает (workshop, user, [item, ...]).
+    """
+    suffix = uuid.uuid4().hex[:8]
+    workshop = Workshop.objects.create(name=f'bench-{suffix}')
+    user = User.objects.create_user(username=f'bench-{suffix}')
+    WorkshopAssignment.objects.create(user=user, workshop=workshop)
+    created = Item.objects.bulk_create([
+        Item(workshop=workshop, name=f'Товар {n}', price=100 + n) for n in range(items)
+    ])
+    SizeQuantity.objects.bulk_create([
+        SizeQuantity(item=item, workshop=workshop, size_label=label, quantity=quantity)
+        for item in created
+        for label in sizes
+    ])
+    rebuild_item_stock([workshop.pk])
+    try:
+        yield workshop, user, created
+    finally:
+        workshop.delete()
+        user.delete()
+
+
+def measure(fn, *args, **kwargs):
+    """Выполняет fn и возвращает (результат, секунды, число SQL-запросов)."""
+    with CaptureQueriesContext(connection) as ctx:
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        elapsed = time.perf_counter() - started
+    return result, elapsed, len(ctx.captured_queries)
+
+
+def place_orders_concurrently(workshop, items, sizes, threads: int, orders: int, seed: int = 1) -> dict:
+    """
+    orders попыток оформить заказ из threads потоков: 1–3 случайные позиции по 1–3 шт.
+    Возвращает {'placed', 'rejected' (нет остатка), 'errors' (ошибка БД)}.
+    """
+    counters = {'placed': 0, 'rejected': 0, 'errors': 0}
+    lock = threading.Lock()
+    attempts = iter(range(orders))
+
+    def worker(worker_seed):
+        rnd = random.Random(worker_seed)
+        try:
+            while True:
+                with lock:
+                    if next(attempts, None) is None:
+                        return
+                lines = [
+                    (rnd.choice(items).id, rnd.choice(sizes), rnd.randint(1, 3))
+                    for _ in range(rnd.randint(1, 3))
+                ]
+                try:
+                    create_order(workshop, 'stress', '', '', lines)
+                    outcome = 'placed'
+                except ValueError:
+                    outcome = 'rejected'
+                except OperationalError:
+                    outcome = 'errors'
+                with lock:
+                    counters[outcome] += 1
+        finally:
+            # У каждого потока своё соединение: закрывается сразу, а не по CONN_MAX_AGE
+            connection.close()
+
+    workers = [threading.Thread(target=worker, args=(seed + n,)) for n in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return counters
+
+
+# Цеха и пользователи seed_benchmark: <SEED_PREFIX>-<n>; пароль — SEED_PASSWORD
+SEED_PREFIX = 'seed'
+SEED_PASSWORD = 'bench-password'
+
+
+def seeded_workshops():
+    return Workshop.objects.filter(name__startswith=f'{SEED_PREFIX}-').order_by('name')
@@ -0,0 +1,112 @@
+"""
+Версия публичного каталога цеха: ETag/Last-Modified и кеш готовых ответов.
+
+Любое изменение товаров, цен и остатков цеха (и переименование цеха) увеличивает
+Workshop.catalog_version, изменение товаров без цеха — CatalogVersion. Список всех
+цехов зависит от обеих версий.
+Публичные эндпоинты отдают версию как ETag: на If-None-Match с той же версией — 304
+без сериализации, иначе ответ берётся из кеша по ключу (цех, версия) или строится заново.
+Функции асинхронные (async ORM, cache.aget/aset) — публичные view работают под ASGI.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from .models import CatalogVersion, Item, Workshop
+
+
+def bump_catalog_version(workshop_id) -> None:
+    """Каталог цеха (None — товаров без цеха) изменился: версия увеличивается после коммита транзакции."""
+    if workshop_id:
+        qs = Workshop.objects.filter(pk=workshop_id)
+    else:
+        qs = CatalogVersion.objects.filter(pk=CatalogVersion.SINGLETON_ID)
+    transaction.on_commit(
+        lambda: qs.update(catalog_version=F('catalog_version') + 1, catalog_updated_at=timezone.now())
+    )
+
+
+def _unscoped_state():
+    return CatalogVersion.objects.filter(pk=CatalogVersion.SINGLETON_ID).values_list(
+        'catalog_version', 'catalog_updated_at'
+    )
+
+
+async def aworkshop_catalog_state(workshop_id):
+    """(метка версии, время изменения) каталога цеха или всех цехов; None — цеха нет."""
+    try:
+        if workshop_id:
+            row = await (
+                Workshop.objects.filter(pk=workshop_id).values_list('catalog_version', 'catalog_updated_at').afirst()
+            )
+            if row is None:
+                return None
+            return f'{workshop_id}:{row[0]}', row[1]
+        agg = await Workshop.objects.aaggregate(
+            n=Count('id'), v=Sum('catalog_version'), updated=Max('catalog_updated_at')
+        )
+    except ValidationError:
+        return None
+    unscoped = await _unscoped_state().afirst()
+    if unscoped is None:
+        # Строку создаёт миграция 0025; если её удалили (очистка таблиц, flush) — без ETag и кеша
+        return False
+    updated = max(filter(None, (agg['updated'], unscoped[1])))
+    return f'all:{agg["n"]}:{agg["v"]}:{unscoped[0]}:{updated.timestamp()}', updated
+
+
+async def aitem_catalog_state(pk):
+    """Состояние каталога цеха, к которому относится товар; None — товара нет."""
+    row = await (
+        Item.objects.filter(pk=pk)
+        .values_list('workshop_id', 'workshop__catalog_version', 'workshop__catalog_updated_at')
+        .afirst()
+    )
+    if row is None:
+        return None
+    workshop_id, version, updated = row
+    if workshop_id is None:
+        unscoped = await _unscoped_state().afirst()
+        if unscoped is None:
+            return False
+        return f'none:{unscoped[0]}', unscoped[1]
+    return f'{workshop_id}:{version}', updated
+
+
+async def acatalog_response(request, scope: str, state, build):
+    """
+    Ответ публичного каталога с ETag/Last-Modified.
+    scope — что именно отдаётся (список с фильтром, конкретный товар);
+    state — результат aworkshop_catalog_state/aitem_catalog_state; await build() строит данные ответа.
+    """
+    if not state:
+        return Response(await build())
+    version_tag, updated = state
+    etag = quote_etag(hashlib.md5(f'{scope}|{version_tag}'.encode()).hexdigest())
+    last_modified = int(updated.timestamp())
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(last_modified),
+        'Cache-Control': 'no-cache',
+    }
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        for name, value in headers.items():
+            not_modified[name] = value
+        return not_modified
+
+    # Полные URL фото зависят от хоста запроса
+    key = f'sklad:catalog:{request.get_host()}:{scope}:{version_tag}'
+    data = await cache.aget(key)
+    if data is None:
+        data = await build()
+        await cache.aset(key, data, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300))
+    return Response(data, headers=headers)
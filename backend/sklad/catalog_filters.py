@@ -0,0 +1,122 @@
+"""
+Фильтры, сортировка и страницы публичного каталога (GET /api/public/items/).
+
+Фильтры: in_stock (есть размер с остатком > 0), size_label (есть такой размер;
+вместе с in_stock — именно он в наличии), price_min / price_max. in_stock —
+по сводке остатков товара (Item.in_stock_sizes), size_label — EXISTS по индексам
+размеров, цена — по (workshop, price, id). Страница — limit / offset, sizes=0 —
+без списка размеров. Нормализованные параметры входят в ключ кеша каталога.
+"""
+import hashlib
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Exists, F, OuterRef
+
+from .models import SizeQuantity
+
+ORDERINGS = {
+    'created_at': (F('created_at').asc(), F('id').asc()),
+    '-created_at': (F('created_at').desc(), F('id').desc()),
+    'price': (F('price').asc(nulls_last=True), F('id').asc()),
+    '-price': (F('price').desc(nulls_last=True), F('id').asc()),
+    'name': (F('name').asc(), F('id').asc()),
+}
+DEFAULT_ORDERING = 'created_at'
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+MAX_OFFSET = 100000
+_TRUE = ('1', 'true')
+_FALSE = ('0', 'false')
+
+
+def parse_flag(params, name: str, errors: dict):
+    """Логический query-параметр: True / False, None — не передан (ошибка пишется в errors)."""
+    value = params.get(name, '').lower()
+    if value in _TRUE:
+        return True
+    if value in _FALSE:
+        return False
+    if value:
+        errors[name] = ['Допустимо: true, false']
+    return None
+
+
+def parse_catalog_query(params) -> tuple[dict, dict]:
+    """Разбирает query-параметры: (фильтры, ошибки {параметр: [текст]})."""
+    query, errors = {}, {}
+
+    if parse_flag(params, 'in_stock', errors):
+        query['in_stock'] = True
+    if parse_flag(params, 'sizes', errors) is False:
+        query['sizes'] = False
+
+    for name in ('price_min', 'price_max'):
+        value = params.get(name)
+        if not value:
+            continue
+        try:
+            price = Decimal(value)
+        except InvalidOperation:
+            price = None
+        if price is None or not price.is_finite() or price < 0:
+            errors[name] = ['Неотрицательное число']
+        else:
+            query[name] = price
+
+    size_label = params.get('size_label', '').strip()
+    if size_label:
+        query['size_label'] = size_label
+
+    ordering = params.get('ordering')
+    if ordering:
+        if ordering in ORDERINGS:
+            query['ordering'] = ordering
+        else:
+            errors['ordering'] = [f'Допустимо: {", ".join(ORDERINGS)}']
+
+    for name, maximum in (('limit', MAX_PAGE_SIZE), ('offset', MAX_OFFSET)):
+        value = params.get(name)
+        if not value:
+            continue
+        try:
+            number = int(value)
+        except ValueError:
+            number = -1
+        low = 1 if name == 'limit' else 0
+        if not low <= number <= maximum:
+            errors[name] = [f'Целое число от {low} до {maximum}']
+        else:
+            query[name] = number
+    return query, errors
+
+
+def filter_catalog(queryset, query: dict):
+    """Применяет фильтры (без сортировки и страницы)."""
+    if 'price_min' in query:
+        queryset = queryset.filter(price__gte=query['price_min'])
+    if 'price_max' in query:
+        queryset = queryset.filter(price__lte=query['price_max'])
+    if 'size_label' in query:
+        sizes = SizeQuantity.objects.filter(item_id=OuterRef('pk'), size_label=query['size_label'])
+        if query.get('in_stock'):
+            sizes = sizes.filter(quantity__gt=0)
+        queryset = queryset.filter(Exists(sizes))
+    elif query.get('in_stock'):
+        queryset = queryset.filter(in_stock_sizes__gt=0)
+    return queryset
+
+
+def order_catalog(queryset, query: dict):
+    return queryset.order_by(*ORDERINGS[query.get('ordering', DEFAULT_ORDERING)])
+
+
+def is_paged(query: dict) -> bool:
+    return 'limit' in query or 'offset' in query
+
+
+def catalog_scope(query: dict) -> str:
+    """Часть ключа кеша: хеш нормализованных параметров ('' — без параметров)."""
+    if not query:
+        return ''
+    canonical = '&'.join(f'{name}={query[name]}' for name in sorted(query))
+    return ':' + hashlib.md5(canonical.encode()).hexdigest()
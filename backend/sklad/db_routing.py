@@ -0,0 +1,146 @@
+"""
+Чтение с реплики БД.
+
+Если в DATABASES есть псевдоним 'replica' (SQLITE_REPLICA_PATH или POSTGRES_REPLICA_HOST),
+ReplicaRoutingMiddleware помечает безопасные запросы (GET/HEAD/OPTIONS), а ReplicaRouter
+отправляет их чтения на реплику — только для view из REPLICA_VIEWS (публичный каталог,
+списки, выгрузки, аналитика). Всё остальное, любые записи и чтения внутри транзакции
+идут в 'default'.
+
+Чтение своих записей: после первой записи в запросе его чтения до конца идут в
+'default'; ответ на запрос с записью (или на небезопасный метод) закрепляет клиента за
+'default' на REPLICA_STICKY_SECONDS — cookie для браузера и ключ кеша по токену для
+клиентов с Authorization (при нескольких процессах кеш должен быть общим). Запрос
+находит router через contextvar; состояние — изменяемый объект, поэтому запись в
+потоке sync_to_async видна и после возврата в асинхронный view.
+"""
+import hashlib
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.signals import request_finished
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = 'replica'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+STICKY_COOKIE = 'sklad_primary'
+
+
+class _RequestState:
+    __slots__ = ('request', 'replica', 'wrote')
+
+    def __init__(self, request, replica):
+        self.request = request
+        self.replica = replica
+        self.wrote = False
+
+
+_state = ContextVar('sklad_db_routing', default=None)
+
+
+def replica_configured() -> bool:
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+def _sticky_key(request):
+    auth = request.headers.get('Authorization')
+    if not auth:
+        return None
+    return 'sklad:db-primary:' + hashlib.md5(auth.encode()).hexdigest()
+
+
+def _sticky_cookie(request) -> bool:
+    until = request.COOKIES.get(STICKY_COOKIE)
+    return bool(until and until.isdigit() and int(until) > time.time())
+
+
+class ReplicaRouter:
+    """Чтения помеченных запросов — на реплику, остальное — в 'default'."""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.replica or state.wrote:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        match = state.request.resolver_match
+        if match is None or match.url_name not in settings.REPLICA_VIEWS:
+            return None
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика — копия 'default': объекты из обеих баз связаны
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPLICA_DB_ALIAS:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replica_configured():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        key = _sticky_key(request)
+        sticky = _sticky_cookie(request) or (key is not None and cache.get(key) is not None)
+        state = self._start(request, sticky)
+        response = self.get_response(request)
+        if self._pin(state, response) and key is not None:
+            cache.set(key, True, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        key = _sticky_key(request)
+        sticky = _sticky_cookie(request) or (key is not None and await cache.aget(key) is not None)
+        state = self._start(request, sticky)
+        response = await self.get_response(request)
+        if self._pin(state, response) and key is not None:
+            await cache.aset(key, True, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    @staticmethod
+    def _start(request, sticky):
+        # Не сбрасывается на выходе: строки выгрузки читаются при отдаче потокового ответа
+        state = _RequestState(request, request.method in SAFE_METHODS and not sticky)
+        _state.set(state)
+        return state
+
+    @staticmethod
+    def _pin(state, response) -> bool:
+        """Закрепляет клиента за 'default' после записи; True — если закрепили."""
+        if not state.wrote and state.request.method in SAFE_METHODS:
+            return False
+        seconds = settings.REPLICA_STICKY_SECONDS
+        response.set_cookie(
+            STICKY_COOKIE, str(int(time.time()) + seconds), max_age=seconds, httponly=True, samesite='Lax'
+        )
+        return True
+
+
+def _forget_request(**kwargs):
+    _state.set(None)
+
+
+request_finished.connect(_forget_request, dispatch_uid='sklad.db_routing')
@@ -0,0 +1,151 @@
+"""
+Потоковая выгрузка каталога, остатков, поставок и заказов в NDJSON/CSV.
+
+Строки читаются серверным курсором (.iterator(chunk_size=...)) и сразу отдаются
+клиенту — память не зависит от объёма выгрузки. Одна строка выгрузки = один
+размер товара / одна позиция документа.
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from uuid import UUID
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Item, OrderLineItem, SupplyLineItem
+
+CHUNK_SIZE = 2000
+
+DATASETS = {
+    'items': {
+        'model': Item,
+        'workshop': 'workshop',
+        'date': 'created_at',
+        'columns': [
+            ('item_id', 'id'),
+            ('name', 'name'),
+            ('price', 'price'),
+            ('item_description', 'item_description'),
+            ('wb_url', 'wb_url'),
+            ('ozon_url', 'ozon_url'),
+            ('created_at', 'created_at'),
+            ('updated_at', 'updated_at'),
+            ('size_id', 'sizes__id'),
+            ('size_label', 'sizes__size_label'),
+            ('quantity', 'sizes__quantity'),
+            ('barcode', 'sizes__barcode'),
+        ],
+        'ordering': ['created_at', 'id', 'sizes__size_label'],
+    },
+    'supplies': {
+        'model': SupplyLineItem,
+        'workshop': 'supply__workshop',
+        'date': 'supply__date',
+        'columns': [
+            ('supply_id', 'supply_id'),
+            ('number', 'supply__number'),
+            ('type', 'supply__type'),
+            ('date', 'supply__date'),
+            ('created_by', 'supply__created_by__username'),
+            ('item_id', 'item_id'),
+            ('item_name', 'item__name'),
+            ('size_label', 'size_label'),
+            ('quantity', 'quantity'),
+        ],
+        'ordering': ['supply__date', 'supply_id', 'id'],
+    },
+    'orders': {
+        'model': OrderLineItem,
+        'workshop': 'order__workshop',
+        'date': 'order__created_at',
+        'columns': [
+            ('order_id', 'order_id'),
+            ('created_at', 'order__created_at'),
+            ('status', 'order__status'),
+            ('source', 'order__source'),
+            ('delivery_address', 'order__delivery_address'),
+            ('client_phone', 'order__client_phone'),
+            ('total', 'order__total'),
+            ('item_id', 'item_id'),
+            ('item_name', 'item__name'),
+            ('size_label', 'size_label'),
+            ('quantity', 'quantity'),
+        ],
+        'ordering': ['order__created_at', 'order_id', 'id'],
+    },
+}
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def parse_bound(value: str | None, end: bool = False) -> datetime | None:
+    """
+    Граница периода: дата (2026-03-01) или дата-время в ISO 8601.
+    Дата как верхняя граница включает весь день. ValueError — формат не распознан.
+    """
+    if not value:
+        return None
+    dt = parse_datetime(value)
+    if dt is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Неверная дата: {value}')
+        dt = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return dt
+
+
+def export_rows(dataset: str, workshop, date_from=None, date_to=None, chunk_size: int = CHUNK_SIZE):
+    """Возвращает (названия колонок, итератор кортежей значений)."""
+    spec = DATASETS[dataset]
+    qs = spec['model'].objects.all()
+    if workshop:
+        qs = qs.filter(**{spec['workshop']: workshop})
+    else:
+        qs = qs.filter(**{f'{spec["workshop"]}__isnull': True})
+    if date_from:
+        qs = qs.filter(**{f'{spec["date"]}__gte': date_from})
+    if date_to:
+        qs = qs.filter(**{f'{spec["date"]}__lt': date_to})
+    names = [name for name, _ in spec['columns']]
+    fields = [field for _, field in spec['columns']]
+    rows = qs.order_by(*spec['ordering']).values_list(*fields).iterator(chunk_size=chunk_size)
+    return names, rows
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat()
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    return value
+
+
+def render_ndjson(names, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(names, map(_plain, row))), ensure_ascii=False) + '\n'
+
+
+class _Echo:
+    """Псевдо-файл для csv.writer: writerow возвращает строку, а не пишет её."""
+
+    def write(self, value):
+        return value
+
+
+def render_csv(names, rows):
+    writer = csv.writer(_Echo())
+    # BOM — чтобы Excel открыл UTF-8 с кириллицей без мастера импорта
+    yield '\ufeff' + writer.writerow(names)
+    for row in rows:
+        yield writer.writerow(['' if v is None else _plain(v) for v in row])
+
+
+def render(fmt: str, names, rows):
+    return render_csv(names, rows) if fmt == 'csv' else render_ndjson(names, rows)
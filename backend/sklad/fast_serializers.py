@@ -0,0 +1,188 @@
+"""
+Быстрая сериализация списков без ModelSerializer.
+
+Строки берутся из .values(), вложенные размеры / позиции — одним запросом на страницу,
+префикс абсолютного URL фото вычисляется один раз на запрос. Формат JSON совпадает
+с ItemListSerializer, PublicItemListSerializer, OrderListSerializer и
+SupplyDetailSerializer (проверка: sklad.tests, на больших объёмах — manage.py bench_serializers).
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from .models import SizeQuantity, SupplyLineItem
+
+ITEM_FIELDS = (
+    'id', 'name', 'photo', 'photo_variants', 'item_description', 'price', 'wb_url', 'ozon_url',
+    'workshop_id', 'workshop__name', 'created_at', 'updated_at', 'total_quantity', 'in_stock_sizes', 'stock_version',
+)
+ORDER_FIELDS = ('id', 'source', 'delivery_address', 'client_phone', 'total', 'status', 'created_at')
+SUPPLY_FIELDS = ('id', 'number', 'date', 'type', 'created_by__username')
+
+# Те же поля DRF, что и в ModelSerializer, — одинаковое округление и формат
+_price = serializers.DecimalField(max_digits=10, decimal_places=2).to_representation
+_total = serializers.DecimalField(max_digits=12, decimal_places=2).to_representation
+
+
+def photo_url_builder(request):
+    """Функция name → URL фото, как у _item_photo_url, но без build_absolute_uri на каждую строку."""
+    base = request.build_absolute_uri('/')[:-1] if request else ''
+    if isinstance(default_storage, FileSystemStorage):
+        prefix = default_storage.base_url
+        prefix = prefix if prefix.startswith('/') else f'/{prefix}'
+        prefix = base + prefix
+
+        def build(name):
+            return prefix + filepath_to_uri(name).lstrip('/') if name else None
+    else:
+        def build(name):
+            if not name:
+                return None
+            url = default_storage.url(name)
+            if not request:
+                return url
+            return request.build_absolute_uri(url if url.startswith('/') else f'/{url}')
+    return build
+
+
+def datetime_formatter():
+    """
+    Функция datetime → строка как у serializers.DateTimeField для ISO 8601 и USE_TZ:
+    часовой пояс запроса берётся один раз, а не на каждое поле.
+    """
+    if not settings.USE_TZ or api_settings.DATETIME_FORMAT != ISO_8601:
+        return serializers.DateTimeField().to_representation
+    tz = timezone.get_current_timezone()
+
+    def render(value):
+        if not value:
+            return None
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return render
+
+
+def _photo_variants(row, photo_url):
+    variants = row['photo_variants'] or {}
+    if not row['photo'] or variants.get('source') != row['photo']:
+        return None
+    return {key: photo_url(name) for key, name in variants.items() if key != 'source'}
+
+
+def _size_rows(item_ids):
+    return SizeQuantity.objects.filter(item_id__in=item_ids).values_list('id', 'item_id', 'size_label', 'quantity', 'barcode')
+
+
+def _group_sizes(rows):
+    sizes = defaultdict(list)
+    for size_id, item_id, size_label, quantity, barcode in rows:
+        sizes[item_id].append({
+            'id': str(size_id),
+            'size_label': size_label,
+            'quantity': quantity,
+            'barcode': barcode,
+        })
+    return sizes
+
+
+def serialize_items(rows, request, public: bool = False, with_sizes: bool = True) -> list:
+    """
+    rows — словари .values(*ITEM_FIELDS). public=True — формат PublicItemListSerializer
+    (без item_description, created_at, updated_at). with_sizes=False — без поля sizes
+    и без запроса размеров: остатки только сводкой (total_quantity, in_stock_sizes).
+    """
+    rows = list(rows)
+    sizes = _group_sizes(_size_rows([row['id'] for row in rows])) if rows and with_sizes else {}
+    return _items_data(rows, sizes, request, public, with_sizes)
+
+
+async def aserialize_items(rows, request, public: bool = False, with_sizes: bool = True) -> list:
+    """serialize_items для асинхронных view: rows — список или queryset .values(*ITEM_FIELDS) (читается async ORM)."""
+    if not isinstance(rows, list):
+        rows = [row async for row in rows]
+    sizes = {}
+    if rows and with_sizes:
+        sizes = _group_sizes([size async for size in _size_rows([row['id'] for row in rows])])
+    return _items_data(rows, sizes, request, public, with_sizes)
+
+
+def _items_data(rows, sizes, request, public, with_sizes) -> list:
+    photo_url = photo_url_builder(request)
+    render_datetime = datetime_formatter()
+    result = []
+    for row in rows:
+        workshop_id = row['workshop_id']
+        data = {
+            'id': str(row['id']),
+            'name': row['name'],
+            'photo': photo_url(row['photo']),
+            'photo_variants': _photo_variants(row, photo_url),
+        }
+        if not public:
+            data['item_description'] = row['item_description']
+        data['price'] = _price(row['price']) if row['price'] is not None else None
+        data['wb_url'] = row['wb_url']
+        data['ozon_url'] = row['ozon_url']
+        data['workshop'] = {'id': str(workshop_id), 'name': row['workshop__name']} if workshop_id else None
+        if not public:
+            data['created_at'] = render_datetime(row['created_at'])
+            data['updated_at'] = render_datetime(row['updated_at'])
+        data['total_quantity'] = row['total_quantity']
+        data['in_stock_sizes'] = row['in_stock_sizes']
+        data['stock_version'] = row['stock_version']
+        if with_sizes:
+            data['sizes'] = sizes.get(row['id'], [])
+        result.append(data)
+    return result
+
+
+def serialize_orders(rows) -> list:
+    """rows — словари .values(*ORDER_FIELDS); формат OrderListSerializer."""
+    render_datetime = datetime_formatter()
+    return [
+        {
+            'id': row['id'],
+            'source': row['source'],
+            'delivery_address': row['delivery_address'],
+            'client_phone': row['client_phone'],
+            'total': _total(row['total']),
+            'status': row['status'],
+            'created_at': render_datetime(row['created_at']),
+        }
+        for row in rows
+    ]
+
+
+def serialize_supplies(rows) -> list:
+    """rows — словари .values(*SUPPLY_FIELDS); формат SupplyDetailSerializer."""
+    rows = list(rows)
+    render_datetime = datetime_formatter()
+    lines = defaultdict(list)
+    if rows:
+        line_rows = SupplyLineItem.objects.filter(supply_id__in=[row['id'] for row in rows]).values_list(
+            'id', 'supply_id', 'item_id', 'item__name', 'size_label', 'quantity'
+        )
+        for line_id, supply_id, item_id, item_name, size_label, quantity in line_rows:
+            lines[supply_id].append({
+                'id': str(line_id),
+                'item_id': str(item_id),
+                'item_name': item_name,
+                'size_label': size_label,
+                'quantity': quantity,
+            })
+    return [
+        {
+            'id': str(row['id']),
+            'number': row['number'],
+            'date': render_datetime(row['date']),
+            'type': row['type'],
+            'line_items': lines.get(row['id'], []),
+            'created_by_username': row['created_by__username'],
+        }
+        for row in rows
+    ]
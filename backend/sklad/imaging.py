@@ -0,0 +1,67 @@
+"""
+Производные изображения фото товара: миниатюра для списков и размер для карточки, JPEG и WebP.
+
+Модуль зависит только от Pillow: функции выполняются в отдельных процессах
+(ProcessPoolExecutor) и не трогают Django.
+"""
+import hashlib
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+# Имя варианта → (наибольшая сторона в пикселях, формат Pillow); от большего к меньшему
+VARIANTS = {
+    'detail': (1200, 'JPEG'),
+    'detail_webp': (1200, 'WEBP'),
+    'thumb': (320, 'JPEG'),
+    'thumb_webp': (320, 'WEBP'),
+}
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+QUALITY = 82
+# Каталог производных; в нём нет ничего, кроме файлов, записанных photos.store_variants
+VARIANTS_DIR = 'items/variants'
+
+
+def variant_name(item_id, source: str, variant: str) -> str:
+    """
+    Имя файла варианта в отдельном каталоге товара: items/variants/<id>/<хеш source>_320.webp.
+    С оригиналами (они лежат прямо в items/) и вариантами других товаров не пересекается.
+    """
+    digest = hashlib.sha1(source.encode()).hexdigest()[:12]
+    size, fmt = VARIANTS[variant]
+    return f'{VARIANTS_DIR}/{item_id}/{digest}_{size}.{EXTENSIONS[fmt]}'
+
+
+def _flatten(image):
+    """RGB для JPEG: прозрачность заливается белым."""
+    if image.mode == 'RGBA':
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image
+
+
+def render_variants(source) -> dict:
+    """
+    source — путь к файлу или байты оригинала. Возвращает {вариант: байты}.
+    Каждый следующий (меньший) вариант уменьшается из предыдущего, а JPEG
+    декодируется сразу в уменьшенном масштабе (draft) — многомегабайтные снимки
+    с телефона не распаковываются целиком.
+    """
+    with Image.open(source if isinstance(source, str) else BytesIO(source)) as original:
+        largest = max(size for size, _ in VARIANTS.values())
+        original.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(original)
+        has_alpha = image.mode in ('RGBA', 'LA', 'P')
+        image = image.convert('RGBA') if has_alpha else image.convert('RGB')
+
+        result = {}
+        for variant, (size, fmt) in VARIANTS.items():
+            image.thumbnail((size, size), Image.LANCZOS)
+            out = BytesIO()
+            if fmt == 'JPEG':
+                _flatten(image).save(out, fmt, quality=QUALITY, optimize=True, progressive=True)
+            else:
+                image.save(out, fmt, quality=QUALITY, method=4)
+            result[variant] = out.getvalue()
+        return result
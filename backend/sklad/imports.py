@@ -0,0 +1,433 @@
+"""
+Импорт каталога цеха (товары, размеры, остатки, штрихкоды) из CSV или XLSX.
+
+Одна строка файла = один размер товара; колонки совпадают с выгрузкой items
+(item_id, name, price, item_description, wb_url, ozon_url, size_label, quantity, barcode),
+поэтому выгрузку можно поправить и загрузить обратно. Товар ищется по item_id,
+без него — по названию в цехе; не найден — создаётся. Пустая ячейка не меняет
+значение у существующего товара / размера; quantity задаёт остаток целиком.
+
+CSV — в UTF-8 или cp1251 (определяется по началу файла). Файл читается потоком и
+обрабатывается порциями по IMPORT_CHUNK_SIZE строк: порция проверяется несколькими
+запросами (товары, размеры, штрихкоды), затем товары и размеры записываются
+bulk_create(update_conflicts=True). Строки с ошибками пропускаются и попадают в отчёт,
+остальные импортируются. Изменения остатков пишутся в журнал движений, объекты — в
+журнал синхронизации, сводка остатков товаров пересчитывается.
+"""
+import codecs
+import csv
+import io
+import uuid
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from django.db import transaction
+from django.utils import timezone
+
+from .barcodes import barcode_cache
+from .catalog_cache import bump_catalog_version
+from .ledger import record_movements
+from .models import ChangeLogEntry, Item, SizeQuantity, StockMovement
+from .stock_summary import refresh_item_stock
+from .sync import record_changes
+
+FORMATS = ('csv', 'xlsx')
+ITEM_FIELDS = ('name', 'price', 'item_description', 'wb_url', 'ozon_url')
+COLUMNS = ('item_id',) + ITEM_FIELDS + ('size_label', 'quantity', 'barcode')
+# Русские заголовки, которые встречаются в таблицах цехов
+ALIASES = {
+    'id': 'item_id',
+    'название': 'name',
+    'товар': 'name',
+    'цена': 'price',
+    'описание': 'item_description',
+    'ссылка на вб': 'wb_url',
+    'ссылка на озон': 'ozon_url',
+    'размер': 'size_label',
+    'количество': 'quantity',
+    'остаток': 'quantity',
+    'штрихкод': 'barcode',
+}
+MAX_ERRORS = 1000
+# Верхняя граница остатка — диапазон IntegerField (integer в PostgreSQL)
+MAX_QUANTITY = 2 ** 31 - 1
+# Сколько байт начала CSV проверять, чтобы определить кодировку
+CSV_SAMPLE_BYTES = 64 * 1024
+
+_validate_url = URLValidator()
+
+
+class ImportFileError(ValueError):
+    """Файл не читается или в нём нет обязательных колонок."""
+
+
+def _columns(header) -> list:
+    columns = []
+    for cell in header:
+        name = str(cell or '').strip().lower()
+        name = ALIASES.get(name, name)
+        columns.append(name if name in COLUMNS else None)
+    if 'size_label' not in columns or not ({'item_id', 'name'} & set(columns)):
+        raise ImportFileError('Нужны колонки size_label и name (или item_id)')
+    return columns
+
+
+def _csv_encoding(file) -> str:
+    """UTF-8, если им декодируется начало файла, иначе cp1251 (так сохраняет CSV Excel в русской локали)."""
+    sample = file.read(CSV_SAMPLE_BYTES)
+    file.seek(0)
+    try:
+        # Не final: символ, разрезанный концом образца, — не ошибка
+        codecs.getincrementaldecoder('utf-8')().decode(sample)
+    except UnicodeDecodeError:
+        return 'cp1251'
+    return 'utf-8-sig'
+
+
+def _read_csv(file):
+    text = io.TextIOWrapper(file, encoding=_csv_encoding(file), newline='')
+    try:
+        first = text.readline()
+        # Excel в русской локали сохраняет CSV через точку с запятой
+        delimiter = ';' if first.count(';') > first.count(',') else ','
+        reader = csv.reader(text, delimiter=delimiter)
+        try:
+            columns = _columns(next(csv.reader([first], delimiter=delimiter)))
+        except StopIteration:
+            raise ImportFileError('Пустой файл')
+        for line, cells in enumerate(reader, start=2):
+            yield line, cells, columns
+    except UnicodeDecodeError:
+        raise ImportFileError('CSV должен быть в кодировке UTF-8 или cp1251')
+
+
+def _read_xlsx(file):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError('Для XLSX нужен пакет openpyxl (pip install openpyxl)')
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except Exception:
+        raise ImportFileError('Не удалось прочитать XLSX')
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        columns = _columns(next(rows, ()))
+        for line, cells in enumerate(rows, start=2):
+            yield line, cells, columns
+    finally:
+        workbook.close()
+
+
+def read_rows(file, fmt: str):
+    """Поток (номер строки, {колонка: значение}); пустые строки пропускаются."""
+    if fmt not in FORMATS:
+        raise ImportFileError(f'Формат {fmt} не поддерживается: {", ".join(FORMATS)}')
+    for line, cells, columns in (_read_csv(file) if fmt == 'csv' else _read_xlsx(file)):
+        row = {}
+        for name, value in zip(columns, cells):
+            if name is None or value is None:
+                continue
+            value = value.strip() if isinstance(value, str) else value
+            if value != '':
+                row[name] = value
+        if row:
+            yield line, row
+
+
+def _decimal(value):
+    if isinstance(value, float):
+        value = repr(value)
+    text = str(value).replace('\xa0', '').replace(' ', '').replace(',', '.')
+    try:
+        number = Decimal(text)
+    except InvalidOperation:
+        raise ValueError
+    # Infinity и NaN: у них нет порядка (exponent — строка), сравнения с ними не работают
+    if not number.is_finite():
+        raise ValueError
+    return number
+
+
+def _clean(row: dict):
+    """(значения, ошибки) строки; в значениях только заполненные колонки."""
+    values, errors = {}, {}
+    if 'item_id' in row:
+        try:
+            values['item_id'] = uuid.UUID(str(row['item_id']))
+        except ValueError:
+            errors['item_id'] = 'Неверный UUID'
+    if 'name' in row:
+        values['name'] = str(row['name'])
+        if len(values['name']) > 255:
+            errors['name'] = 'Не длиннее 255 символов'
+    if 'price' in row:
+        try:
+            price = _decimal(row['price'])
+            if price < 0 or price.as_tuple().exponent < -2 or price >= Decimal('1e8'):
+                raise ValueError
+            values['price'] = price.quantize(Decimal('0.01'))
+        except ValueError:
+            errors['price'] = 'Неверная цена'
+    if 'item_description' in row:
+        values['item_description'] = str(row['item_description'])
+    for field in ('wb_url', 'ozon_url'):
+        if field in row:
+            values[field] = str(row[field])
+            try:
+                if len(values[field]) > 500:
+                    raise ValidationError('')
+                _validate_url(values[field])
+            except ValidationError:
+                errors[field] = 'Неверная ссылка'
+    size_label = str(row.get('size_label', ''))
+    if not size_label:
+        errors['size_label'] = 'Обязательное поле'
+    elif len(size_label) > 50:
+        errors['size_label'] = 'Не длиннее 50 символов'
+    values['size_label'] = size_label
+    if 'quantity' in row:
+        try:
+            quantity = _decimal(row['quantity'])
+            if quantity != quantity.to_integral_value() or not 0 <= quantity <= MAX_QUANTITY:
+                raise ValueError
+            values['quantity'] = int(quantity)
+        except ValueError:
+            errors['quantity'] = f'Целое число от 0 до {MAX_QUANTITY}'
+    if 'barcode' in row:
+        barcode = row['barcode']
+        # Штрихкод из числовой ячейки XLSX приходит числом
+        values['barcode'] = str(int(barcode)) if isinstance(barcode, float) and barcode.is_integer() else str(barcode)
+        if len(values['barcode']) > 100:
+            errors['barcode'] = 'Не длиннее 100 символов'
+    return values, errors
+
+
+class CatalogImport:
+    """Состояние импорта одного файла: счётчики, ошибки, уже встреченные в файле ключи."""
+
+    def __init__(self, workshop, dry_run: bool = False):
+        self.workshop = workshop
+        self.workshop_id = workshop.pk if workshop else None
+        self.dry_run = dry_run
+        self.rows = 0
+        self.imported_rows = 0
+        self.items_created = set()
+        self.items_updated = set()
+        self.sizes_created = 0
+        self.sizes_updated = 0
+        self.errors = []
+        self.error_count = 0
+        self._seen_sizes = set()
+        self._seen_barcodes = {}
+        self._new_by_name = {}
+
+    def _error(self, line, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({'row': line, 'errors': errors})
+
+    def run(self, rows, chunk_size: int | None = None) -> dict:
+        chunk_size = chunk_size or getattr(settings, 'IMPORT_CHUNK_SIZE', 2000)
+        with transaction.atomic():
+            chunk = []
+            for line, row in rows:
+                chunk.append((line, row))
+                if len(chunk) >= chunk_size:
+                    self._chunk(chunk)
+                    chunk = []
+            if chunk:
+                self._chunk(chunk)
+            if self.dry_run:
+                transaction.set_rollback(True)
+            elif self.imported_rows:
+                bump_catalog_version(self.workshop_id)
+                transaction.on_commit(lambda: barcode_cache.invalidate(self.workshop_id))
+        return self.report()
+
+    def report(self) -> dict:
+        return {
+            'dry_run': self.dry_run,
+            'rows': self.rows,
+            'imported_rows': self.imported_rows,
+            'items_created': len(self.items_created),
+            'items_updated': len(self.items_updated - self.items_created),
+            'sizes_created': self.sizes_created,
+            'sizes_updated': self.sizes_updated,
+            'error_count': self.error_count,
+            'errors': sorted(self.errors, key=lambda error: error['row']),
+        }
+
+    def _chunk(self, chunk):
+        self.rows += len(chunk)
+        cleaned = []
+        for line, row in chunk:
+            values, errors = _clean(row)
+            if errors:
+                self._error(line, errors)
+            else:
+                cleaned.append((line, values))
+
+        cleaned = self._resolve_items(cleaned)
+        cleaned = self._check_sizes(cleaned)
+        if cleaned:
+            self._write(cleaned)
+
+    def _resolve_items(self, cleaned):
+        """Проставляет values['item_id'] каждой строке; чужие и неоднозначные товары — ошибки."""
+        ids = {values['item_id'] for _, values in cleaned if 'item_id' in values}
+        names = {values['name'] for _, values in cleaned if 'item_id' not in values and 'name' in values}
+        self._existing = {
+            row['id']: row
+            for row in Item.objects.filter(pk__in=ids).values('id', 'workshop_id', *ITEM_FIELDS)
+        }
+        by_name = {}
+        for row in Item.objects.filter(workshop_id=self.workshop_id, name__in=names).values('id', 'workshop_id', *ITEM_FIELDS):
+            by_name.setdefault(row['name'], []).append(row)
+            self._existing[row['id']] = row
+
+        resolved = []
+        for line, values in cleaned:
+            if 'item_id' in values:
+                existing = self._existing.get(values['item_id'])
+                if existing is not None and existing['workshop_id'] != self.workshop_id:
+                    self._error(line, {'item_id': 'Товар не найден'})
+                    continue
+                if existing is None and 'name' not in values:
+                    self._error(line, {'name': 'Обязательное поле для нового товара'})
+                    continue
+            elif 'name' not in values:
+                self._error(line, {'name': 'Обязательное поле'})
+                continue
+            else:
+                matches = by_name.get(values['name'], [])
+                if len(matches) > 1:
+                    self._error(line, {'name': 'Несколько товаров с таким названием — укажите item_id'})
+                    continue
+                if matches:
+                    values['item_id'] = matches[0]['id']
+                else:
+                    # Новый товар без id: строки с тем же названием относятся к нему же (и в следующих порциях)
+                    values['item_id'] = self._new_by_name.setdefault(values['name'], uuid.uuid4())
+            resolved.append((line, values))
+        return resolved
+
+    def _check_sizes(self, cleaned):
+        """Повторы размеров в файле и занятые штрихкоды; размеры товаров порции блокируются до конца импорта."""
+        item_ids = {values['item_id'] for _, values in cleaned}
+        sizes = SizeQuantity.objects.filter(item_id__in=item_ids)
+        if not self.dry_run:
+            # Остаток перезаписывается целиком, а корректировка в журнале считается от прочитанного:
+            # заказ между чтением и записью иначе потерялся бы. Порядок по id — как в services._lock_sizes
+            sizes = sizes.select_for_update().order_by('id')
+        self._sizes = {
+            (row['item_id'], row['size_label']): row
+            for row in sizes.values('id', 'item_id', 'size_label', 'quantity', 'barcode')
+        }
+        barcodes = {values['barcode'] for _, values in cleaned if values.get('barcode')}
+        owners = {
+            row['barcode']: (row['item_id'], row['size_label'])
+            for row in SizeQuantity.objects.filter(workshop_id=self.workshop_id, barcode__in=barcodes)
+            .values('item_id', 'size_label', 'barcode')
+        }
+        # Штрихкод, который файл снимает с размера (задаёт тому другой), можно отдать другому размеру
+        released = {
+            self._sizes[key]['barcode']
+            for key in ((values['item_id'], values['size_label']) for _, values in cleaned if values.get('barcode'))
+            if key in self._sizes and self._sizes[key]['barcode']
+        }
+
+        checked = []
+        for line, values in cleaned:
+            key = (values['item_id'], values['size_label'])
+            if key in self._seen_sizes:
+                self._error(line, {'size_label': 'Размер товара уже был в файле'})
+                continue
+            barcode = values.get('barcode')
+            if barcode:
+                owner = owners.get(barcode)
+                if self._seen_barcodes.get(barcode, key) != key:
+                    self._error(line, {'barcode': 'Штрихкод повторяется в файле'})
+                    continue
+                if owner is not None and owner != key and barcode not in released:
+                    self._error(line, {'barcode': 'Штрихкод уже используется в этом цехе'})
+                    continue
+                self._seen_barcodes[barcode] = key
+            self._seen_sizes.add(key)
+            checked.append((line, values))
+        return checked
+
+    def _write(self, cleaned):
+        now = timezone.now()
+        items = {}
+        for _, values in cleaned:
+            item_id = values['item_id']
+            if item_id not in items:
+                existing = self._existing.get(item_id)
+                items[item_id] = dict(existing) if existing else {'id': item_id, 'workshop_id': self.workshop_id, 'wb_url': '', 'ozon_url': ''}
+                items[item_id]['_changed'] = existing is None
+            item = items[item_id]
+            for field in ITEM_FIELDS:
+                if field in values and item.get(field) != values[field]:
+                    item[field] = values[field]
+                    item['_changed'] = True
+
+        changed_items = [item for item in items.values() if item.pop('_changed')]
+        for item in changed_items:
+            (self.items_updated if item['id'] in self._existing else self.items_created).add(item['id'])
+
+        sizes, opening, adjustments = [], {}, {}
+        for _, values in cleaned:
+            key = (values['item_id'], values['size_label'])
+            existing = self._sizes.get(key)
+            quantity = values.get('quantity', existing['quantity'] if existing else 0)
+            barcode = values.get('barcode', existing['barcode'] if existing else None)
+            if existing and quantity == existing['quantity'] and barcode == existing['barcode']:
+                continue
+            size_id = existing['id'] if existing else uuid.uuid4()
+            sizes.append(SizeQuantity(
+                id=size_id, item_id=key[0], workshop_id=self.workshop_id,
+                size_label=key[1], quantity=quantity, barcode=barcode,
+            ))
+            if existing:
+                self.sizes_updated += 1
+                adjustments[size_id] = quantity - existing['quantity']
+            else:
+                self.sizes_created += 1
+                opening[size_id] = quantity
+        self.imported_rows += len(cleaned)
+        if self.dry_run:
+            return
+
+        Item.objects.bulk_create(
+            [Item(**item, updated_at=now) for item in changed_items],
+            update_conflicts=True,
+            unique_fields=['id'],
+            update_fields=[*ITEM_FIELDS, 'updated_at'],
+        )
+        # Штрихкоды, которые файл снимает с размеров, освобождаются до вставки — иначе сработает уникальность
+        moved = [
+            size.id for size in sizes
+            if (size.item_id, size.size_label) in self._sizes
+            and self._sizes[(size.item_id, size.size_label)]['barcode'] not in (None, size.barcode)
+        ]
+        if moved:
+            SizeQuantity.objects.filter(id__in=moved).update(barcode=None)
+        SizeQuantity.objects.bulk_create(
+            sizes,
+            update_conflicts=True,
+            unique_fields=['item', 'size_label'],
+            update_fields=['quantity', 'barcode'],
+        )
+        refresh_item_stock(size.item_id for size in sizes)
+        record_movements(self.workshop_id, opening, StockMovement.REASON_OPENING)
+        record_movements(self.workshop_id, adjustments, StockMovement.REASON_ADJUSTMENT)
+        record_changes(self.workshop_id, ChangeLogEntry.ENTITY_ITEM, [item['id'] for item in changed_items])
+        record_changes(self.workshop_id, ChangeLogEntry.ENTITY_SIZE, [size.id for size in sizes])
+
+
+def import_catalog(workshop, file, fmt: str, dry_run: bool = False) -> dict:
+    """Импорт файла в каталог цеха. ImportFileError — файл не читается целиком."""
+    return CatalogImport(workshop, dry_run=dry_run).run(read_rows(file, fmt))
@@ -0,0 +1,133 @@
+"""
+Очередь фоновых задач в основной базе (модель Job), выполняет manage.py run_worker.
+
+Задача — функция, зарегистрированная декоратором @register('имя'); enqueue('имя', **payload)
+вставляет строку в текущей транзакции: задача появится у воркера только после коммита
+записи, которая её породила, и пропадёт при откате. payload — JSON. enqueue_once не
+ставит задачу, если такая же ещё ждёт в очереди.
+
+Воркер забирает задачи строками: на PostgreSQL — SELECT … FOR UPDATE SKIP LOCKED
+(параллельные воркеры не ждут друг друга), на SQLite — условный UPDATE по одной строке
+(status='queued' → 'running'; кто обновил строку, тот и выполняет). Успешная задача
+удаляется. Ошибка — повтор через JOB_RETRY_BASE_SECONDS × 2^(попытка−1) (не больше
+JOB_RETRY_MAX_SECONDS); после max_attempts попыток задача остаётся со статусом dead
+(список — manage.py dead_jobs). Задача, которая выполняется дольше JOB_TIMEOUT_SECONDS
+(воркер упал), возвращается в очередь.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+
+
+def register(name: str, max_attempts: int = None):
+    """Декоратор: функция выполняется воркером по имени задачи (аргументы — payload)."""
+    def decorator(func):
+        _handlers[name] = (func, max_attempts)
+        return func
+    return decorator
+
+
+def enqueue(name: str, **payload) -> Job:
+    """Ставит задачу в очередь в текущей транзакции."""
+    if name not in _handlers:
+        raise ValueError(f'Неизвестная задача: {name}')
+    return Job.objects.create(name=name, payload=payload)
+
+
+def enqueue_once(name: str, **payload) -> Job | None:
+    """
+    enqueue, если такой же задачи (имя и payload) ещё нет в очереди; иначе None.
+    Значения payload — строки и числа: сравнение идёт по ключам JSON.
+    """
+    queued = Job.objects.filter(name=name, status=Job.STATUS_QUEUED)
+    if payload:
+        queued = queued.filter(**{f'payload__{key}': value for key, value in payload.items()})
+    if queued.exists():
+        return None
+    return enqueue(name, **payload)
+
+
+def _max_attempts(name: str) -> int:
+    _, max_attempts = _handlers.get(name, (None, None))
+    return max_attempts or settings.JOB_MAX_ATTEMPTS
+
+
+def retry_delay(attempts: int) -> float:
+    """Пауза перед следующей попыткой: экспонента с разбросом ±10%, чтобы повторы не шли пачкой."""
+    delay = settings.JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1) * random.uniform(0.9, 1.1)
+    return min(delay, settings.JOB_RETRY_MAX_SECONDS)
+
+
+def claim(worker: str, limit: int) -> list:
+    """Забирает до limit готовых задач: status → running, attempts + 1."""
+    now = timezone.now()
+    ready = Job.objects.filter(status=Job.STATUS_QUEUED, run_after__lte=now).order_by('run_after', 'id')
+    running = {'status': Job.STATUS_RUNNING, 'locked_at': now, 'locked_by': worker, 'attempts': F('attempts') + 1}
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(ready.select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+            Job.objects.filter(id__in=ids).update(**running)
+    else:
+        ids = []
+        for job_id in ready.values_list('id', flat=True)[:limit * 2]:
+            if Job.objects.filter(id=job_id, status=Job.STATUS_QUEUED).update(**running):
+                ids.append(job_id)
+                if len(ids) == limit:
+                    break
+    return list(Job.objects.filter(id__in=ids).order_by('run_after', 'id'))
+
+
+def requeue_stale() -> int:
+    """Возвращает в очередь задачи, зависшие в running дольше JOB_TIMEOUT_SECONDS."""
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_TIMEOUT_SECONDS)
+    return Job.objects.filter(status=Job.STATUS_RUNNING, locked_at__lt=cutoff).update(
+        status=Job.STATUS_QUEUED, locked_at=None, locked_by='', run_after=timezone.now(),
+    )
+
+
+def run(job: Job) -> bool:
+    """Выполняет забранную задачу (в потоке воркера). True — успешно."""
+    close_old_connections()
+    # Строку меняет только тот, кто её забрал: зависшую задачу мог перехватить другой воркер
+    mine = Job.objects.filter(pk=job.pk, status=Job.STATUS_RUNNING, locked_by=job.locked_by, attempts=job.attempts)
+    try:
+        handler = _handlers.get(job.name)
+        if handler is None:
+            raise LookupError(f'Неизвестная задача: {job.name}')
+        handler[0](**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('Задача %s #%s, попытка %s: ошибка', job.name, job.pk, job.attempts, exc_info=True)
+        if job.attempts >= _max_attempts(job.name):
+            mine.update(status=Job.STATUS_DEAD, last_error=error, locked_at=None)
+        else:
+            mine.update(
+                status=Job.STATUS_QUEUED, last_error=error, locked_at=None, locked_by='',
+                run_after=timezone.now() + timedelta(seconds=retry_delay(job.attempts)),
+            )
+        return False
+    else:
+        mine.delete()
+        return True
+    finally:
+        close_old_connections()
+
+
+def requeue_dead(ids=None) -> int:
+    """Возвращает задачи из dead в очередь с нуля попыток."""
+    qs = Job.objects.filter(status=Job.STATUS_DEAD)
+    if ids is not None:
+        qs = qs.filter(id__in=ids)
+    return qs.update(status=Job.STATUS_QUEUED, attempts=0, run_after=timezone.now(), locked_by='')
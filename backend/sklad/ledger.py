@@ -0,0 +1,95 @@
+"""
+Журнал движений остатков и срезы (снимки) балансов.
+
+Каждое изменение SizeQuantity.quantity пишется в StockMovement. Периодически
+(manage.py snapshot_stock) баланс каждого размера фиксируется в StockSnapshot.
+Остаток на момент T = ближайший срез не позже T + движения после среза до T —
+история целиком не перечитывается.
+"""
+from collections import defaultdict
+from datetime import datetime
+
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from .models import StockMovement, StockSnapshot
+
+
+def record_movements(workshop_id, deltas: dict, reason: str, supply=None, order=None) -> None:
+    """Пишет движения {size_id: delta} одним INSERT; нулевые изменения пропускаются."""
+    now = timezone.now()
+    StockMovement.objects.bulk_create([
+        StockMovement(
+            workshop_id=workshop_id,
+            size_id=size_id,
+            delta=delta,
+            reason=reason,
+            supply=supply,
+            order=order,
+            created_at=now,
+        )
+        for size_id, delta in deltas.items()
+        if delta
+    ])
+
+
+def record_order_movements(workshop_id, deltas: dict, reason: str) -> None:
+    """Движения нескольких заказов одним INSERT: {(order_id, size_id): delta}."""
+    now = timezone.now()
+    StockMovement.objects.bulk_create([
+        StockMovement(
+            workshop_id=workshop_id,
+            size_id=size_id,
+            delta=delta,
+            reason=reason,
+            order_id=order_id,
+            created_at=now,
+        )
+        for (order_id, size_id), delta in deltas.items()
+        if delta
+    ])
+
+
+def _scope(qs, workshop_id, item_id=None):
+    qs = qs.filter(workshop_id=workshop_id)
+    if item_id:
+        qs = qs.filter(size__item_id=item_id)
+    return qs
+
+
+def latest_snapshot_time(workshop_id, at: datetime) -> datetime | None:
+    return _scope(StockSnapshot.objects, workshop_id).filter(taken_at__lte=at).aggregate(
+        t=Max('taken_at')
+    )['t']
+
+
+def stock_at(workshop_id, at: datetime, item_id=None) -> dict:
+    """Остатки размеров цеха на момент at: {size_id: quantity} (нулевые не включаются)."""
+    base_time = latest_snapshot_time(workshop_id, at)
+    balances = defaultdict(int)
+    if base_time is not None:
+        snapshots = _scope(StockSnapshot.objects, workshop_id, item_id).filter(taken_at=base_time)
+        for size_id, quantity in snapshots.values_list('size_id', 'quantity'):
+            balances[size_id] = quantity
+
+    tail = _scope(StockMovement.objects, workshop_id, item_id).filter(created_at__lte=at)
+    if base_time is not None:
+        tail = tail.filter(created_at__gt=base_time)
+    for row in tail.values('size_id').annotate(total=Sum('delta')).order_by():
+        balances[row['size_id']] += row['total']
+    return {size_id: quantity for size_id, quantity in balances.items() if quantity}
+
+
+def take_snapshot(workshop_id, at: datetime) -> int:
+    """Фиксирует балансы цеха на момент at (от предыдущего среза). Возвращает число строк."""
+    if _scope(StockSnapshot.objects, workshop_id).filter(taken_at__gte=at).exists():
+        return 0
+    balances = stock_at(workshop_id, at)
+    StockSnapshot.objects.bulk_create(
+        [
+            StockSnapshot(workshop_id=workshop_id, size_id=size_id, taken_at=at, quantity=quantity)
+            for size_id, quantity in balances.items()
+        ],
+        batch_size=1000,
+    )
+    return len(balances)
@@ -0,0 +1,155 @@
+"""
+Сколько одновременных медленных клиентов выдерживает публичное API под WSGI и под ASGI:
+python manage.py bench_asgi [--clients 10 50 200] [--requests 400] [--client-delay 0.2] [--workers 4]
+
+Оба варианта запускаются в процессе на данных seed_benchmark. WSGI — пул из --workers
+синхронных воркеров (как gunicorn с sync-воркерами): воркер занят, пока медленный клиент
+не дочитает ответ (--client-delay секунд). ASGI — один цикл событий и ASGIHandler:
+пока клиент читает, цикл обслуживает остальных. Запросы — страница публичного
+каталога, карточка товара и поиск по штрихкоду вперемешку.
+"""
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncRequestFactory, RequestFactory
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from sklad.authentication import tokens_for_user
+from sklad.benchmarks import seeded_workshops
+from sklad.models import Item, SizeQuantity
+
+
+class Command(BaseCommand):
+    help = 'Пропускная способность и задержки публичного API под WSGI и ASGI при медленных клиентах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, nargs='+', default=[10, 50, 200], help='Одновременных клиентов')
+        parser.add_argument('--requests', type=int, default=400, help='Запросов на один прогон')
+        parser.add_argument('--client-delay', type=float, default=0.2, help='Сколько секунд клиент читает ответ')
+        parser.add_argument('--workers', type=int, default=4, help='Синхронных воркеров WSGI')
+
+    def handle(self, *args, **options):
+        workshop = seeded_workshops().first()
+        if workshop is None:
+            raise CommandError('Нет данных: сначала выполните manage.py seed_benchmark')
+        user = workshop.assignments.select_related('user').first().user
+        item_ids = list(Item.objects.filter(workshop=workshop).order_by('created_at').values_list('id', flat=True)[:50])
+        barcodes = list(
+            SizeQuantity.objects.filter(workshop=workshop).exclude(barcode=None).values_list('barcode', flat=True)[:50]
+        )
+        token = f'Bearer {tokens_for_user(user).access_token}'
+        requests = []
+        for n in range(options['requests']):
+            kind = n % 3
+            if kind == 0:
+                requests.append((reverse('public-items'), {'workshop_id': str(workshop.pk), 'limit': 24, 'offset': 24 * (n % 5)}, {}))
+            elif kind == 1:
+                requests.append((reverse('public-item-detail', kwargs={'pk': item_ids[n % len(item_ids)]}), {}, {}))
+            else:
+                requests.append((reverse('size-by-barcode'), {'barcode': barcodes[n % len(barcodes)]}, {'Authorization': token}))
+
+        delay = options['client_delay']
+        self.stdout.write(
+            f'{len(requests)} запросов, клиент читает ответ {delay * 1000:.0f} мс, WSGI-воркеров {options["workers"]}'
+        )
+        self.stdout.write(f'{"":<6} {"клиентов":>8} {"запр/с":>8} {"p50, мс":>9} {"p95, мс":>9} {"ошибок":>7}')
+        with override_settings(ALLOWED_HOSTS=['*']):
+            for clients in options['clients']:
+                for name, run in (('WSGI', self._run_wsgi), ('ASGI', self._run_asgi)):
+                    started = time.perf_counter()
+                    latencies, errors = run(requests, clients, delay, options['workers'])
+                    elapsed = time.perf_counter() - started
+                    latencies.sort()
+                    self.stdout.write(
+                        f'{name:<6} {clients:>8} {len(requests) / elapsed:>8.1f} '
+                        f'{statistics.median(latencies) * 1000:>9.0f} '
+                        f'{latencies[int(len(latencies) * 0.95) - 1] * 1000:>9.0f} {errors:>7}'
+                    )
+
+    def _run_wsgi(self, requests, clients, delay, workers):
+        handler = WSGIHandler()
+        factory = RequestFactory()
+        latencies, errors = [], []
+        queue = iter(requests)
+        lock = threading.Lock()
+
+        def serve(path, data, headers):
+            # Воркер отдаёт ответ и ждёт, пока клиент его дочитает
+            statuses = []
+            body = handler(factory.get(path, data, headers=headers).environ, lambda status, _: statuses.append(status))
+            try:
+                b''.join(body)
+                time.sleep(delay)
+            finally:
+                body.close()
+            return statuses[0].startswith('200')
+
+        def client(pool):
+            while True:
+                with lock:
+                    request = next(queue, None)
+                if request is None:
+                    return
+                started = time.perf_counter()
+                ok = pool.submit(serve, *request).result()
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+                    errors.append(not ok)
+
+        with ThreadPoolExecutor(workers) as pool:
+            threads = [threading.Thread(target=client, args=(pool,)) for _ in range(clients)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        return latencies, sum(errors)
+
+    def _run_asgi(self, requests, clients, delay, workers):
+        handler = ASGIHandler()
+        factory = AsyncRequestFactory()
+        latencies, errors = [], []
+
+        async def serve(path, data, headers):
+            scope = factory.get(path, data, headers=headers).scope
+            done = asyncio.Event()
+            statuses = []
+
+            async def receive():
+                if not statuses:
+                    statuses.append(None)
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await done.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+                elif not message.get('more_body'):
+                    # Цикл событий свободен, пока клиент дочитывает ответ
+                    await asyncio.sleep(delay)
+                    done.set()
+
+            await handler(scope, receive, send)
+            return statuses[-1] == 200
+
+        async def client(queue):
+            while queue:
+                request = queue.pop()
+                started = time.perf_counter()
+                ok = await serve(*request)
+                latencies.append(time.perf_counter() - started)
+                errors.append(not ok)
+
+        async def main():
+            queue = list(reversed(requests))
+            await asyncio.gather(*(client(queue) for _ in range(clients)))
+
+        asyncio.run(main())
+        return latencies, sum(errors)
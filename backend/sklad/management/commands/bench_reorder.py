@@ -0,0 +1,92 @@
+"""
+Бенчмарк расчёта точек дозаказа: векторный проход NumPy против цикла по размерам.
+python manage.py bench_reorder --sizes 100000 --days 365 [--db]
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from sklad.benchmarks import seeded_workshops
+from sklad.reorder import compute_reorder, reorder_points
+
+
+def naive_reorder_point(demand_row, quantity, lead_time, cover_days, half_life, z):
+    """Те же формулы для одного размера на чистом Python."""
+    days = len(demand_row)
+    weights = [0.5 ** ((days - 1 - day) / half_life) for day in range(days)]
+    total = sum(weights)
+    velocity = sum(w * d for w, d in zip(weights, demand_row)) / total
+    variance = sum(w * d * d for w, d in zip(weights, demand_row)) / total - velocity * velocity
+    safety = z * math.sqrt(max(variance, 0)) * math.sqrt(lead_time)
+    return (
+        velocity,
+        math.ceil(velocity * lead_time + safety),
+        math.ceil(velocity * (lead_time + cover_days) + safety),
+        max(quantity, 0) / velocity if velocity > 0 else math.inf,
+    )
+
+
+class Command(BaseCommand):
+    help = 'Скорость расчёта рекомендаций дозаказа на синтетическом спросе (нужен numpy)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, default=100_000)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--check', type=int, default=1000, help='Сколько размеров пересчитать циклом для сверки')
+        parser.add_argument('--db', action='store_true', help='Также compute_reorder на цехах seed_benchmark')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        try:
+            import numpy as np
+        except ImportError:
+            raise CommandError('Нужен пакет numpy (pip install numpy)')
+        params = {
+            'lead_time': settings.REORDER_LEAD_TIME_DAYS,
+            'cover_days': settings.REORDER_COVER_DAYS,
+            'half_life': settings.REORDER_HALF_LIFE_DAYS,
+            'z': settings.REORDER_SERVICE_Z,
+        }
+        sizes, days = options['sizes'], options['days']
+        rng = np.random.default_rng(options['seed'])
+        # Спрос по Пуассону со скоростями по логнормальному закону; у трети размеров продаж нет
+        rates = rng.lognormal(-1.5, 1.2, sizes) * (rng.random(sizes) > 0.33)
+        demand = rng.poisson(rates[:, None], (sizes, days)).astype(np.float64)
+        quantity = rng.integers(0, 60, sizes)
+        self.stdout.write(f'Матрица спроса {sizes} × {days} ({demand.nbytes / 2**20:.0f} МБ)')
+
+        started = time.perf_counter()
+        result = reorder_points(demand, quantity, **params)
+        vector_s = time.perf_counter() - started
+
+        check = min(options['check'], sizes)
+        started = time.perf_counter()
+        for n in range(check):
+            velocity, reorder_point, order_up_to, cover = naive_reorder_point(
+                demand[n].tolist(), int(quantity[n]), **params,
+            )
+            if (
+                not math.isclose(velocity, result['velocity'][n], rel_tol=1e-9, abs_tol=1e-12)
+                or reorder_point != result['reorder_point'][n]
+                or order_up_to != result['order_up_to'][n]
+                or not math.isclose(cover, result['days_of_cover'][n], rel_tol=1e-9)
+            ):
+                raise CommandError(f'Расхождение в размере {n}')
+        naive_s = (time.perf_counter() - started) / check * sizes
+
+        self.stdout.write(f'NumPy, один проход:   {vector_s * 1000:9.1f} мс ({sizes / vector_s:,.0f} размеров/с)')
+        self.stdout.write(f'цикл по размерам:     {naive_s * 1000:9.1f} мс (оценка по {check} размерам)')
+        at_risk = int((quantity <= result['reorder_point'])[result['velocity'] > 0].sum())
+        self.stdout.write(self.style.SUCCESS(
+            f'Результаты совпадают, ускорение ×{naive_s / vector_s:.0f}; требуют дозаказа {at_risk} размеров'
+        ))
+
+        if options['db']:
+            for workshop in seeded_workshops():
+                started = time.perf_counter()
+                count = compute_reorder(workshop.pk)
+                self.stdout.write(
+                    f'{workshop.name}: compute_reorder {time.perf_counter() - started:.2f} с, {count} размеров со спросом'
+                )
@@ -0,0 +1,135 @@
+"""
+Сверка и бенчмарк быстрых сериализаторов списков против DRF ModelSerializer.
+python manage.py bench_serializers --items 5000 --orders 2000 --supplies 300
+
+Сначала проверяет, что JSON обоих путей совпадает байт в байт (товары, публичный
+список, заказы, поставки), затем сравнивает скорость в строках в секунду.
+"""
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Prefetch
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from sklad.benchmarks import bench_workshop, measure
+from sklad.fast_serializers import (
+    ITEM_FIELDS,
+    ORDER_FIELDS,
+    SUPPLY_FIELDS,
+    serialize_items,
+    serialize_orders,
+    serialize_supplies,
+)
+from sklad.imaging import VARIANTS, variant_name
+from sklad.models import Item, Order, SizeQuantity, Supply, SupplyLineItem
+from sklad.serializers import ItemListSerializer, OrderListSerializer, PublicItemListSerializer, SupplyDetailSerializer
+from sklad.services import create_supply
+from sklad.stock_summary import rebuild_item_stock
+
+
+class Command(BaseCommand):
+    help = 'Проверка идентичности JSON и скорость быстрых сериализаторов списков'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=5000)
+        parser.add_argument('--orders', type=int, default=2000)
+        parser.add_argument('--supplies', type=int, default=300)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+        request = RequestFactory().get('/api/items/', HTTP_HOST='sklad.example')
+        with bench_workshop(items=options['items']) as (workshop, user, items):
+            self._fill(workshop, user, items, rnd, options)
+            items_qs = Item.objects.filter(workshop=workshop).order_by('created_at', 'id')
+            orders_qs = Order.objects.filter(workshop=workshop).order_by('-created_at', '-id')
+            supplies_qs = Supply.objects.filter(workshop=workshop).order_by('-date', '-id')
+            # Товары строк — JOIN, а не prefetch по списку id: на SQLite Django 5.2 раскрывает
+            # такой prefetch в цепочку OR, и на тысячах строк запрос падает (Expression tree is too large)
+            supply_lines = Prefetch('line_items', queryset=SupplyLineItem.objects.select_related('item'))
+            cases = [
+                (
+                    'товары',
+                    lambda: ItemListSerializer(
+                        items_qs.select_related('workshop').prefetch_related('sizes'), many=True, context={'request': request}
+                    ).data,
+                    lambda: serialize_items(items_qs.values(*ITEM_FIELDS), request),
+                ),
+                (
+                    'публичный список',
+                    lambda: PublicItemListSerializer(
+                        items_qs.select_related('workshop').prefetch_related('sizes'), many=True, context={'request': request}
+                    ).data,
+                    lambda: serialize_items(items_qs.values(*ITEM_FIELDS), request, public=True),
+                ),
+                (
+                    'заказы',
+                    lambda: OrderListSerializer(orders_qs.all(), many=True).data,
+                    lambda: serialize_orders(orders_qs.values(*ORDER_FIELDS)),
+                ),
+                (
+                    'поставки',
+                    lambda: SupplyDetailSerializer(
+                        supplies_qs.select_related('created_by').prefetch_related(supply_lines), many=True
+                    ).data,
+                    lambda: serialize_supplies(supplies_qs.values(*SUPPLY_FIELDS)),
+                ),
+            ]
+
+            renderer = JSONRenderer()
+            self.stdout.write(f'{"список":<18} {"строк":>7} {"DRF стр/с":>11} {"SQL":>5} {"быстр. стр/с":>13} {"SQL":>5} {"×":>6}')
+            for name, slow, fast in cases:
+                expected, got = renderer.render(slow()), renderer.render(fast())
+                if expected != got:
+                    raise CommandError(f'{name}: JSON быстрого сериализатора отличается от DRF')
+                slow_s, slow_q, rows = self._best(slow, options['repeat'])
+                fast_s, fast_q, _ = self._best(fast, options['repeat'])
+                self.stdout.write(
+                    f'{name:<18} {rows:>7} {rows / slow_s:>11.0f} {slow_q:>5} {rows / fast_s:>13.0f} {fast_q:>5} {slow_s / fast_s:>6.1f}'
+                )
+        self.stdout.write(self.style.SUCCESS('JSON совпадает для всех списков'))
+
+    def _best(self, fn, repeat):
+        best = None
+        for _ in range(repeat):
+            data, elapsed, queries = measure(fn)
+            best = elapsed if best is None else min(best, elapsed)
+        return best, queries, len(data)
+
+    def _fill(self, workshop, user, items, rnd, options):
+        """Фото, описания, штрихкоды, заказы и поставки для тестового цеха."""
+        for n, item in enumerate(items):
+            item.item_description = f'Описание {n}' if n % 3 else ''
+            item.photo = f'items/фото {n}.jpg' if n % 2 else ''
+            item.price = None if n % 10 == 0 else item.price
+            if n % 4 == 1:
+                item.photo_variants = {
+                    'source': item.photo.name if n % 8 == 1 else 'items/старое.jpg',
+                    **{v: variant_name(item.pk, item.photo.name, v) for v in VARIANTS},
+                }
+        Item.objects.bulk_update(items, ['item_description', 'photo', 'photo_variants', 'price'], batch_size=1000)
+        sizes = list(SizeQuantity.objects.filter(workshop=workshop))
+        for n, size in enumerate(sizes):
+            size.barcode = f'20{n:011d}' if n % 4 else None
+            size.quantity = rnd.randrange(50)
+        SizeQuantity.objects.bulk_update(sizes, ['barcode', 'quantity'], batch_size=1000)
+        rebuild_item_stock([workshop.pk])
+
+        statuses = [code for code, _ in Order.STATUS_CHOICES]
+        Order.objects.bulk_create([
+            Order(
+                workshop=workshop,
+                source=rnd.choice(('Wildberries', 'Ozon', 'Сайт')),
+                delivery_address=f'г. Москва, ул. Тестовая, д. {n}',
+                client_phone=f'+7900{n:07d}',
+                total=f'{rnd.randrange(100000) / 100:.2f}',
+                status=rnd.choice(statuses),
+            )
+            for n in range(options['orders'])
+        ], batch_size=1000)
+
+        for _ in range(options['supplies']):
+            lines = [(item.id, rnd.choice(('S', 'M', 'L')), rnd.randrange(1, 20)) for item in rnd.sample(items, 5)]
+            create_supply('in', lines, created_by=user)
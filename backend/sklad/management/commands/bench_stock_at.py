@@ -0,0 +1,74 @@
+"""
+Бенчмарк остатков на дату: срез + хвост движений против полного пересчёта журнала.
+python manage.py bench_stock_at --sizes 300 --days 365 --per-day 200
+"""
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Sum
+from django.utils import timezone
+
+from sklad.benchmarks import bench_workshop, measure
+from sklad.ledger import stock_at, take_snapshot
+from sklad.models import SizeQuantity, StockMovement
+
+
+def naive_stock_at(workshop_id, at):
+    """Полный пересчёт: сумма всех движений до момента at."""
+    rows = (
+        StockMovement.objects.filter(workshop_id=workshop_id, created_at__lte=at)
+        .values('size_id').annotate(total=Sum('delta')).order_by()
+    )
+    return {row['size_id']: row['total'] for row in rows if row['total']}
+
+
+class Command(BaseCommand):
+    help = 'Сравнение stock_at (срез + хвост) с полным пересчётом журнала движений'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, default=300)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--per-day', type=int, default=200, help='Движений в день')
+        parser.add_argument('--snapshot-every', type=int, default=7, help='Срез раз в N дней')
+        parser.add_argument('--queries', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+        days = options['days']
+        labels = ('S', 'M', 'L')
+        with bench_workshop(items=options['sizes'] // len(labels) + 1, sizes=labels) as (workshop, _, _items):
+            size_ids = list(SizeQuantity.objects.filter(workshop=workshop).values_list('id', flat=True))
+            start = timezone.now() - timedelta(days=days)
+
+            self.stdout.write(f'Генерация {days * options["per_day"]} движений...')
+            for day in range(days):
+                day_start = start + timedelta(days=day)
+                StockMovement.objects.bulk_create([
+                    StockMovement(
+                        workshop=workshop,
+                        size_id=rnd.choice(size_ids),
+                        delta=rnd.choice((5, 10, -1, -2, -3)),
+                        reason=StockMovement.REASON_ADJUSTMENT,
+                        created_at=day_start + timedelta(seconds=rnd.randrange(86400)),
+                    )
+                    for _ in range(options['per_day'])
+                ], batch_size=1000)
+            for day in range(0, days, options['snapshot_every']):
+                take_snapshot(workshop.pk, start + timedelta(days=day))
+
+            moments = [start + timedelta(seconds=rnd.randrange(days * 86400)) for _ in range(options['queries'])]
+            fast_total = naive_total = 0.0
+            for at in moments:
+                fast, fast_s, fast_q = measure(stock_at, workshop.pk, at)
+                naive, naive_s, _ = measure(naive_stock_at, workshop.pk, at)
+                if fast != naive:
+                    raise CommandError(f'Расхождение остатков на {at}')
+                fast_total += fast_s
+                naive_total += naive_s
+
+            n = len(moments)
+            self.stdout.write(f'срез + хвост:     {fast_total / n * 1000:8.2f} мс/запрос ({fast_q} SQL)')
+            self.stdout.write(f'полный пересчёт:  {naive_total / n * 1000:8.2f} мс/запрос')
+            self.stdout.write(self.style.SUCCESS(f'Результаты совпадают, ускорение ×{naive_total / fast_total:.1f}'))
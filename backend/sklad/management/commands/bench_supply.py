@@ -0,0 +1,35 @@
+"""Бенчмарк проведения поставок: python manage.py bench_supply --lines 10 100 300"""
+from django.core.management.base import BaseCommand
+
+from sklad.benchmarks import bench_workshop, measure
+from sklad.services import create_supply
+
+
+class Command(BaseCommand):
+    help = 'Замер числа SQL-запросов и времени create_supply в зависимости от числа строк'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, nargs='+', default=[1, 10, 100, 300, 1000])
+        parser.add_argument('--repeat', type=int, default=3, help='Повторов на каждый размер документа')
+
+    def handle(self, *args, **options):
+        max_lines = max(options['lines'])
+        sizes = ('XS', 'S', 'M', 'L', 'XL')
+        items_needed = max_lines // len(sizes) + 1
+
+        self.stdout.write(f'{"строк":>8} {"запросов":>9} {"мс (лучш.)":>11} {"мс/строку":>10}')
+        with bench_workshop(items=items_needed, sizes=sizes, quantity=0) as (_, user, items):
+            all_lines = [
+                (item.id, label, 1)
+                for item in items
+                for label in sizes
+            ]
+            for n in options['lines']:
+                lines = all_lines[:n]
+                best, queries = None, 0
+                for _ in range(options['repeat']):
+                    _, elapsed, queries = measure(create_supply, 'in', lines, created_by=user)
+                    best = elapsed if best is None else min(best, elapsed)
+                self.stdout.write(
+                    f'{n:>8} {queries:>9} {best * 1000:>11.1f} {best * 1000 / n:>10.3f}'
+                )
@@ -0,0 +1,59 @@
+"""
+Построение миниатюр и WebP для уже загруженных фото товаров.
+python manage.py build_photo_variants --workers 4 [--force]
+"""
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from django.core.management.base import BaseCommand
+
+from sklad.imaging import render_variants
+from sklad.models import Item
+from sklad.photos import create_pool, photo_source, store_variants, variants_stale
+
+
+class Command(BaseCommand):
+    help = 'Построить производные фото (миниатюры, WebP) для товаров, у которых их нет или они устарели'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='Процессов Pillow')
+        parser.add_argument('--force', action='store_true', help='Перестроить и актуальные производные')
+
+    def handle(self, *args, **options):
+        items = Item.objects.exclude(photo='').exclude(photo__isnull=True).only('id', 'photo', 'photo_variants')
+        todo = [(item.pk, item.photo.name) for item in items.iterator() if options['force'] or variants_stale(item)]
+        self.stdout.write(f'Фото к обработке: {len(todo)}')
+
+        workers = max(1, options['workers'])
+        done = failed = 0
+        started = time.perf_counter()
+        with create_pool(workers) as pool:
+            pending = {}
+            queue = iter(todo)
+            while True:
+                # Не больше 2 задач на процесс в полёте: байты оригиналов не копятся в памяти
+                for item_id, name in queue:
+                    try:
+                        pending[pool.submit(render_variants, photo_source(name))] = (item_id, name)
+                    except OSError as e:
+                        failed += 1
+                        self.stderr.write(f'{name}: {e}')
+                    if len(pending) >= workers * 2:
+                        break
+                if not pending:
+                    break
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    item_id, name = pending.pop(future)
+                    try:
+                        if store_variants(item_id, name, future.result()):
+                            done += 1
+                    except Exception as e:
+                        failed += 1
+                        self.stderr.write(f'{name}: {e}')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {done}, ошибок: {failed}, {elapsed:.1f} с ({done / elapsed if elapsed else 0:.1f} фото/с)'
+        ))
@@ -0,0 +1,44 @@
+"""Сверка сводки остатков товаров с размерами: python manage.py check_item_stock [--workshop <uuid>] [--fix]"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from sklad.models import Workshop
+from sklad.stock_summary import refresh_item_stock, stock_mismatches
+
+SHOW_LIMIT = 20
+
+
+class Command(BaseCommand):
+    help = 'Проверить Item.total_quantity и in_stock_sizes по SizeQuantity (с --fix — пересчитать)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workshop', help='UUID цеха (по умолчанию — все цеха)')
+        parser.add_argument('--fix', action='store_true', help='Пересчитать сводку товаров с расхождениями')
+
+    def handle(self, *args, **options):
+        workshop_ids = None
+        if options['workshop']:
+            if not Workshop.objects.filter(pk=options['workshop']).exists():
+                raise CommandError(f'Цех {options["workshop"]} не найден')
+            workshop_ids = [options['workshop']]
+
+        mismatches = list(stock_mismatches(workshop_ids))
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('Сводка остатков совпадает с размерами'))
+            return
+        for item_id, total, in_stock, expected_total, expected_in_stock in mismatches[:SHOW_LIMIT]:
+            self.stdout.write(
+                f'{item_id}: total_quantity {total} (по размерам {expected_total}), '
+                f'in_stock_sizes {in_stock} (по размерам {expected_in_stock})'
+            )
+        if len(mismatches) > SHOW_LIMIT:
+            self.stdout.write(f'… и ещё {len(mismatches) - SHOW_LIMIT}')
+        if not options['fix']:
+            raise CommandError(f'Расхождений: {len(mismatches)}; пересчитать — --fix')
+
+        with transaction.atomic():
+            refresh_item_stock(item_id for item_id, *_ in mismatches)
+            left = stock_mismatches(workshop_ids).count()
+        if left:
+            raise CommandError(f'После пересчёта осталось расхождений: {left}')
+        self.stdout.write(self.style.SUCCESS(f'Исправлено товаров: {len(mismatches)}'))
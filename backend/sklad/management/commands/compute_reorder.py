@@ -0,0 +1,32 @@
+"""Пересчёт рекомендаций дозаказа: python manage.py compute_reorder (запускать по cron, например раз в сутки ночью)"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sklad.models import Workshop
+from sklad.reorder import compute_reorder
+
+
+class Command(BaseCommand):
+    help = 'Пересчитать скорость продаж и точки дозаказа всех размеров (нужен numpy)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workshop', help='UUID цеха (по умолчанию — все цеха)')
+
+    def handle(self, *args, **options):
+        if options['workshop']:
+            if not Workshop.objects.filter(pk=options['workshop']).exists():
+                raise CommandError(f'Цех {options["workshop"]} не найден')
+            workshop_ids = [options['workshop']]
+        else:
+            workshop_ids = [None] + list(Workshop.objects.values_list('id', flat=True))
+        started = time.perf_counter()
+        total = 0
+        try:
+            for workshop_id in workshop_ids:
+                total += compute_reorder(workshop_id)
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f'Рекомендации пересчитаны: {total} размеров со спросом за {time.perf_counter() - started:.1f} с'
+        ))
@@ -0,0 +1,39 @@
+"""Фоновые задачи, исчерпавшие попытки: python manage.py dead_jobs [--requeue [id ...]] [--delete [id ...]]"""
+from django.core.management.base import BaseCommand, CommandError
+
+from sklad.jobs import requeue_dead
+from sklad.models import Job
+
+SHOW_LIMIT = 50
+
+
+class Command(BaseCommand):
+    help = 'Показать задачи со статусом dead; --requeue — вернуть в очередь, --delete — удалить (без id — все)'
+
+    def add_arguments(self, parser):
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument('--requeue', nargs='*', type=int, metavar='ID', help='Вернуть в очередь')
+        group.add_argument('--delete', nargs='*', type=int, metavar='ID', help='Удалить')
+
+    def handle(self, *args, **options):
+        dead = Job.objects.filter(status=Job.STATUS_DEAD)
+        if options['requeue'] is not None:
+            count = requeue_dead(options['requeue'] or None)
+            self.stdout.write(self.style.SUCCESS(f'Возвращено в очередь: {count}'))
+            return
+        if options['delete'] is not None:
+            if options['delete']:
+                dead = dead.filter(id__in=options['delete'])
+            count = dead.delete()[0]
+            self.stdout.write(self.style.SUCCESS(f'Удалено: {count}'))
+            return
+
+        total = dead.count()
+        for job in dead.order_by('-id')[:SHOW_LIMIT]:
+            error = job.last_error.strip().splitlines()[-1] if job.last_error.strip() else ''
+            self.stdout.write(f'#{job.pk} {job.name} попыток {job.attempts}, создана {job.created_at:%Y-%m-%d %H:%M}: {error}')
+        if total > SHOW_LIMIT:
+            self.stdout.write(f'… и ещё {total - SHOW_LIMIT}')
+        if total:
+            raise CommandError(f'Задач со статусом dead: {total}')
+        self.stdout.write(self.style.SUCCESS('Задач со статусом dead нет'))
@@ -0,0 +1,38 @@
+"""Выгрузка данных цеха: python manage.py export_data orders --format csv --workshop <uuid> --output orders.csv"""
+from django.core.management.base import BaseCommand, CommandError
+
+from sklad.exports import DATASETS, FORMATS, export_rows, parse_bound, render
+from sklad.models import Workshop
+
+
+class Command(BaseCommand):
+    help = 'Потоковая выгрузка товаров, поставок или заказов цеха в NDJSON/CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(DATASETS))
+        parser.add_argument('--format', dest='fmt', choices=sorted(FORMATS), default='ndjson')
+        parser.add_argument('--workshop', help='UUID цеха (по умолчанию — данные без цеха)')
+        parser.add_argument('--date-from', help='Начало периода: дата или ISO дата-время')
+        parser.add_argument('--date-to', help='Конец периода; дата включает весь день')
+        parser.add_argument('--output', help='Файл (по умолчанию stdout)')
+
+    def handle(self, *args, **options):
+        workshop = None
+        if options['workshop']:
+            workshop = Workshop.objects.filter(pk=options['workshop']).first()
+            if workshop is None:
+                raise CommandError(f'Цех {options["workshop"]} не найден')
+        try:
+            date_from = parse_bound(options['date_from'])
+            date_to = parse_bound(options['date_to'], end=True)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        names, rows = export_rows(options['dataset'], workshop, date_from, date_to)
+        chunks = render(options['fmt'], names, rows)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as f:
+                f.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
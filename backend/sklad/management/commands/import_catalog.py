@@ -0,0 +1,45 @@
+"""Импорт каталога цеха: python manage.py import_catalog items.xlsx --workshop <uuid> [--dry-run] [--report report.json]"""
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sklad.imports import ImportFileError, import_catalog
+from sklad.models import Workshop
+
+
+class Command(BaseCommand):
+    help = 'Импорт товаров, размеров, остатков и штрихкодов из CSV/XLSX (формат как у выгрузки items)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--workshop', help='UUID цеха (по умолчанию — данные без цеха)')
+        parser.add_argument('--dry-run', action='store_true', help='Только проверить файл')
+        parser.add_argument('--report', help='Записать полный отчёт (с ошибками по строкам) в JSON')
+
+    def handle(self, *args, **options):
+        workshop = None
+        if options['workshop']:
+            workshop = Workshop.objects.filter(pk=options['workshop']).first()
+            if workshop is None:
+                raise CommandError(f'Цех {options["workshop"]} не найден')
+        fmt = options['path'].rsplit('.', 1)[-1].lower()
+
+        started = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as f:
+                report = import_catalog(workshop, f, fmt, dry_run=options['dry_run'])
+        except (ImportFileError, OSError) as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+
+        for error in report['errors'][:20]:
+            self.stderr.write(f'строка {error["row"]}: ' + '; '.join(f'{k}: {v}' for k, v in error['errors'].items()))
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Проверено" if report["dry_run"] else "Импортировано"} {report["imported_rows"]} из {report["rows"]} строк '
+            f'за {elapsed:.1f} с: товаров +{report["items_created"]} / ~{report["items_updated"]}, '
+            f'размеров +{report["sizes_created"]} / ~{report["sizes_updated"]}, ошибок {report["error_count"]}'
+        ))
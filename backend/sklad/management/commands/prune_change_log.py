@@ -0,0 +1,24 @@
+"""Удаление старых записей журнала синхронизации: python manage.py prune_change_log (по cron, например раз в сутки)"""
+from django.core.management.base import BaseCommand
+
+from sklad.models import ChangeLogEntry
+from sklad.sync import log_cutoff
+
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    # Срок только из настройки: по нему же /api/sync/ решает, что токен устарел (reset)
+    help = 'Удалить записи журнала изменений старше SYNC_LOG_RETENTION_DAYS дней'
+
+    def handle(self, *args, **options):
+        cutoff = log_cutoff()
+        stale = ChangeLogEntry.objects.filter(created_at__lt=cutoff)
+        total = 0
+        # Порциями: короткие транзакции не держат блокировки на время всей чистки
+        while True:
+            ids = list(stale.order_by('id').values_list('id', flat=True)[:BATCH_SIZE])
+            if not ids:
+                break
+            total += ChangeLogEntry.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f'Удалено записей журнала: {total}'))
@@ -0,0 +1,32 @@
+"""Удаление старых ключей идемпотентности: python manage.py purge_idempotency_keys (по cron, например раз в час)"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from sklad.models import IdempotencyKey
+
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = 'Удалить сохранённые ответы по Idempotency-Key старше --hours часов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours', type=int, default=settings.IDEMPOTENCY_KEY_TTL_HOURS,
+            help='Срок хранения ключа (по умолчанию IDEMPOTENCY_KEY_TTL_HOURS)',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        stale = IdempotencyKey.objects.filter(created_at__lt=cutoff)
+        total = 0
+        # Порциями: короткие транзакции не держат блокировки на время всей чистки
+        while True:
+            ids = list(stale.order_by('id').values_list('id', flat=True)[:BATCH_SIZE])
+            if not ids:
+                break
+            total += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f'Удалено ключей: {total}'))
@@ -0,0 +1,36 @@
+"""Пересчёт дневных итогов из истории: python manage.py rebuild_rollups [--workshop <uuid>] [--date-from 2026-01-01] [--date-to ...]"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from sklad.models import Workshop
+from sklad.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Пересчитать дневные итоги продаж и поставок (DailyRollup) по заказам и поставкам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workshop', help='UUID цеха (по умолчанию — все цеха)')
+        parser.add_argument('--date-from', help='Первый день (включительно), YYYY-MM-DD')
+        parser.add_argument('--date-to', help='Последний день (включительно), YYYY-MM-DD')
+
+    def handle(self, *args, **options):
+        workshop_ids = None
+        if options['workshop']:
+            if not Workshop.objects.filter(pk=options['workshop']).exists():
+                raise CommandError(f'Цех {options["workshop"]} не найден')
+            workshop_ids = [options['workshop']]
+        bounds = {}
+        for name in ('date_from', 'date_to'):
+            if options[name]:
+                bounds[name] = parse_date(options[name])
+                if bounds[name] is None:
+                    raise CommandError(f'Неверная дата: {options[name]}')
+
+        started = time.perf_counter()
+        rows = rebuild_rollups(workshop_ids=workshop_ids, **bounds)
+        self.stdout.write(self.style.SUCCESS(
+            f'Итоги пересчитаны: {rows} строк за {time.perf_counter() - started:.1f} с'
+        ))
@@ -0,0 +1,295 @@
+"""
+Бенчмарк всех эндпоинтов sklad/urls.py через тестовый клиент Django.
+python manage.py seed_benchmark && python manage.py run_benchmarks --output report.json [--baseline old.json]
+
+Для каждого сценария: задержка (p50/p90/p95/p99, мс), число SQL-запросов, размер ответа.
+Запросы идут с настоящим JWT пользователя цеха из seed_benchmark. Изменяющие запросы
+выполняются в транзакции с откатом — данные между прогонами не меняются.
+С --baseline печатается сравнение и команда падает, если p95 или число запросов
+выросли больше порога.
+"""
+import json
+import platform
+import statistics
+import time
+from datetime import timedelta
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, URLResolver, reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from sklad import urls as sklad_urls
+from sklad.authentication import tokens_for_user
+from sklad.benchmarks import SEED_PASSWORD, seeded_workshops
+from sklad.models import Item, Order, SizeQuantity, Supply
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def _url_names(patterns):
+    names = set()
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            names |= _url_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            names.add(pattern.name)
+    return names
+
+
+def _percentile(sorted_values, p):
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    k = (len(sorted_values) - 1) * p / 100
+    low = int(k)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (k - low)
+
+
+class Fixture:
+    """Объекты цеха, на которых гоняются сценарии (детерминированно: первые по порядку)."""
+
+    def __init__(self, workshop):
+        self.workshop = workshop
+        self.user = workshop.assignments.select_related('user').first().user
+        items = Item.objects.filter(workshop=workshop).order_by('created_at', 'id')
+        self.item = items.filter(sizes__barcode__isnull=False).first()
+        self.size = SizeQuantity.objects.filter(item=self.item).exclude(barcode=None).order_by('size_label').first()
+        self.barcodes = list(
+            SizeQuantity.objects.filter(workshop=workshop).exclude(barcode=None).order_by('barcode').values_list('barcode', flat=True)[:100]
+        )
+        self.supply = Supply.objects.filter(workshop=workshop).order_by('-date').first()
+        self.order = Order.objects.filter(workshop=workshop).order_by('-created_at').first()
+        self.new_order = Order.objects.filter(workshop=workshop, status=Order.STATUS_NEW).order_by('-created_at').first() or self.order
+        self.open_orders = list(
+            Order.objects.filter(workshop=workshop).exclude(status=Order.STATUS_CANCELLED)
+            .order_by('-created_at').values_list('id', flat=True)[:200]
+        )
+        in_stock = SizeQuantity.objects.filter(workshop=workshop, quantity__gt=0).order_by('-quantity').first()
+        self.stock_line = {'item_id': str(in_stock.item_id), 'size_label': in_stock.size_label, 'quantity': 1}
+        self.import_csv = ('item_id,size_label,quantity\n' + ''.join(
+            f'{item_id},{label},{quantity + 1}\n'
+            for item_id, label, quantity in SizeQuantity.objects.filter(workshop=workshop)
+            .order_by('item__created_at', 'size_label').values_list('item_id', 'size_label', 'quantity')[:100]
+        )).encode()
+        # Первое слово названия товара: префикс и он же с опечаткой
+        word = self.item.name.split()[0].lower()
+        self.search_query = word[:4]
+        self.search_typo = word[:2] + word[3:]
+        self.refresh = str(tokens_for_user(self.user))
+        self.sync_token = None
+        self.etag = None
+
+
+def scenarios(f):
+    """(метка, имя URL, метод, kwargs URL, query или тело, изменяет ли данные)."""
+    day = timezone.localdate() - timedelta(days=30)
+    item, size = str(f.item.pk), str(f.size.pk)
+    return [
+        ('api-root', 'api-root', 'get', {}, None, False),
+        ('schema', 'schema', 'get', {}, None, False),
+        ('swagger-ui', 'swagger-ui', 'get', {}, None, False),
+        ('redoc', 'redoc', 'get', {}, None, False),
+        ('auth: login', 'login', 'post', {}, {'username': f.user.username, 'password': SEED_PASSWORD}, True),
+        ('auth: refresh', 'token_refresh', 'post', {}, lambda: {'refresh': f.refresh}, False),
+        ('public: items', 'public-items', 'get', {}, {'workshop_id': str(f.workshop.pk)}, False),
+        ('public: items (304)', 'public-items', 'get', {}, {'workshop_id': str(f.workshop.pk)}, False),
+        ('public: search', 'public-items', 'get', {}, {'workshop_id': str(f.workshop.pk), 'q': f.search_query}, False),
+        ('public: in stock by price', 'public-items', 'get', {}, {
+            'workshop_id': str(f.workshop.pk), 'in_stock': 'true', 'ordering': 'price', 'limit': '24',
+        }, False),
+        ('public: size, price range', 'public-items', 'get', {}, {
+            'workshop_id': str(f.workshop.pk), 'size_label': 'M', 'price_min': '500', 'price_max': '3000',
+            'ordering': '-created_at', 'limit': '24', 'offset': '48',
+        }, False),
+        ('public: item', 'public-item-detail', 'get', {'pk': item}, None, False),
+        ('items: list', 'item-list', 'get', {}, None, False),
+        ('items: page', 'item-list', 'get', {}, {'page_size': 50}, False),
+        ('items: search', 'item-list', 'get', {}, {'q': f.search_query}, False),
+        ('items: search (typo)', 'item-list', 'get', {}, {'q': f.search_typo}, False),
+        ('items: create', 'item-list', 'post', {}, {'name': 'Бенчмарк', 'price': '990.00'}, True),
+        ('items: detail', 'item-detail', 'get', {'pk': item}, None, False),
+        ('items: patch', 'item-detail', 'patch', {'pk': item}, {'price': '1990.00'}, True),
+        ('items: reorder', 'item-reorder', 'get', {}, None, False),
+        ('items: delete', 'item-detail', 'delete', {'pk': item}, None, True),
+        ('sizes: list', 'item-sizes-list', 'get', {'item_pk': item}, None, False),
+        ('sizes: create', 'item-sizes-list', 'post', {'item_pk': item}, {'size_label': 'BENCH'}, True),
+        ('sizes: patch', 'item-size-detail', 'patch', {'item_pk': item, 'pk': size}, {'quantity': 7}, True),
+        ('sizes: delete', 'item-size-detail', 'delete', {'item_pk': item, 'pk': size}, None, True),
+        ('sizes: by barcode', 'size-by-barcode', 'get', {}, {'barcode': f.size.barcode}, False),
+        ('sizes: by barcode batch', 'size-by-barcode-batch', 'post', {}, {'barcodes': f.barcodes}, False),
+        ('supplies: list', 'supply-list', 'get', {}, None, False),
+        ('supplies: page', 'supply-list', 'get', {}, {'page_size': 50}, False),
+        ('supplies: by item', 'supply-list', 'get', {}, {'item_id': item}, False),
+        ('supplies: detail', 'supply-detail', 'get', {'pk': str(f.supply.pk)}, None, False),
+        ('supplies: create', 'supply-list', 'post', {}, {'type': 'in', 'lines': [f.stock_line]}, True),
+        ('orders: list', 'order-list', 'get', {}, None, False),
+        ('orders: page', 'order-list', 'get', {}, {'page_size': 50}, False),
+        ('orders: detail', 'order-detail', 'get', {'pk': f.order.pk}, None, False),
+        ('orders: create', 'order-list', 'post', {}, {'source': 'Бенчмарк', 'delivery_address': '-', 'client_phone': '-', 'lines': [f.stock_line]}, True),
+        ('orders: patch', 'order-detail', 'patch', {'pk': f.new_order.pk}, {'delivery_address': 'Новый адрес'}, True),
+        ('orders: cancel', 'order-set-status', 'post', {'pk': f.new_order.pk}, {'status': Order.STATUS_CANCELLED}, True),
+        (
+            'orders: bulk deliver 200', 'order-bulk-set-status', 'post', {},
+            {'ids': f.open_orders, 'status': Order.STATUS_DELIVERED}, True,
+        ),
+        (
+            'orders: bulk cancel 200', 'order-bulk-set-status', 'post', {},
+            {'ids': f.open_orders, 'status': Order.STATUS_CANCELLED}, True,
+        ),
+        (
+            'import: 100 rows', 'import-items', 'post', {},
+            lambda: {'file': SimpleUploadedFile('items.csv', f.import_csv)}, True,
+        ),
+        ('sync: full', 'sync', 'get', {}, None, False),
+        ('sync: delta', 'sync', 'get', {}, lambda: {'since': f.sync_token} if f.sync_token else {}, False),
+        ('stock: at', 'stock-at', 'get', {}, {'at': day.isoformat()}, False),
+        ('analytics: totals', 'analytics-sales', 'get', {}, None, False),
+        ('analytics: by day', 'analytics-sales', 'get', {}, {'group_by': 'day'}, False),
+        (
+            'analytics: top sizes by revenue', 'analytics-sales', 'get', {},
+            {'group_by': 'size', 'metric': 'revenue', 'limit': 20}, False,
+        ),
+        ('export: items.ndjson', 'export', 'get', {'dataset': 'items', 'fmt': 'ndjson'}, None, False),
+        ('export: orders.csv', 'export', 'get', {'dataset': 'orders', 'fmt': 'csv'}, None, False),
+        # Пользователь цеха не staff: замеряется отказ (403)
+        ('metrics (403)', 'metrics', 'get', {}, None, False),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Задержки и число SQL-запросов всех эндпоинтов API на данных seed_benchmark'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workshop', help='Имя цеха (по умолчанию первый из seed_benchmark)')
+        parser.add_argument('--repeat', type=int, default=20, help='Замеров на сценарий')
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--only', help='Только сценарии, метка которых содержит подстроку')
+        parser.add_argument('--output', help='Куда записать JSON-отчёт')
+        parser.add_argument('--baseline', help='JSON-отчёт для сравнения')
+        parser.add_argument('--threshold', type=float, default=25.0, help='Допустимый рост p95, %%')
+
+    def handle(self, *args, **options):
+        workshops = seeded_workshops()
+        if options['workshop']:
+            workshops = workshops.model.objects.filter(name=options['workshop'])
+        workshop = workshops.first()
+        if workshop is None:
+            raise CommandError('Нет данных: сначала выполните manage.py seed_benchmark')
+        fixture = Fixture(workshop)
+        cases = scenarios(fixture)
+        uncovered = _url_names(sklad_urls.urlpatterns) - {case[1] for case in cases}
+        if uncovered:
+            self.stderr.write(f'Эндпоинты без сценария: {", ".join(sorted(uncovered))}')
+        if options['only']:
+            cases = [case for case in cases if options['only'] in case[0]]
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens_for_user(fixture.user).access_token}')
+        results = {}
+        self.stdout.write(f'{"сценарий":<26} {"код":>4} {"p50":>9} {"p95":>9} {"p99":>9}')
+        with override_settings(ALLOWED_HOSTS=['*']):
+            for case in cases:
+                results[case[0]] = self._run(client, fixture, *case, repeat=options['repeat'], warmup=options['warmup'])
+                self._print_row(case[0], results[case[0]])
+
+        report = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'workshop': workshop.name,
+                'items': Item.objects.filter(workshop=workshop).count(),
+                'orders': Order.objects.filter(workshop=workshop).count(),
+                'repeat': options['repeat'],
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Отчёт: {options["output"]}'))
+        if options['baseline']:
+            self._compare(report, options['baseline'], options['threshold'])
+
+    def _request(self, client, fixture, label, name, method, kwargs, data):
+        url = reverse(name, kwargs=kwargs)
+        data = data() if callable(data) else data
+        headers = {}
+        if label.endswith('(304)') and fixture.etag:
+            headers['HTTP_IF_NONE_MATCH'] = fixture.etag
+        if method == 'get':
+            response = client.get(url, data or {}, **headers)
+        else:
+            multipart = any(isinstance(value, SimpleUploadedFile) for value in (data or {}).values())
+            response = getattr(client, method)(url, data, format='multipart' if multipart else 'json', **headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        if name == 'sync' and response.status_code == 200 and not fixture.sync_token:
+            fixture.sync_token = json.loads(body)['token']
+        if name == 'public-items' and response.has_header('ETag'):
+            fixture.etag = response['ETag']
+        return response.status_code, len(body)
+
+    def _run(self, client, fixture, label, name, method, kwargs, data, writes, repeat, warmup):
+        timings, queries = [], []
+        status = size = None
+        for n in range(warmup + repeat):
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    status, size = self._request(client, fixture, label, name, method, kwargs, data)
+                    elapsed = time.perf_counter() - started
+                if writes:
+                    transaction.set_rollback(True)
+            if n >= warmup:
+                timings.append(elapsed * 1000)
+                queries.append(len(ctx.captured_queries))
+        timings.sort()
+        result = {
+            'method': method.upper(),
+            'url': name,
+            'status': status,
+            'bytes': size,
+            'queries': statistics.median(queries),
+            'queries_max': max(queries),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'max_ms': round(timings[-1], 3),
+        }
+        for p in PERCENTILES:
+            result[f'p{p}_ms'] = round(_percentile(timings, p), 3)
+        return result
+
+    def _print_row(self, label, r):
+        self.stdout.write(
+            f'{label:<26} {r["status"]:>4} {r["p50_ms"]:>9.2f} {r["p95_ms"]:>9.2f} {r["p99_ms"]:>9.2f} мс '
+            f'{r["queries"]:>5g} SQL {r["bytes"]:>9} Б'
+        )
+
+    def _compare(self, report, path, threshold):
+        with open(path, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        self.stdout.write(f'\nСравнение с {path} (порог роста p95: {threshold:.0f}%)')
+        regressions = []
+        for label, r in report['results'].items():
+            old = baseline.get(label)
+            if old is None:
+                self.stdout.write(f'{label:<26} новый сценарий')
+                continue
+            change = (r['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100 if old['p95_ms'] else 0.0
+            line = (
+                f'{label:<26} p95 {old["p95_ms"]:>9.2f} → {r["p95_ms"]:>9.2f} мс ({change:+6.1f}%)  '
+                f'SQL {old["queries"]} → {r["queries"]}'
+            )
+            if change > threshold or r['queries'] > old['queries']:
+                regressions.append(label)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+        if regressions:
+            raise CommandError(f'Регрессии: {", ".join(regressions)}')
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
@@ -0,0 +1,64 @@
+"""
+Воркер очереди фоновых задач (sklad.jobs):
+python manage.py run_worker [--threads 4] [--once]
+
+Забирает готовые задачи не больше, чем свободных потоков, и выполняет их в пуле
+потоков. Воркеров можно запустить несколько (на разных машинах): задачу получает
+только один. SIGTERM/SIGINT — новые задачи не берутся, текущие дорабатывают.
+"""
+import os
+import signal
+import socket
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from sklad import jobs
+
+# Как часто (в циклах опроса) возвращать в очередь зависшие задачи
+STALE_CHECK_EVERY = 60
+
+
+class Command(BaseCommand):
+    help = 'Выполнять фоновые задачи из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help='Одновременных задач')
+        parser.add_argument('--once', action='store_true', help='Выполнить готовые задачи и выйти')
+
+    def handle(self, *args, **options):
+        threads = max(1, options['threads'])
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        stop = threading.Event()
+        if not options['once']:
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(sig, lambda *_: stop.set())
+            self.stdout.write(f'Воркер {worker}: потоков {threads}')
+
+        done = failed = 0
+        pending = set()
+        with ThreadPoolExecutor(threads, thread_name_prefix='job') as pool:
+            loops = 0
+            while True:
+                if loops % STALE_CHECK_EVERY == 0 and (requeued := jobs.requeue_stale()):
+                    self.stdout.write(f'Возвращено зависших задач: {requeued}')
+                loops += 1
+                if not stop.is_set() and len(pending) < threads:
+                    pending.update(pool.submit(jobs.run, job) for job in jobs.claim(worker, threads - len(pending)))
+                    close_old_connections()
+                if not pending:
+                    if stop.is_set() or options['once']:
+                        break
+                    stop.wait(settings.JOB_POLL_SECONDS)
+                    continue
+                finished, pending = wait(pending, timeout=settings.JOB_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    if future.result():
+                        done += 1
+                    else:
+                        failed += 1
+        self.stdout.write(self.style.SUCCESS(f'Выполнено задач: {done}, с ошибкой: {failed}'))
+
@@ -0,0 +1,231 @@
+"""
+Синтетические данные для бенчмарков: python manage.py seed_benchmark --workshops 3 --items 2000
+
+Цеха seed-1..N с пользователем того же имени (пароль bench-password), товары с сетками
+размеров и штрихкодами, поставки и заказы за последние --days дней, журнал движений
+(начальный остаток + поставки + заказы сходятся с текущими остатками) и дневные итоги
+(rebuild_rollups). Всё пишется bulk_create, сигналы не вызываются. Генерация детерминирована (--seed).
+"""
+import random
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from sklad.benchmarks import SEED_PASSWORD, SEED_PREFIX, seeded_workshops
+from sklad.rollups import rebuild_rollups
+from sklad.stock_summary import rebuild_item_stock
+from sklad.models import (
+    Item,
+    Order,
+    OrderLineItem,
+    SizeQuantity,
+    StockMovement,
+    Supply,
+    SupplyLineItem,
+    SupplyNumberCounter,
+    Workshop,
+    WorkshopAssignment,
+)
+
+# Сетка размеров → вес (одежда чаще обуви и безразмерных товаров)
+SIZE_GRIDS = [
+    (('XS', 'S', 'M', 'L', 'XL', 'XXL'), 60),
+    (tuple(str(n) for n in range(36, 46)), 25),
+    (('ONE',), 15),
+]
+SOURCES = [('Wildberries', 50), ('Ozon', 30), ('Сайт', 12), ('Instagram', 8)]
+BATCH = 2000
+
+
+def _weighted(rnd, pairs):
+    values, weights = zip(*pairs)
+    return rnd.choices(values, weights)[0]
+
+
+@contextmanager
+def _explicit_dates():
+    """auto_now / auto_now_add не перезаписывают заданные даты (вместо bulk_update после вставки)."""
+    fields = [
+        (field, field.auto_now, field.auto_now_add)
+        for model in (Item, Supply, Order)
+        for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    for field, _, _ in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in fields:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _ean13(prefix: str) -> str:
+    digits = [int(d) for d in prefix[:12]]
+    check = (10 - sum(d * (3 if n % 2 else 1) for n, d in enumerate(digits)) % 10) % 10
+    return prefix[:12] + str(check)
+
+
+class Command(BaseCommand):
+    help = 'Сгенерировать цеха, товары, размеры, поставки и заказы для бенчмарков'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workshops', type=int, default=3)
+        parser.add_argument('--items', type=int, default=2000, help='Товаров на цех')
+        parser.add_argument('--supplies', type=int, default=500, help='Поставок на цех')
+        parser.add_argument('--orders', type=int, default=3000, help='Заказов на цех')
+        parser.add_argument('--days', type=int, default=180, help='Глубина истории')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--clear', action='store_true', help='Удалить ранее сгенерированные цеха')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            seeded_workshops().delete()
+            User.objects.filter(username__startswith=f'{SEED_PREFIX}-').delete()
+        start = seeded_workshops().count()
+        rnd = random.Random(options['seed'] + start)
+        password = make_password(SEED_PASSWORD)
+        for n in range(start + 1, start + options['workshops'] + 1):
+            with transaction.atomic(), _explicit_dates():
+                counts = self._seed_workshop(f'{SEED_PREFIX}-{n}', password, rnd, options)
+            self.stdout.write(f'{SEED_PREFIX}-{n}: ' + ', '.join(f'{k} {v}' for k, v in counts.items()))
+        self.stdout.write(self.style.SUCCESS(f'Готово. Пароль пользователей: {SEED_PASSWORD}'))
+
+    def _uuid(self, rnd):
+        return uuid.UUID(int=rnd.getrandbits(128), version=4)
+
+    def _seed_workshop(self, name, password, rnd, options):
+        now = timezone.now()
+        begin = now - timedelta(days=options['days'])
+        workshop = Workshop.objects.create(name=name)
+        user = User.objects.create(username=name, password=password)
+        WorkshopAssignment.objects.create(user=user, workshop=workshop)
+        index = int(name.rsplit('-', 1)[1])
+
+        def moment():
+            return begin + timedelta(seconds=rnd.random() * options['days'] * 86400)
+
+        # Товары и размеры
+        items, sizes = [], []
+        item_sizes = defaultdict(list)
+        for i in range(options['items']):
+            price = None if rnd.random() < 0.05 else Decimal(round(rnd.lognormvariate(7.3, 0.6), -1)).quantize(Decimal('0.01'))
+            item = Item(
+                id=self._uuid(rnd), workshop=workshop, name=f'Товар {i + 1}', price=price,
+                item_description=f'Описание товара {i + 1}' if rnd.random() < 0.6 else None,
+                wb_url=f'https://www.wildberries.ru/catalog/{rnd.randrange(10**7, 10**8)}/detail.aspx' if rnd.random() < 0.5 else '',
+                ozon_url='',
+            )
+            item.created_at = moment()
+            item.updated_at = min(now, item.created_at + timedelta(days=rnd.expovariate(1 / 10)))
+            items.append(item)
+            grid = _weighted(rnd, SIZE_GRIDS)
+            first = rnd.randrange(len(grid))
+            for label in grid[first:first + rnd.randint(1, len(grid))]:
+                barcode = _ean13(f'46{index:03d}{len(sizes):07d}') if rnd.random() < 0.9 else None
+                size = SizeQuantity(
+                    id=self._uuid(rnd), item=item, workshop=workshop, size_label=label, quantity=0, barcode=barcode,
+                )
+                sizes.append(size)
+                item_sizes[item.id].append(size)
+        Item.objects.bulk_create(items, batch_size=BATCH)
+        by_key = {(size.item_id, size.size_label): size for size in sizes}
+        size_keys = list(by_key)
+        opening = {size.id: 0 if rnd.random() < 0.1 else int(rnd.expovariate(1 / 8)) for size in sizes}
+
+        # Поставки: в основном приход, 1–20 позиций
+        supplies, supply_lines, movements = [], [], []
+        deltas = defaultdict(int)
+        for number in range(1, options['supplies'] + 1):
+            supply = Supply(
+                id=self._uuid(rnd), workshop=workshop, number=number, created_by=user,
+                type=Supply.TYPE_IN if rnd.random() < 0.85 else Supply.TYPE_OUT,
+            )
+            supply.date = moment()
+            supplies.append(supply)
+            sign = 1 if supply.type == Supply.TYPE_IN else -1
+            reason = StockMovement.REASON_SUPPLY_IN if sign > 0 else StockMovement.REASON_SUPPLY_OUT
+            for key in rnd.sample(size_keys, min(len(size_keys), rnd.randint(1, 20))):
+                quantity = rnd.randint(1, 30 if sign > 0 else 5)
+                supply_lines.append(SupplyLineItem(
+                    id=self._uuid(rnd), supply=supply, item_id=key[0], size_label=key[1], quantity=quantity,
+                ))
+                size = by_key[key]
+                deltas[size.id] += sign * quantity
+                movements.append(StockMovement(
+                    workshop=workshop, size=size, delta=sign * quantity, reason=reason, supply=supply, created_at=supply.date,
+                ))
+
+        # Заказы: популярность товаров по Ципфу, статус зависит от давности
+        popularity = list(accumulate(1 / (rank + 1) ** 1.1 for rank in range(len(items))))
+        prices = {item.id: item.price or Decimal('0') for item in items}
+        orders, order_lines = [], []
+        for _ in range(options['orders']):
+            created_at = moment()
+            age = (now - created_at).days
+            if rnd.random() < 0.05:
+                status = Order.STATUS_CANCELLED
+            elif age > 14:
+                status = Order.STATUS_DELIVERED
+            else:
+                status = rnd.choice([Order.STATUS_NEW, Order.STATUS_SHIPPED, Order.STATUS_IN_TRANSIT, Order.STATUS_READY])
+            order = Order(
+                workshop=workshop, source=_weighted(rnd, SOURCES), status=status,
+                delivery_address=f'г. Москва, ул. Тестовая, д. {rnd.randint(1, 200)}, кв. {rnd.randint(1, 300)}',
+                client_phone=f'+79{rnd.randrange(10**9):09d}',
+            )
+            order.created_at = created_at
+            total = Decimal('0')
+            lines = []
+            for item in set(rnd.choices(items, cum_weights=popularity, k=rnd.choice((1, 1, 1, 2, 2, 3)))):
+                size = rnd.choice(item_sizes[item.id])
+                quantity = rnd.choice((1, 1, 1, 2))
+                lines.append(OrderLineItem(
+                    order=order, item=item, size_label=size.size_label, quantity=quantity, price=item.price,
+                ))
+                total += prices[item.id] * quantity
+                deltas[size.id] -= quantity
+                movements.append(StockMovement(
+                    workshop=workshop, size=size, delta=-quantity, reason=StockMovement.REASON_ORDER, order=order, created_at=created_at,
+                ))
+                if status == Order.STATUS_CANCELLED:
+                    deltas[size.id] += quantity
+                    movements.append(StockMovement(
+                        workshop=workshop, size=size, delta=quantity, reason=StockMovement.REASON_ORDER_CANCEL,
+                        order=order, created_at=created_at + timedelta(hours=1),
+                    ))
+            order.total = total
+            orders.append(order)
+            order_lines.extend(lines)
+
+        # Начальный остаток подбирается так, чтобы текущий не ушёл в минус
+        for size in sizes:
+            start_qty = max(opening[size.id], -deltas[size.id])
+            size.quantity = start_qty + deltas[size.id]
+            if start_qty:
+                movements.append(StockMovement(
+                    workshop=workshop, size=size, delta=start_qty, reason=StockMovement.REASON_OPENING, created_at=begin,
+                ))
+
+        SizeQuantity.objects.bulk_create(sizes, batch_size=BATCH)
+        Supply.objects.bulk_create(supplies, batch_size=BATCH)
+        SupplyLineItem.objects.bulk_create(supply_lines, batch_size=BATCH)
+        SupplyNumberCounter.objects.create(workshop=workshop, last_number=len(supplies))
+        Order.objects.bulk_create(orders, batch_size=BATCH)
+        OrderLineItem.objects.bulk_create(order_lines, batch_size=BATCH)
+        StockMovement.objects.bulk_create(movements, batch_size=BATCH)
+        rollups = rebuild_rollups(workshop_ids=[workshop.pk])
+        rebuild_item_stock([workshop.pk])
+        return {
+            'товаров': len(items), 'размеров': len(sizes), 'поставок': len(supplies),
+            'заказов': len(orders), 'движений': len(movements), 'итогов': rollups,
+        }
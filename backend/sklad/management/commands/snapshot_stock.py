@@ -0,0 +1,26 @@
+"""Срез остатков по журналу движений: python manage.py snapshot_stock (запускать по cron, например раз в сутки)"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from sklad.ledger import take_snapshot
+from sklad.models import Workshop
+
+
+class Command(BaseCommand):
+    help = 'Зафиксировать остатки всех цехов на текущий момент (за вычетом --lag секунд)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lag', type=int, default=60,
+            help='Отступ от текущего времени, чтобы не срезать незакоммиченные движения (сек.)',
+        )
+
+    def handle(self, *args, **options):
+        at = timezone.now() - timedelta(seconds=options['lag'])
+        workshop_ids = [None] + list(Workshop.objects.values_list('id', flat=True))
+        total = 0
+        for workshop_id in workshop_ids:
+            total += take_snapshot(workshop_id, at)
+        self.stdout.write(self.style.SUCCESS(f'Срез на {timezone.localtime(at):%Y-%m-%d %H:%M:%S}: {total} строк'))
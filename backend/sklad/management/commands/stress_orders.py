@@ -0,0 +1,49 @@
+"""
+Нагрузочный тест оформления заказов: python manage.py stress_orders --threads 8 --orders 400
+
+Несколько потоков одновременно покупают одни и те же размеры. В конце проверяется,
+что остатки не ушли в минус и списано ровно столько, сколько продано в заказах.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Sum
+
+from sklad.benchmarks import bench_workshop, place_orders_concurrently
+from sklad.models import OrderLineItem, SizeQuantity
+
+
+class Command(BaseCommand):
+    help = 'Параллельное оформление заказов: проверка отсутствия перепродажи и замер заказов/сек'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--orders', type=int, default=400, help='Всего попыток оформить заказ')
+        parser.add_argument('--items', type=int, default=3)
+        parser.add_argument('--stock', type=int, default=50, help='Начальный остаток каждого размера')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        sizes = ('S', 'M')
+        with bench_workshop(items=options['items'], sizes=sizes, quantity=options['stock']) as (workshop, _, items):
+            initial = options['stock'] * len(items) * len(sizes)
+            started = time.perf_counter()
+            counters = place_orders_concurrently(
+                workshop, items, sizes, options['threads'], options['orders'], seed=options['seed'],
+            )
+            elapsed = time.perf_counter() - started
+
+            sizes_qs = SizeQuantity.objects.filter(item__workshop=workshop)
+            remaining = sizes_qs.aggregate(s=Sum('quantity'))['s'] or 0
+            negative = sizes_qs.filter(quantity__lt=0).count()
+            sold = OrderLineItem.objects.filter(order__workshop=workshop).aggregate(s=Sum('quantity'))['s'] or 0
+
+            self.stdout.write(
+                f'потоков: {options["threads"]}, оформлено: {counters["placed"]}, '
+                f'отказов (нет остатка): {counters["rejected"]}, ошибок БД: {counters["errors"]}'
+            )
+            self.stdout.write(f'заказов/сек: {counters["placed"] / elapsed:.1f} ({elapsed:.2f} с)')
+            self.stdout.write(f'остаток: было {initial}, продано {sold}, осталось {remaining}')
+            if negative or remaining != initial - sold:
+                raise CommandError('Перепродажа: остатки не сходятся с проданным количеством')
+            self.stdout.write(self.style.SUCCESS('Перепродажи нет'))
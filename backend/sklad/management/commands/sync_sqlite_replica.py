@@ -0,0 +1,33 @@
+"""
+Копия основной SQLite-базы в файл реплики (SQLITE_REPLICA_PATH):
+python manage.py sync_sqlite_replica
+
+Для локальной проверки чтения с реплики: копия снимается на момент запуска, всё
+записанное позже реплика не видит, пока команду не запустят снова — как отставание
+настоящей реплики.
+"""
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from sklad.db_routing import REPLICA_DB_ALIAS, replica_configured
+
+
+class Command(BaseCommand):
+    help = 'Скопировать основную SQLite-базу в файл реплики'
+
+    def handle(self, *args, **options):
+        if not replica_configured():
+            raise CommandError('Реплика не задана: укажите SQLITE_REPLICA_PATH')
+        primary, replica = connections[DEFAULT_DB_ALIAS], connections[REPLICA_DB_ALIAS]
+        if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError('Команда только для SQLite; реплику PostgreSQL ведёт сам сервер')
+        replica.close()
+        primary.ensure_connection()
+        target = sqlite3.connect(replica.settings_dict['NAME'])
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
+        self.stdout.write(self.style.SUCCESS(f'Реплика обновлена: {replica.settings_dict["NAME"]}'))
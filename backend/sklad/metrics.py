@@ -0,0 +1,196 @@
+"""
+Метрики запросов в памяти процесса и их выдача в текстовом формате Prometheus.
+
+MetricsMiddleware для каждого запроса фиксирует маршрут (имя view), метод, статус,
+длительность, число и суммарное время SQL-запросов (connection.execute_wrapper)
+и размер ответа. Агрегаты — счётчики и гистограммы в памяти процесса, без
+внешних зависимостей; их отдаёт GET /api/metrics/ (только staff). При нескольких
+воркерах у каждого свои счётчики: Prometheus видит тот процесс, который ответил,
+поэтому в выдаче есть метка pid. SQL потоковых ответов (выгрузки) выполняется
+после выхода из middleware и не учитывается. Отключение: METRICS_ENABLED=false.
+Middleware работает и под ASGI без перехода в поток (SQL асинхронных view
+считается в потоках sync_to_async: соединения видят контекст запроса).
+"""
+import os
+import threading
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+# Границы корзин гистограммы длительности запроса (секунды)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED = '<unmatched>'
+
+
+class _RouteStats:
+    __slots__ = ('buckets', 'duration', 'count', 'queries', 'sql_seconds', 'response_bytes', 'statuses')
+
+    def __init__(self):
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.duration = 0.0
+        self.count = 0
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.response_bytes = 0
+        self.statuses = {}
+
+
+class MetricsRegistry:
+    """Агрегаты по (маршрут, метод). Потокобезопасно: одна короткая блокировка на запрос."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+        self.started_at = time.time()
+
+    def observe(self, view, method, status, duration, queries, sql_seconds, response_bytes):
+        with self._lock:
+            stats = self._routes.get((view, method))
+            if stats is None:
+                stats = self._routes[(view, method)] = _RouteStats()
+            for n, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    stats.buckets[n] += 1
+                    break
+            stats.duration += duration
+            stats.count += 1
+            stats.queries += queries
+            stats.sql_seconds += sql_seconds
+            stats.response_bytes += response_bytes
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {key: _copy(stats) for key, stats in self._routes.items()}
+
+    def render(self) -> str:
+        """Текстовый формат Prometheus (version 0.0.4)."""
+        routes = sorted(self.snapshot().items())
+        pid = str(os.getpid())
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        def sample(name, labels, value):
+            rendered = ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+            lines.append(f'{name}{{{rendered}}} {_number(value)}')
+
+        family('sklad_http_requests_total', 'counter', 'HTTP-запросы по маршруту, методу и статусу')
+        for (view, method), stats in routes:
+            for status, count in sorted(stats.statuses.items()):
+                sample('sklad_http_requests_total', {'view': view, 'method': method, 'status': str(status), 'pid': pid}, count)
+
+        family('sklad_http_request_duration_seconds', 'histogram', 'Длительность обработки запроса')
+        for (view, method), stats in routes:
+            labels = {'view': view, 'method': method, 'pid': pid}
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS, stats.buckets):
+                cumulative += count
+                sample('sklad_http_request_duration_seconds_bucket', {**labels, 'le': _number(bound)}, cumulative)
+            sample('sklad_http_request_duration_seconds_bucket', {**labels, 'le': '+Inf'}, stats.count)
+            sample('sklad_http_request_duration_seconds_sum', labels, stats.duration)
+            sample('sklad_http_request_duration_seconds_count', labels, stats.count)
+
+        for name, attr, help_text in (
+            ('sklad_db_queries_total', 'queries', 'SQL-запросы, выполненные при обработке запросов'),
+            ('sklad_db_query_duration_seconds_total', 'sql_seconds', 'Суммарное время SQL-запросов'),
+            ('sklad_http_response_bytes_total', 'response_bytes', 'Суммарный размер ответов (без потоковых)'),
+        ):
+            family(name, 'counter', help_text)
+            for (view, method), stats in routes:
+                sample(name, {'view': view, 'method': method, 'pid': pid}, getattr(stats, attr))
+
+        family('sklad_process_start_time_seconds', 'gauge', 'Время запуска процесса (unix)')
+        sample('sklad_process_start_time_seconds', {'pid': pid}, self.started_at)
+        return '\n'.join(lines) + '\n'
+
+
+def _copy(stats):
+    copy = _RouteStats()
+    for attr in _RouteStats.__slots__:
+        value = getattr(stats, attr)
+        setattr(copy, attr, value.copy() if isinstance(value, (list, dict)) else value)
+    return copy
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = MetricsRegistry()
+
+
+class _QueryTimer:
+    """execute_wrapper: считает SQL-запросы и их суммарное время."""
+    __slots__ = ('count', 'seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timer = _QueryTimer()
+        started = time.perf_counter()
+        with self._timed(timer):
+            response = self.get_response(request)
+        return self._observe(request, response, started, timer)
+
+    async def __acall__(self, request):
+        timer = _QueryTimer()
+        started = time.perf_counter()
+        with self._timed(timer):
+            response = await self.get_response(request)
+        return self._observe(request, response, started, timer)
+
+    @staticmethod
+    def _timed(timer):
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(timer))
+        return stack
+
+    @staticmethod
+    def _observe(request, response, started, timer):
+        duration = time.perf_counter() - started
+        match = request.resolver_match
+        view = (match.view_name or UNMATCHED) if match else UNMATCHED
+        size = 0 if response.streaming else len(response.content)
+        registry.observe(view, request.method, response.status_code, duration, timer.count, timer.seconds, size)
+        return response
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.2 on 2026-02-15 09:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0005_add_item_price'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='workshopassignment',
+            name='workshop',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='assignments', to='sklad.workshop'),
+        ),
+    ]
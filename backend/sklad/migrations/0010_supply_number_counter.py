@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def backfill_counters(apps, schema_editor):
+    """Счётчик каждого цеха начинается с максимального уже выданного номера."""
+    Supply = apps.get_model('sklad', 'Supply')
+    SupplyNumberCounter = apps.get_model('sklad', 'SupplyNumberCounter')
+    SupplyNumberCounter.objects.bulk_create([
+        SupplyNumberCounter(workshop_id=row['workshop'], last_number=row['last'])
+        for row in Supply.objects.values('workshop').annotate(last=Max('number')).order_by()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0009_merge_20260215_1231'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SupplyNumberCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_number', models.PositiveIntegerField(default=0)),
+                ('workshop', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='supply_counter', to='sklad.workshop')),
+            ],
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
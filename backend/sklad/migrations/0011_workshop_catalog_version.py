@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:38
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0010_supply_number_counter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workshop',
+            name='catalog_updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='workshop',
+            name='catalog_version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0011_workshop_catalog_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['workshop', 'created_at', 'id'], name='item_ws_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['workshop', '-created_at', '-id'], name='order_ws_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supply',
+            index=models.Index(fields=['workshop', '-date', '-id'], name='supply_ws_date_id_idx'),
+        ),
+    ]
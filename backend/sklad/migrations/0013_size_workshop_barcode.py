@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+
+def backfill_workshop(apps, schema_editor):
+    """Цех размера = цех товара; повторные штрихкоды в цехе очищаются (кроме первого)."""
+    Item = apps.get_model('sklad', 'Item')
+    SizeQuantity = apps.get_model('sklad', 'SizeQuantity')
+    SizeQuantity.objects.update(
+        workshop_id=Subquery(Item.objects.filter(pk=OuterRef('item_id')).values('workshop_id')[:1])
+    )
+    # Такие штрихкоды и раньше не находились (поиск падал на MultipleObjectsReturned)
+    duplicates = (
+        SizeQuantity.objects.exclude(barcode__isnull=True).exclude(barcode='')
+        .values('workshop_id', 'barcode').annotate(n=Count('id')).filter(n__gt=1).order_by()
+    )
+    for dup in duplicates:
+        ids = list(
+            SizeQuantity.objects.filter(workshop_id=dup['workshop_id'], barcode=dup['barcode'])
+            .order_by('id').values_list('id', flat=True)
+        )
+        SizeQuantity.objects.filter(id__in=ids[1:]).update(barcode=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0012_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sizequantity',
+            name='workshop',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sizes', to='sklad.workshop'),
+        ),
+        migrations.RunPython(backfill_workshop, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='sizequantity',
+            constraint=models.UniqueConstraint(condition=models.Q(('barcode__isnull', False), models.Q(('barcode', ''), _negated=True)), fields=('workshop', 'barcode'), name='size_barcode_unique_per_workshop'),
+        ),
+    ]
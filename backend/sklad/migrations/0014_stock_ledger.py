@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:42
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def opening_balances(apps, schema_editor):
+    """Текущие остатки становятся начальными движениями журнала."""
+    SizeQuantity = apps.get_model('sklad', 'SizeQuantity')
+    StockMovement = apps.get_model('sklad', 'StockMovement')
+    now = timezone.now()
+    StockMovement.objects.bulk_create(
+        (
+            StockMovement(workshop_id=workshop_id, size_id=size_id, delta=quantity, reason='opening', created_at=now)
+            for size_id, workshop_id, quantity in SizeQuantity.objects.exclude(quantity=0).values_list(
+                'id', 'workshop_id', 'quantity'
+            ).iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0013_size_workshop_barcode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.IntegerField()),
+                ('reason', models.CharField(choices=[('opening', 'Начальный остаток'), ('supply_in', 'Поставка'), ('supply_out', 'Отгрузка'), ('order', 'Заказ'), ('order_cancel', 'Отмена заказа'), ('adjustment', 'Корректировка')], max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movements', to='sklad.order')),
+                ('size', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movements', to='sklad.sizequantity')),
+                ('supply', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movements', to='sklad.supply')),
+                ('workshop', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='sklad.workshop')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['workshop', 'created_at'], name='movement_ws_created_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField()),
+                ('quantity', models.IntegerField()),
+                ('size', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='sklad.sizequantity')),
+                ('workshop', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='sklad.workshop')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['workshop', 'taken_at'], name='snapshot_ws_taken_idx')],
+                'unique_together': {('size', 'taken_at')},
+            },
+        ),
+        migrations.RunPython(opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:43
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0014_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(choices=[('item', 'Товар'), ('size', 'Размер'), ('supply', 'Поставка'), ('order', 'Заказ')], max_length=10)),
+                ('object_id', models.CharField(max_length=36)),
+                ('deleted', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('workshop', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='change_log', to='sklad.workshop')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['workshop', 'id'], name='changelog_ws_id_idx'), models.Index(fields=['workshop', 'created_at'], name='changelog_ws_created_idx')],
+            },
+        ),
+    ]
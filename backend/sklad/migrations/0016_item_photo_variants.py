@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0015_change_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='photo_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
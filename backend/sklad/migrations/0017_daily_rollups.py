@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def line_prices(apps, schema_editor):
+    """Строкам старых заказов проставляется текущая цена товара — точнее её уже не восстановить."""
+    Item = apps.get_model('sklad', 'Item')
+    OrderLineItem = apps.get_model('sklad', 'OrderLineItem')
+    OrderLineItem.objects.filter(price__isnull=True).update(
+        price=Subquery(Item.objects.filter(pk=OuterRef('item_id')).values('price')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0016_item_photo_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderlineitem',
+            name='price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size_label', models.CharField(max_length=50)),
+                ('day', models.DateField()),
+                ('sold', models.IntegerField(default=0)),
+                ('received', models.IntegerField(default=0)),
+                ('shipped', models.IntegerField(default=0)),
+                ('cancelled', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='sklad.item')),
+                ('workshop', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='sklad.workshop')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['workshop', 'day'], name='rollup_ws_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('item', 'size_label', 'day'), name='rollup_item_size_day_uniq')],
+            },
+        ),
+        migrations.RunPython(line_prices, migrations.RunPython.noop),
+    ]
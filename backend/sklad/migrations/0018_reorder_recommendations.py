@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0017_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReorderRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('velocity', models.FloatField()),
+                ('demand_std', models.FloatField()),
+                ('reorder_point', models.IntegerField()),
+                ('order_up_to', models.IntegerField()),
+                ('computed_at', models.DateTimeField()),
+                ('size', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='reorder', to='sklad.sizequantity')),
+                ('workshop', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reorder_recommendations', to='sklad.workshop')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['workshop', 'computed_at'], name='reorder_ws_computed_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+# Индексы поиска товаров (sklad.search) — только для PostgreSQL.
+# В SQLite поиск идёт по FTS5-таблице, её создаёт sklad.search.install_sqlite_fts после migrate.
+FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    "CREATE INDEX IF NOT EXISTS item_search_tsv_idx ON sklad_item USING gin "
+    "((to_tsvector('russian'::regconfig, coalesce(name, '') || ' ' || coalesce(item_description, ''))))",
+    'CREATE INDEX IF NOT EXISTS item_name_trgm_idx ON sklad_item USING gin (name gin_trgm_ops)',
+]
+BACKWARD = [
+    'DROP INDEX IF EXISTS item_name_trgm_idx',
+    'DROP INDEX IF EXISTS item_search_tsv_idx',
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0018_reorder_recommendations'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(FORWARD), _run(BACKWARD)),
+    ]
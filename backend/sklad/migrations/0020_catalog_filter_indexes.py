@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0019_item_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['workshop', 'price', 'id'], name='item_ws_price_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['workshop', 'name', 'id'], name='item_ws_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sizequantity',
+            index=models.Index(condition=models.Q(('quantity__gt', 0)), fields=['item', 'size_label'], name='size_in_stock_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:17
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def stock_summary(apps, schema_editor):
+    """Сводка остатков существующих товаров — как в sklad.stock_summary, без увеличения версии."""
+    Item = apps.get_model('sklad', 'Item')
+    SizeQuantity = apps.get_model('sklad', 'SizeQuantity')
+    sizes = SizeQuantity.objects.filter(item_id=OuterRef('pk')).order_by().values('item_id')
+    Item.objects.update(
+        total_quantity=Coalesce(
+            Subquery(sizes.annotate(total=Sum('quantity')).values('total'), output_field=IntegerField()), 0,
+        ),
+        in_stock_sizes=Coalesce(
+            Subquery(
+                sizes.annotate(count=Count('id', filter=Q(quantity__gt=0))).values('count'),
+                output_field=IntegerField(),
+            ),
+            0,
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0020_catalog_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='in_stock_sizes',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='stock_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='total_quantity',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(stock_summary, migrations.RunPython.noop),
+    ]
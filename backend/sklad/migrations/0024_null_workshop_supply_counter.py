@@ -0,0 +1,32 @@
+from django.db import migrations
+from django.db.models import Max
+
+
+def ensure_null_counter(apps, schema_editor):
+    """
+    Ровно одна строка счётчика для поставок без цеха: NULL в OneToOne не уникален, и
+    get_or_create при первых параллельных поставках мог вставить две строки.
+    Дубли сливаются (берётся наибольший номер), недостающая строка создаётся.
+    """
+    Supply = apps.get_model('sklad', 'Supply')
+    SupplyNumberCounter = apps.get_model('sklad', 'SupplyNumberCounter')
+    rows = list(SupplyNumberCounter.objects.filter(workshop__isnull=True).order_by('id'))
+    issued = Supply.objects.filter(workshop__isnull=True).aggregate(m=Max('number'))['m'] or 0
+    if not rows:
+        SupplyNumberCounter.objects.create(workshop=None, last_number=issued)
+        return
+    keep = rows[0]
+    keep.last_number = max([issued] + [row.last_number for row in rows])
+    keep.save(update_fields=['last_number'])
+    SupplyNumberCounter.objects.filter(id__in=[row.id for row in rows[1:]]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0023_job'),
+    ]
+
+    operations = [
+        migrations.RunPython(ensure_null_counter, migrations.RunPython.noop),
+    ]
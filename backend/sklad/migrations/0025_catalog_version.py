@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:55
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def create_singleton(apps, schema_editor):
+    CatalogVersion = apps.get_model('sklad', 'CatalogVersion')
+    CatalogVersion.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0024_null_workshop_supply_counter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('catalog_version', models.PositiveBigIntegerField(default=0)),
+                ('catalog_updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(create_singleton, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0025_catalog_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='status',
+            field=models.CharField(choices=[('new', 'Новый'), ('shipped', 'Отгружено'), ('in_transit', 'В пути'), ('ready', 'Готово к получению'), ('delivered', 'Доставлено'), ('cancelled', 'Отменено')], default='new', max_length=20, verbose_name='Статус'),
+        ),
+    ]
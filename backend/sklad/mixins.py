@@ -1,12 +1,29 @@
-"""Mixin для фильтрации по цеху."""
+"""Mixin для фильтрации по цеху, асинхронных APIView и идемпотентного создания."""
+import hashlib
+import inspect
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
 from .services import get_workshop_for_user
 
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
 
 class WorkshopFilterMixin:
     """Склад берётся из профиля пользователя."""
 
     def get_workshop(self):
-        return get_workshop_for_user(self.request.user)
+        """Цех определяется один раз за запрос."""
+        if not hasattr(self, '_workshop'):
+            self._workshop = get_workshop_for_user(self.request.user)
+        return self._workshop
 
     def get_workshop_queryset(self, model, base_qs=None):
         """Возвращает queryset, отфильтрованный по цеху пользователя."""
@@ -18,3 +35,93 @@ class WorkshopFilterMixin:
         if workshop:
             return qs.filter(workshop=workshop)
         return qs.filter(workshop__isnull=True)
+
+
+class AsyncViewMixin:
+    """
+    APIView с обработчиками async def (DRF сам асинхронные view не поддерживает).
+    Аутентификация, права и троттлинг DRF синхронные — выполняются через
+    sync_to_async, обработчик и ORM (aget, afirst, async for) — в цикле событий.
+    Под WSGI такая view тоже работает: Django вызывает её через async_to_sync.
+    """
+    view_is_async = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            method = request.method.lower()
+            if method in self.http_method_names:
+                handler = getattr(self, method, self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def aget_workshop(self):
+        """get_workshop из асинхронного обработчика (цех обычно уже закеширован на пользователе)."""
+        return await sync_to_async(self.get_workshop)()
+
+
+class IdempotencyMixin:
+    """
+    Повтор запроса с тем же заголовком Idempotency-Key возвращает сохранённый ответ,
+    документ второй раз не создаётся и остатки не меняются. Ключ вставляется в той же
+    транзакции, что и документ: параллельный дубль ждёт на уникальном индексе, пока
+    первый запрос не завершится, и получает его ответ; при ошибке ключ откатывается
+    вместе с документом, и повтор выполняется заново. Без заголовка — как раньше.
+    """
+
+    def idempotent(self, request, handler):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            return handler(request)
+        if not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            return Response(
+                {IDEMPOTENCY_HEADER: [f'Строка от 1 до {IDEMPOTENCY_KEY_MAX_LENGTH} символов']},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        lookup = {'user': request.user, 'endpoint': self.basename, 'key': key}
+        request_hash = _request_hash(request.data)
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(request_hash=request_hash, **lookup)
+            except IntegrityError:
+                return _replay(IdempotencyKey.objects.get(**lookup), request_hash)
+            response = handler(request)
+            if status.is_success(response.status_code):
+                record.status_code = response.status_code
+                record.response_body = response.data
+                record.save(update_fields=['status_code', 'response_body'])
+            else:
+                # Ключ закрепляется только за созданным документом
+                record.delete()
+        return response
+
+
+def _request_hash(data) -> str:
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, cls=DjangoJSONEncoder)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _replay(record, request_hash):
+    if record.request_hash != request_hash:
+        return Response(
+            {'detail': f'{IDEMPOTENCY_HEADER} уже использован с другим телом запроса'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if record.status_code is None:
+        return Response({'detail': 'Запрос с этим ключом ещё выполняется'}, status=status.HTTP_409_CONFLICT)
+    return Response(record.response_body, status=record.status_code, headers={'Idempotent-Replayed': 'true'})
@@ -1,5 +1,7 @@
 import uuid
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 
@@ -8,6 +10,9 @@ class Workshop(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Версия публичного каталога: растёт при любом изменении товаров, цен и остатков цеха
+    catalog_version = models.PositiveBigIntegerField(default=0)
+    catalog_updated_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         ordering = ['name']
@@ -16,6 +21,17 @@ class Workshop(models.Model):
         return self.name
 
 
+class CatalogVersion(models.Model):
+    """
+    Версия публичного каталога товаров без цеха (одна строка, pk=SINGLETON_ID, создаётся миграцией).
+    У товаров цеха версия — Workshop.catalog_version.
+    """
+    SINGLETON_ID = 1
+
+    catalog_version = models.PositiveBigIntegerField(default=0)
+    catalog_updated_at = models.DateTimeField(default=timezone.now)
+
+
 class WorkshopAssignment(models.Model):
     """Привязка пользователя к складу (расширение User из django.contrib.auth)."""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='workshop_assignment')
@@ -29,26 +45,60 @@ class Item(models.Model):
     workshop = models.ForeignKey(Workshop, on_delete=models.CASCADE, related_name='items', null=True, blank=True)
     name = models.CharField(max_length=255)
     photo = models.ImageField(upload_to='items/', null=True, blank=True)
+    # Производные фото (sklad.photos): {'source': имя оригинала, 'thumb': имя файла, ...}
+    photo_variants = models.JSONField(default=dict, blank=True, editable=False)
     item_description = models.TextField(null=True, blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, verbose_name='Цена')
     wb_url = models.URLField(max_length=500, blank=True, verbose_name='Ссылка на ВБ')
     ozon_url = models.URLField(max_length=500, blank=True, verbose_name='Ссылка на Озон')
+    # Сводка остатков размеров (sklad.stock_summary): сумма, размеров в наличии, версия
+    total_quantity = models.IntegerField(default=0, editable=False)
+    in_stock_sizes = models.PositiveIntegerField(default=0, editable=False)
+    stock_version = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['workshop', 'created_at', 'id'], name='item_ws_created_id_idx'),
+            # Публичный каталог: фильтр по цене и сортировки ordering=price / name внутри цеха
+            models.Index(fields=['workshop', 'price', 'id'], name='item_ws_price_id_idx'),
+            models.Index(fields=['workshop', 'name', 'id'], name='item_ws_name_id_idx'),
+        ]
 
 
 class SizeQuantity(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='sizes')
+    # Цех товара (денормализация): поиск по штрихкоду без join и уникальность штрихкода в цехе
+    workshop = models.ForeignKey(
+        Workshop, on_delete=models.CASCADE, related_name='sizes', null=True, blank=True, editable=False
+    )
     size_label = models.CharField(max_length=50)
     quantity = models.IntegerField(default=0)
     barcode = models.CharField(max_length=100, null=True, blank=True)
 
     class Meta:
         unique_together = ['item', 'size_label']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['workshop', 'barcode'],
+                condition=models.Q(barcode__isnull=False) & ~models.Q(barcode=''),
+                name='size_barcode_unique_per_workshop',
+            ),
+        ]
+        indexes = [
+            # in_stock в каталоге: EXISTS только по размерам с остатком
+            models.Index(
+                fields=['item', 'size_label'], condition=models.Q(quantity__gt=0), name='size_in_stock_idx',
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.workshop_id is None and self.item_id:
+            self.workshop_id = self.item.workshop_id
+        super().save(*args, **kwargs)
 
 
 class Supply(models.Model):
@@ -67,6 +117,17 @@ class Supply(models.Model):
 
     class Meta:
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['workshop', '-date', '-id'], name='supply_ws_date_id_idx'),
+        ]
+
+
+class SupplyNumberCounter(models.Model):
+    """Счётчик номеров поставок цеха: last_number — последний выданный номер."""
+    workshop = models.OneToOneField(
+        Workshop, on_delete=models.CASCADE, null=True, blank=True, related_name='supply_counter'
+    )
+    last_number = models.PositiveIntegerField(default=0)
 
 
 class SupplyLineItem(models.Model):
@@ -113,6 +174,9 @@ class Order(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['workshop', '-created_at', '-id'], name='order_ws_created_id_idx'),
+        ]
 
 
 class OrderLineItem(models.Model):
@@ -120,3 +184,182 @@ class OrderLineItem(models.Model):
     item = models.ForeignKey(Item, on_delete=models.CASCADE)
     size_label = models.CharField(max_length=50)
     quantity = models.IntegerField()
+    # Цена товара на момент заказа (для выручки в DailyRollup)
+    price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+
+class StockMovement(models.Model):
+    """Движение остатка размера. Журнал только дополняется; баланс = сумма delta."""
+    REASON_OPENING = 'opening'
+    REASON_SUPPLY_IN = 'supply_in'
+    REASON_SUPPLY_OUT = 'supply_out'
+    REASON_ORDER = 'order'
+    REASON_ORDER_CANCEL = 'order_cancel'
+    REASON_ADJUSTMENT = 'adjustment'
+    REASON_CHOICES = [
+        (REASON_OPENING, 'Начальный остаток'),
+        (REASON_SUPPLY_IN, 'Поставка'),
+        (REASON_SUPPLY_OUT, 'Отгрузка'),
+        (REASON_ORDER, 'Заказ'),
+        (REASON_ORDER_CANCEL, 'Отмена заказа'),
+        (REASON_ADJUSTMENT, 'Корректировка'),
+    ]
+
+    workshop = models.ForeignKey(
+        Workshop, on_delete=models.CASCADE, related_name='stock_movements', null=True, blank=True
+    )
+    size = models.ForeignKey(SizeQuantity, on_delete=models.CASCADE, related_name='movements')
+    delta = models.IntegerField()
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    supply = models.ForeignKey(Supply, on_delete=models.SET_NULL, null=True, blank=True, related_name='movements')
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='movements')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['workshop', 'created_at'], name='movement_ws_created_idx'),
+        ]
+
+
+class StockSnapshot(models.Model):
+    """Остаток размера на момент taken_at (срез журнала движений). Нулевые остатки не хранятся."""
+    workshop = models.ForeignKey(
+        Workshop, on_delete=models.CASCADE, related_name='stock_snapshots', null=True, blank=True
+    )
+    size = models.ForeignKey(SizeQuantity, on_delete=models.CASCADE, related_name='snapshots')
+    taken_at = models.DateTimeField()
+    quantity = models.IntegerField()
+
+    class Meta:
+        unique_together = ['size', 'taken_at']
+        indexes = [
+            models.Index(fields=['workshop', 'taken_at'], name='snapshot_ws_taken_idx'),
+        ]
+
+
+class ChangeLogEntry(models.Model):
+    """Журнал изменений для синхронизации клиентов; id — монотонный счётчик изменений."""
+    ENTITY_ITEM = 'item'
+    ENTITY_SIZE = 'size'
+    ENTITY_SUPPLY = 'supply'
+    ENTITY_ORDER = 'order'
+    ENTITY_CHOICES = [
+        (ENTITY_ITEM, 'Товар'),
+        (ENTITY_SIZE, 'Размер'),
+        (ENTITY_SUPPLY, 'Поставка'),
+        (ENTITY_ORDER, 'Заказ'),
+    ]
+
+    workshop = models.ForeignKey(
+        Workshop, on_delete=models.CASCADE, related_name='change_log', null=True, blank=True
+    )
+    entity = models.CharField(max_length=10, choices=ENTITY_CHOICES)
+    object_id = models.CharField(max_length=36)
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['workshop', 'id'], name='changelog_ws_id_idx'),
+            models.Index(fields=['workshop', 'created_at'], name='changelog_ws_created_idx'),
+        ]
+
+
+class DailyRollup(models.Model):
+    """
+    Дневные итоги по размеру товара (sklad.rollups): продано, принято, отгружено,
+    отменено штук и выручка. Поддерживаются при записи заказов и поставок.
+    """
+    workshop = models.ForeignKey(
+        Workshop, on_delete=models.CASCADE, related_name='daily_rollups', null=True, blank=True
+    )
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='daily_rollups')
+    size_label = models.CharField(max_length=50)
+    day = models.DateField()
+    sold = models.IntegerField(default=0)
+    received = models.IntegerField(default=0)
+    shipped = models.IntegerField(default=0)
+    cancelled = models.IntegerField(default=0)
+    # Выручка нетто: заказы дня минус заказы, отменённые в этот день
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['item', 'size_label', 'day'], name='rollup_item_size_day_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['workshop', 'day'], name='rollup_ws_day_idx'),
+        ]
+
+
+class ReorderRecommendation(models.Model):
+    """
+    Скорость продаж и точка дозаказа размера (sklad.reorder, команда compute_reorder).
+    Хранятся только размеры со спросом; запас в днях считается при выдаче по текущему остатку.
+    """
+    workshop = models.ForeignKey(
+        Workshop, on_delete=models.CASCADE, related_name='reorder_recommendations', null=True, blank=True
+    )
+    size = models.OneToOneField(SizeQuantity, on_delete=models.CASCADE, related_name='reorder')
+    # Спрос, штук в день: взвешенное среднее (свежие дни весомее) и отклонение
+    velocity = models.FloatField()
+    demand_std = models.FloatField()
+    # Остаток, при котором пора дозаказывать, и уровень, до которого дозаказывать
+    reorder_point = models.IntegerField()
+    order_up_to = models.IntegerField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['workshop', 'computed_at'], name='reorder_ws_computed_idx'),
+        ]
+
+
+class IdempotencyKey(models.Model):
+    """
+    Ответ на создание документа по заголовку Idempotency-Key (sklad.mixins.IdempotencyMixin).
+    Повтор с тем же ключом получает сохранённый ответ; старые ключи удаляет purge_idempotency_keys.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    endpoint = models.CharField(max_length=50)
+    key = models.CharField(max_length=255)
+    # SHA-256 тела запроса: тот же ключ с другим телом — ошибка клиента
+    request_hash = models.CharField(max_length=64)
+    # Пусто, пока запрос выполняется: ключ вставляется в той же транзакции, что и документ,
+    # поэтому другие запросы видят строку только с ответом
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response_body = models.JSONField(encoder=DjangoJSONEncoder, null=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'endpoint', 'key'], name='idempotency_user_endpoint_key_uniq'),
+        ]
+
+
+class Job(models.Model):
+    """Фоновая задача (sklad.jobs): выполняет manage.py run_worker; успешные удаляются."""
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DEAD = 'dead'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'В очереди'),
+        (STATUS_RUNNING, 'Выполняется'),
+        (STATUS_DEAD, 'Не выполнена'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(encoder=DjangoJSONEncoder, default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
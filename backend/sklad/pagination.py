@@ -0,0 +1,122 @@
+"""Курсорная (keyset) пагинация списков."""
+import base64
+import json
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Пагинация по (дата, id): следующая страница выбирается условием «строго после
+    последней строки», а не OFFSET — глубокие страницы стоят столько же, сколько первая.
+
+    Порядок берётся из атрибута view.keyset_ordering, например ('-date', '-id'):
+    первое поле — дата, второе — уникальный id для стабильного порядка.
+    Пагинация включается параметром cursor или page_size; без них view отдаёт
+    прежний ответ списком (совместимость со старыми клиентами).
+    Ответ: {"next": <url или null>, "results": [...]}.
+    """
+    page_size = 50
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def is_requested(self, request) -> bool:
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_page_size(self, request) -> int:
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+        self.request = request
+        self.ordering = getattr(view, 'keyset_ordering', ('-created_at', '-id'))
+        page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self._after(self.decode_cursor(cursor, queryset.model)))
+
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        self.last = rows[-1] if rows else None
+        return rows
+
+    def _after(self, position) -> Q:
+        """Условие «строка идёт после position» для составного ключа (дата, id)."""
+        (date_field, id_field), (date_value, id_value) = self._fields(), position
+        op = 'lt' if self.ordering[0].startswith('-') else 'gt'
+        return Q(**{f'{date_field}__{op}': date_value}) | Q(
+            **{date_field: date_value, f'{id_field}__{op}': id_value}
+        )
+
+    def _fields(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    def decode_cursor(self, cursor: str, model):
+        """(дата, id) из курсора; id приводится полем модели — битый id не доходит до SQL."""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            date_value, id_value = json.loads(base64.urlsafe_b64decode(padded))
+            id_value = model._meta.get_field(self._fields()[1]).to_python(id_value)
+            if id_value is None:
+                raise ValueError
+            return datetime.fromisoformat(date_value), id_value
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound('Неверный cursor')
+
+    def encode_cursor(self, row) -> str:
+        values = [row[f] if isinstance(row, dict) else getattr(row, f) for f in self._fields()]
+        raw = json.dumps([values[0].isoformat(), str(values[1])]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def get_next_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last))
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Курсор следующей страницы (из поля next)',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Размер страницы (по умолчанию {self.page_size}, максимум {self.max_page_size})',
+                'schema': {'type': 'integer'},
+            },
+        ]
@@ -0,0 +1,116 @@
+"""
+Производные фото товаров (миниатюры, WebP) через очередь задач.
+
+После сохранения товара с новым фото (сигнал post_save) в очередь (sklad.jobs) ставится
+задача photos.variants — её выполняет manage.py run_worker, запрос не ждёт Pillow.
+Готовые файлы сохраняются в каталоге товара (imaging.variant_name), имена — в
+Item.photo_variants вместе с именем оригинала (source): если фото успели заменить,
+результат отбрасывается. Удаляются только файлы, записанные в photo_variants.
+Ошибка чтения или записи файла — повтор задачи по правилам очереди.
+"""
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.files.base import ContentFile
+
+from .catalog_cache import bump_catalog_version
+from .imaging import VARIANTS, VARIANTS_DIR, render_variants, variant_name
+from .jobs import enqueue_once, register
+from .models import ChangeLogEntry, Item
+from .sync import record_changes
+
+logger = logging.getLogger(__name__)
+
+
+def create_pool(workers: int) -> ProcessPoolExecutor:
+    # spawn: дочерние процессы не наследуют соединения с БД и потоки сервера
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def _storage():
+    return Item._meta.get_field('photo').storage
+
+
+def variants_stale(item) -> bool:
+    """Производные не соответствуют текущему фото (нет, устарели или фото удалено)."""
+    variants = item.photo_variants or {}
+    if not item.photo:
+        return bool(variants)
+    return variants.get('source') != item.photo.name
+
+
+def photo_source(name: str):
+    """Путь к файлу, если хранилище локальное (процесс читает сам), иначе байты."""
+    storage = _storage()
+    try:
+        return storage.path(name)
+    except NotImplementedError:
+        with storage.open(name, 'rb') as f:
+            return f.read()
+
+
+def _delete_files(names) -> None:
+    storage = _storage()
+    for name in names:
+        if not name.startswith(VARIANTS_DIR + '/'):
+            # Вариант старого формата лежал рядом с оригиналами и мог совпасть с чужим фото
+            continue
+        try:
+            storage.delete(name)
+        except OSError:
+            logger.warning('Не удалось удалить %s', name)
+
+
+def store_variants(item_id, source: str, rendered: dict) -> bool:
+    """
+    Сохраняет результат render_variants и записывает имена в товар, если его фото
+    всё ещё source. Возвращает False, если фото заменили или товар удалён.
+    """
+    storage = _storage()
+    names = {}
+    for variant, data in rendered.items():
+        # Файл с таким именем не перезаписывается: storage.save подберёт свободное
+        names[variant] = storage.save(variant_name(item_id, source, variant), ContentFile(data))
+    names['source'] = source
+
+    current = Item.objects.filter(pk=item_id, photo=source).values_list('workshop_id', 'photo_variants').first()
+    if current is None or not Item.objects.filter(pk=item_id, photo=source).update(photo_variants=names):
+        _delete_files(names[v] for v in VARIANTS if v in names)
+        return False
+    workshop_id, old = current
+    _delete_files(name for key, name in (old or {}).items() if key != 'source' and name not in names.values())
+    bump_catalog_version(workshop_id)
+    record_changes(workshop_id, ChangeLogEntry.ENTITY_ITEM, [item_id])
+    return True
+
+
+@register('photos.clear')
+def clear_variants(item_id) -> None:
+    """Фото удалено: файлы производных удаляются, photo_variants очищается."""
+    row = Item.objects.filter(pk=item_id).values_list('workshop_id', 'photo', 'photo_variants').first()
+    if row is None or row[1] or not row[2]:
+        return
+    workshop_id, _, old = row
+    Item.objects.filter(pk=item_id, photo__in=['', None]).update(photo_variants={})
+    _delete_files(name for key, name in old.items() if key != 'source')
+    bump_catalog_version(workshop_id)
+    record_changes(workshop_id, ChangeLogEntry.ENTITY_ITEM, [item_id])
+
+
+@register('photos.variants')
+def build_variants(item_id, source: str) -> None:
+    """Строит и сохраняет производные фото source; фото уже заменили — ничего не делает."""
+    if Item.objects.filter(pk=item_id, photo=source).exists():
+        store_variants(item_id, source, render_variants(photo_source(source)))
+
+
+def schedule_variants(item) -> None:
+    """
+    Ставит в очередь генерацию производных (или их удаление, если фото нет). Повторные
+    сохранения товара до запуска воркера не плодят одинаковых задач.
+    """
+    if not item.photo:
+        enqueue_once('photos.clear', item_id=str(item.pk))
+    else:
+        enqueue_once('photos.variants', item_id=str(item.pk), source=item.photo.name)
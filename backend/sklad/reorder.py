@@ -0,0 +1,156 @@
+"""
+Рекомендации дозаказа: скорость продаж размеров и точки дозаказа.
+
+Спрос размера за день — sold − cancelled из дневных итогов (DailyRollup) за
+последние REORDER_HISTORY_DAYS дней. Вся матрица «размеры × дни» цеха
+обрабатывается NumPy за один проход:
+
+    velocity      = Σ w·d              (веса w убывают вдвое каждые REORDER_HALF_LIFE_DAYS дней)
+    demand_std    = √(Σ w·d² − velocity²)
+    safety        = z · demand_std · √lead
+    reorder_point = ⌈velocity · lead + safety⌉
+    order_up_to   = ⌈velocity · (lead + cover) + safety⌉
+
+Результат пишется в ReorderRecommendation (команда compute_reorder, по cron);
+API только читает таблицу. NumPy нужен лишь для расчёта и импортируется лениво.
+"""
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import ExpressionWrapper, F, FloatField, Max
+from django.utils import timezone
+from rest_framework.fields import DateTimeField
+
+from .models import DailyRollup, ReorderRecommendation, SizeQuantity
+
+REORDER_LIST_LIMIT = 1000
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError('Для расчёта рекомендаций нужен пакет numpy (pip install numpy)')
+    return numpy
+
+
+def demand_matrix(workshop_id, size_keys: list, start: date, days: int):
+    """Матрица спроса float64 [размер, день]; size_keys — [(item_id, size_label), ...] в порядке строк."""
+    np = _numpy()
+    index = {key: n for n, key in enumerate(size_keys)}
+    rows, cols, values = [], [], []
+    rollups = DailyRollup.objects.filter(
+        workshop_id=workshop_id, day__gte=start, day__lt=start + timedelta(days=days),
+    ).values_list('item_id', 'size_label', 'day', 'sold', 'cancelled')
+    for item_id, size_label, day, sold, cancelled in rollups.iterator(chunk_size=5000):
+        n = index.get((item_id, size_label))
+        if n is not None:
+            rows.append(n)
+            cols.append((day - start).days)
+            values.append(sold - cancelled)
+    demand = np.zeros((len(size_keys), days))
+    demand[rows, cols] = values
+    # Отмена в другой день даёт отрицательный спрос дня — такие дни считаются нулевыми
+    return np.maximum(demand, 0, out=demand)
+
+
+def reorder_points(demand, quantity, lead_time=None, cover_days=None, half_life=None, z=None) -> dict:
+    """
+    Векторный расчёт по матрице спроса [размер, день] (последний столбец — вчера)
+    и текущим остаткам. Возвращает массивы velocity, demand_std, reorder_point,
+    order_up_to и days_of_cover (inf — спроса нет).
+    """
+    np = _numpy()
+    lead_time = settings.REORDER_LEAD_TIME_DAYS if lead_time is None else lead_time
+    cover_days = settings.REORDER_COVER_DAYS if cover_days is None else cover_days
+    half_life = settings.REORDER_HALF_LIFE_DAYS if half_life is None else half_life
+    z = settings.REORDER_SERVICE_Z if z is None else z
+
+    age = np.arange(demand.shape[1] - 1, -1, -1, dtype=np.float64)
+    weights = 0.5 ** (age / half_life)
+    weights /= weights.sum()
+    velocity = demand @ weights
+    # Σ w·d² без временной матрицы d²
+    variance = np.einsum('ij,ij,j->i', demand, demand, weights) - np.square(velocity)
+    demand_std = np.sqrt(np.maximum(variance, 0))
+    safety = z * demand_std * np.sqrt(lead_time)
+    quantity = np.asarray(quantity, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days_of_cover = np.where(velocity > 0, np.maximum(quantity, 0) / velocity, np.inf)
+    return {
+        'velocity': velocity,
+        'demand_std': demand_std,
+        'reorder_point': np.ceil(velocity * lead_time + safety).astype(np.int64),
+        'order_up_to': np.ceil(velocity * (lead_time + cover_days) + safety).astype(np.int64),
+        'days_of_cover': days_of_cover,
+    }
+
+
+def compute_reorder(workshop_id, today: date = None, history_days: int = None) -> int:
+    """
+    Пересчитывает рекомендации всех размеров цеха по спросу до вчерашнего дня
+    включительно и заменяет их в таблице. Возвращает число размеров со спросом.
+    """
+    today = today or timezone.localdate()
+    days = history_days or settings.REORDER_HISTORY_DAYS
+    sizes = list(
+        SizeQuantity.objects.filter(workshop_id=workshop_id).order_by('id')
+        .values_list('id', 'item_id', 'size_label', 'quantity')
+    )
+    demand = demand_matrix(workshop_id, [(item_id, label) for _, item_id, label, _ in sizes], today - timedelta(days=days), days)
+    result = reorder_points(demand, [quantity for *_, quantity in sizes])
+
+    now = timezone.now()
+    with transaction.atomic():
+        ReorderRecommendation.objects.filter(workshop_id=workshop_id).delete()
+        ReorderRecommendation.objects.bulk_create(
+            (
+                ReorderRecommendation(
+                    workshop_id=workshop_id,
+                    size_id=sizes[n][0],
+                    velocity=float(result['velocity'][n]),
+                    demand_std=float(result['demand_std'][n]),
+                    reorder_point=int(result['reorder_point'][n]),
+                    order_up_to=int(result['order_up_to'][n]),
+                    computed_at=now,
+                )
+                for n in result['velocity'].nonzero()[0]
+            ),
+            batch_size=1000,
+        )
+    return int(result['velocity'].astype(bool).sum())
+
+
+def reorder_list(workshop_id, include_all: bool = False, limit: int = 100) -> dict:
+    """
+    Рекомендации для выдачи: по умолчанию только размеры с остатком не выше точки
+    дозаказа, сначала те, что кончатся раньше. Остаток и запас в днях — текущие.
+    """
+    qs = ReorderRecommendation.objects.filter(workshop_id=workshop_id)
+    computed_at = qs.aggregate(t=Max('computed_at'))['t']
+    if not include_all:
+        qs = qs.filter(size__quantity__lte=F('reorder_point'))
+    cover = ExpressionWrapper(F('size__quantity') * 1.0 / F('velocity'), output_field=FloatField())
+    rows = qs.order_by(cover, '-velocity', 'size_id').values_list(
+        'size_id', 'size__item_id', 'size__item__name', 'size__size_label', 'size__quantity',
+        'velocity', 'demand_std', 'reorder_point', 'order_up_to',
+    )[:limit]
+    return {
+        'computed_at': DateTimeField().to_representation(computed_at) if computed_at else None,
+        'results': [
+            {
+                'size_id': str(size_id),
+                'item_id': str(item_id),
+                'item_name': item_name,
+                'size_label': size_label,
+                'quantity': quantity,
+                'velocity': round(velocity, 3),
+                'demand_std': round(demand_std, 3),
+                'days_of_cover': round(max(quantity, 0) / velocity, 1),
+                'reorder_point': reorder_point,
+                'suggested_quantity': max(order_up_to - quantity, 0),
+            }
+            for size_id, item_id, item_name, size_label, quantity, velocity, demand_std, reorder_point, order_up_to in rows
+        ],
+    }
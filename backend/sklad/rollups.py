@@ -0,0 +1,196 @@
+"""
+Дневные итоги продаж и движения товара (DailyRollup).
+
+Строка — (товар, размер, день): sold — заказано штук, cancelled — отменено,
+revenue — выручка нетто (заказы дня минус отменённые в этот день), received /
+shipped — поставки и отгрузки. День — локальная дата (TIME_ZONE) создания
+заказа, поставки или отмены. Итоги пополняются в той же транзакции, что и
+документ (add_rollups), а rebuild_rollups пересчитывает их из истории.
+Аналитика (rollup_report) читает только итоги: стоимость зависит от числа
+товаров и дней в периоде, а не от объёма истории заказов.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import (
+    Case, DecimalField, ExpressionWrapper, F, IntegerField, OuterRef, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import DailyRollup, Order, OrderLineItem, StockMovement, Supply, SupplyLineItem
+
+METRICS = ('sold', 'received', 'shipped', 'cancelled', 'revenue')
+GROUPINGS = ('day', 'item', 'size')
+MAX_LIMIT = 500
+
+_MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+
+def add_rollups(workshop_id, day: date, changes: dict) -> None:
+    """
+    changes: {(item_id, size_label): {'sold': 2, 'revenue': Decimal(...), ...}}.
+    Недостающие строки вставляются (ignore_conflicts), затем все счётчики
+    увеличиваются одним UPDATE с F-выражениями — параллельные документы не теряют приращений.
+    """
+    changes = {(str(item_id), label): values for (item_id, label), values in changes.items() if any(values.values())}
+    if not changes:
+        return
+    DailyRollup.objects.bulk_create(
+        [
+            DailyRollup(workshop_id=workshop_id, item_id=item_id, size_label=label, day=day)
+            for item_id, label in changes
+        ],
+        ignore_conflicts=True,
+    )
+    ids = {
+        (str(item_id), label): pk
+        for pk, item_id, label in DailyRollup.objects.filter(
+            day=day, item_id__in={item_id for item_id, _ in changes},
+        ).values_list('id', 'item_id', 'size_label')
+    }
+    updates = {}
+    for metric in METRICS:
+        # Строки с одинаковым приращением — одна ветка CASE (id IN (...))
+        by_value = defaultdict(list)
+        for key, values in changes.items():
+            if values.get(metric):
+                by_value[values[metric]].append(ids[key])
+        if by_value:
+            output = _MONEY if metric == 'revenue' else IntegerField()
+            updates[metric] = Case(
+                *[When(id__in=row_ids, then=F(metric) + Value(value)) for value, row_ids in by_value.items()],
+                default=F(metric),
+                output_field=output,
+            )
+    DailyRollup.objects.filter(id__in=[ids[key] for key in changes]).update(**updates)
+
+
+def _merge(into, rows, workshop_key, metric_fields):
+    for row in rows:
+        key = (row[workshop_key], str(row['item_id']), row['size_label'], row['day'])
+        for metric, field, sign in metric_fields:
+            into[key][metric] += (row[field] or 0) * sign
+
+
+def rebuild_rollups(date_from: date = None, date_to: date = None, workshop_ids: list = None) -> int:
+    """
+    Пересчитывает итоги из заказов и поставок за период (границы включительно,
+    None — без границы) для цехов workshop_ids (None — все). Агрегация — в БД,
+    итоги периода заменяются одной транзакцией. Возвращает число строк итогов.
+    """
+    def scoped(qs, workshop_field, day_field):
+        if workshop_ids is not None:
+            qs = qs.filter(**{f'{workshop_field}__in': workshop_ids})
+        if date_from:
+            qs = qs.filter(**{f'{day_field}__gte': date_from})
+        if date_to:
+            qs = qs.filter(**{f'{day_field}__lte': date_to})
+        return qs
+
+    amount = ExpressionWrapper(
+        F('quantity') * Coalesce('price', Value(Decimal('0'))), output_field=_MONEY,
+    )
+    totals = defaultdict(lambda: dict.fromkeys(METRICS, 0))
+
+    sold = scoped(
+        OrderLineItem.objects.annotate(day=TruncDate('order__created_at')), 'order__workshop_id', 'day',
+    )
+    _merge(totals, sold.values('order__workshop_id', 'item_id', 'size_label', 'day').annotate(
+        units=Sum('quantity'), amount=Sum(amount),
+    ), 'order__workshop_id', (('sold', 'units', 1), ('revenue', 'amount', 1)))
+
+    # День отмены — первое движение «отмена заказа»; у заказов старше журнала — день заказа
+    cancelled_at = Subquery(
+        StockMovement.objects.filter(
+            order_id=OuterRef('order_id'), reason=StockMovement.REASON_ORDER_CANCEL,
+        ).order_by('id').values('created_at')[:1]
+    )
+    cancelled = scoped(
+        OrderLineItem.objects.filter(order__status=Order.STATUS_CANCELLED).annotate(
+            day=TruncDate(Coalesce(cancelled_at, 'order__created_at')),
+        ),
+        'order__workshop_id', 'day',
+    )
+    _merge(totals, cancelled.values('order__workshop_id', 'item_id', 'size_label', 'day').annotate(
+        units=Sum('quantity'), amount=Sum(amount),
+    ), 'order__workshop_id', (('cancelled', 'units', 1), ('revenue', 'amount', -1)))
+
+    for supply_type, metric in ((Supply.TYPE_IN, 'received'), (Supply.TYPE_OUT, 'shipped')):
+        lines = scoped(
+            SupplyLineItem.objects.filter(supply__type=supply_type).annotate(day=TruncDate('supply__date')),
+            'supply__workshop_id', 'day',
+        )
+        _merge(totals, lines.values('supply__workshop_id', 'item_id', 'size_label', 'day').annotate(
+            units=Sum('quantity'),
+        ), 'supply__workshop_id', ((metric, 'units', 1),))
+
+    with transaction.atomic():
+        scoped(DailyRollup.objects.all(), 'workshop_id', 'day').delete()
+        DailyRollup.objects.bulk_create(
+            (
+                DailyRollup(workshop_id=workshop_id, item_id=item_id, size_label=label, day=day, **values)
+                for (workshop_id, item_id, label, day), values in totals.items()
+            ),
+            batch_size=1000,
+        )
+    return len(totals)
+
+
+def default_period(today: date = None) -> tuple[date, date]:
+    """Период по умолчанию — последние 30 дней, включая сегодня."""
+    today = today or timezone.localdate()
+    return today - timedelta(days=29), today
+
+
+def _format(row: dict) -> dict:
+    for metric in METRICS:
+        row[metric] = row.pop(f'total_{metric}') or 0
+    row['revenue'] = f'{Decimal(row["revenue"]):.2f}'
+    return row
+
+
+def rollup_report(
+    workshop_id,
+    date_from: date,
+    date_to: date,
+    item_id=None,
+    size_label: str = None,
+    group_by: str = None,
+    metric: str = 'sold',
+    limit: int = 50,
+) -> dict:
+    """
+    Суммы итогов за период и, если задан group_by, строки по дням (хронологически),
+    товарам или размерам (топ-limit по metric, по убыванию).
+    """
+    qs = DailyRollup.objects.filter(workshop_id=workshop_id, day__gte=date_from, day__lte=date_to)
+    if item_id:
+        qs = qs.filter(item_id=item_id)
+    if size_label:
+        qs = qs.filter(size_label=size_label)
+    # Имена агрегатов не должны совпадать с полями модели
+    sums = {f'total_{name}': Sum(name) for name in METRICS}
+
+    report = {
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
+        'totals': _format(qs.aggregate(**sums)),
+    }
+    if group_by == 'day':
+        rows = qs.values('day').annotate(**sums).order_by('day')
+        report['rows'] = [_format({**row, 'day': row['day'].isoformat()}) for row in rows]
+    elif group_by in ('item', 'size'):
+        keys = ('item_id', 'item__name') + (('size_label',) if group_by == 'size' else ())
+        rows = qs.values(*keys).annotate(**sums).order_by(f'-total_{metric}', 'item__name', 'item_id', *keys[2:])[:limit]
+        report['rows'] = [
+            _format({
+                'item_id': str(row.pop('item_id')),
+                'item_name': row.pop('item__name'),
+                **row,
+            })
+            for row in rows
+        ]
+    return report
@@ -0,0 +1,179 @@
+"""
+Поиск товаров по названию и описанию (?q=) в уже отфильтрованной по цеху выборке.
+
+PostgreSQL: полнотекстовый поиск (to_tsvector('russian', ...), префиксы через :*)
+или триграммное сходство слов названия (pg_trgm, опечатки); оба условия
+обслуживаются GIN-индексами миграции 0019. Ранг — ts_rank + word_similarity.
+
+SQLite (локальный запуск): FTS5-таблица sklad_item_fts с префиксным поиском и
+bm25, опечатки — difflib по названиям выборки. Таблица и триггеры создаются после
+migrate (install_sqlite_fts): SQLite пересоздаёт таблицу товаров при изменении
+схемы, и триггеры пропали бы. Прочие СУБД — icontains + difflib.
+"""
+import difflib
+import re
+from functools import lru_cache
+
+from django.db import OperationalError, connections
+from django.db.models import BooleanField, Case, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+from .models import Item
+
+MAX_TERMS = 8
+MAX_TERM_LENGTH = 50
+SEARCH_LIMIT = 50
+MAX_SEARCH_LIMIT = 200
+# difflib: минимальное сходство слова запроса со словом названия и сколько названий сравнивать
+FUZZY_CUTOFF = 0.75
+FUZZY_CANDIDATES = 20000
+PREFIX_WEIGHT = 0.9
+
+FTS_TABLE = 'sklad_item_fts'
+_TERM_RE = re.compile(r'\w+')
+_PG_VECTOR = "to_tsvector('russian'::regconfig, coalesce({t}.name, '') || ' ' || coalesce({t}.item_description, ''))"
+
+
+def search_terms(q: str) -> list[str]:
+    """Слова запроса в нижнем регистре (только буквы и цифры — безопасно для tsquery и FTS5)."""
+    return [term[:MAX_TERM_LENGTH] for term in _TERM_RE.findall((q or '').lower())][:MAX_TERMS]
+
+
+def search_items(queryset, q: str):
+    """Товары queryset, подходящие под запрос, по убыванию ранга (аннотация search_rank)."""
+    terms = search_terms(q)
+    if not terms:
+        return queryset.none()
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        return _search_postgres(queryset, terms, connection)
+    if connection.vendor == 'sqlite' and sqlite_fts_ready(queryset.db):
+        return _search_sqlite(queryset, terms, connection)
+    return _search_fallback(queryset, terms)
+
+
+def _search_postgres(queryset, terms, connection):
+    table = connection.ops.quote_name(Item._meta.db_table)
+    vector = _PG_VECTOR.format(t=table)
+    tsquery = ' & '.join(f'{term}:*' for term in terms)
+    phrase = ' '.join(terms)
+    matched = RawSQL(f"{vector} @@ to_tsquery('russian'::regconfig, %s)", (tsquery,), output_field=BooleanField())
+    # <% — word_similarity выше pg_trgm.word_similarity_threshold (0.6), по индексу gin_trgm_ops
+    similar = RawSQL(f'%s <%% {table}.name', (phrase,), output_field=BooleanField())
+    rank = RawSQL(
+        f"ts_rank({vector}, to_tsquery('russian'::regconfig, %s)) + word_similarity(%s, {table}.name)",
+        (tsquery, phrase),
+        output_field=FloatField(),
+    )
+    return queryset.filter(Q(matched) | Q(similar)).annotate(search_rank=rank).order_by('-search_rank', 'id')
+
+
+def _search_sqlite(queryset, terms, connection):
+    table = connection.ops.quote_name(Item._meta.db_table)
+    match = ' '.join(f'"{term}"*' for term in terms)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT {table}.id, bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} '
+            f'JOIN {table} ON {table}.rowid = {FTS_TABLE}.rowid WHERE {FTS_TABLE} MATCH %s',
+            (match,),
+        )
+        found = {Item._meta.pk.to_python(pk): score for pk, score in cursor.fetchall()}
+    # bm25 отрицателен, лучше — меньше. Ранг совпадения 1..1.5: выше любого нечёткого (< 1),
+    # а разброс bm25 меньше веса сходства названия — точное слово в названии важнее длины описания
+    best = min(found.values(), default=-1) or -1
+    found = {pk: 1 + 0.5 * score / best for pk, score in found.items()}
+    # Таблица FTS общая для всех цехов — оставляем только товары выборки
+    in_scope = queryset.filter(RawSQL(
+        f'{table}.rowid IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)',
+        (match,),
+        output_field=BooleanField(),
+    )).values_list('id', flat=True)
+    return _ranked(queryset, {pk: found[pk] for pk in in_scope if pk in found}, terms)
+
+
+def _search_fallback(queryset, terms):
+    matched = queryset
+    for term in terms:
+        matched = matched.filter(Q(name__icontains=term) | Q(item_description__icontains=term))
+    scores = dict.fromkeys(matched.values_list('id', flat=True)[:FUZZY_CANDIDATES], 1.0)
+    return _ranked(queryset, scores, terms)
+
+
+def _ranked(queryset, scores: dict, terms):
+    """
+    Добавляет нечёткие совпадения и сортирует лучшие MAX_SEARCH_LIMIT по рангу.
+    Сходство названия прибавляется к рангу полнотекстовых совпадений — точное слово выше префикса.
+    """
+    for pk, score in _fuzzy_scores(queryset, terms).items():
+        scores[pk] = scores.get(pk, 0) + score
+    best = sorted(scores.items(), key=lambda pair: -pair[1])[:MAX_SEARCH_LIMIT]
+    if not best:
+        return queryset.none()
+    rank = Case(*[When(id=pk, then=Value(score)) for pk, score in best], output_field=FloatField())
+    return queryset.filter(id__in=[pk for pk, _ in best]).annotate(search_rank=rank).order_by('-search_rank', 'id')
+
+
+def _fuzzy_scores(queryset, terms) -> dict:
+    """Названия, в которых у каждого слова запроса есть похожее слово (или начало слова)."""
+    scores = {}
+    matcher = difflib.SequenceMatcher(autojunk=False)
+    for pk, name in queryset.order_by().values_list('id', 'name')[:FUZZY_CANDIDATES]:
+        words = _TERM_RE.findall(name.lower())
+        total = 0.0
+        for term in terms:
+            matcher.set_seq2(term)
+            best = 0.0
+            for word in words:
+                # Совпадение только с началом слова весит меньше целого слова
+                for candidate, weight in ((word, 1.0), (word[:len(term)], PREFIX_WEIGHT)):
+                    matcher.set_seq1(candidate)
+                    if matcher.real_quick_ratio() * weight > best and matcher.quick_ratio() * weight > best:
+                        best = max(best, matcher.ratio() * weight)
+            if best < FUZZY_CUTOFF:
+                break
+            total += best
+        else:
+            scores[pk] = total / len(terms) * 0.99
+    return scores
+
+
+@lru_cache(maxsize=None)
+def sqlite_fts_ready(using: str = 'default') -> bool:
+    with connections[using].cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", (FTS_TABLE,))
+        return cursor.fetchone() is not None
+
+
+def install_sqlite_fts(using: str = 'default') -> bool:
+    """
+    Создаёт FTS5-таблицу и триггеры синхронизации (rowid = rowid товара) и заново
+    заполняет индекс. Вызывается после migrate; без FTS5 в сборке SQLite — False.
+    """
+    connection = connections[using]
+    table = Item._meta.db_table
+    if connection.vendor != 'sqlite' or table not in connection.introspection.table_names():
+        return False
+    values = "new.rowid, new.name, coalesce(new.item_description, '')"
+    statements = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        f"name, item_description, tokenize = 'unicode61 remove_diacritics 2')",
+        f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {table} BEGIN '
+        f'INSERT INTO {FTS_TABLE}(rowid, name, item_description) VALUES ({values}); END',
+        f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {table} BEGIN '
+        f'DELETE FROM {FTS_TABLE} WHERE rowid = old.rowid; END',
+        f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, item_description ON {table} BEGIN '
+        f'DELETE FROM {FTS_TABLE} WHERE rowid = old.rowid; '
+        f'INSERT INTO {FTS_TABLE}(rowid, name, item_description) VALUES ({values}); END',
+        f'DELETE FROM {FTS_TABLE}',
+        f"INSERT INTO {FTS_TABLE}(rowid, name, item_description) "
+        f"SELECT rowid, name, coalesce(item_description, '') FROM {table}",
+    ]
+    try:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+    except OperationalError:
+        return False
+    finally:
+        sqlite_fts_ready.cache_clear()
+    return True
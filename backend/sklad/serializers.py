@@ -19,67 +19,125 @@ class SizeQuantitySerializer(serializers.ModelSerializer):
         }
 
 
+BARCODE_BATCH_LIMIT = 1000
+ORDER_BULK_STATUS_LIMIT = 1000
+
+
+class BarcodeBatchSerializer(serializers.Serializer):
+    barcodes = serializers.ListField(
+        child=serializers.CharField(max_length=100),
+        max_length=BARCODE_BATCH_LIMIT,
+        help_text='Штрихкоды для поиска',
+    )
+
+
+class CatalogImportSerializer(serializers.Serializer):
+    file = serializers.FileField(help_text='CSV (UTF-8 или cp1251, разделитель , или ;) или XLSX: item_id, name, price, item_description, wb_url, ozon_url, size_label, quantity, barcode')
+    dry_run = serializers.BooleanField(default=False, help_text='Только проверить, ничего не записывать')
+
+
+def _absolute_url(url, request):
+    path = url if url.startswith('/') else f'/{url}'
+    return request.build_absolute_uri(path) if request else url
+
+
 def _item_photo_url(obj, request):
     if not obj.photo:
         return None
-    url = obj.photo.url
-    path = url if url.startswith('/') else f'/{url}'
-    return request.build_absolute_uri(path) if request else url
+    return _absolute_url(obj.photo.url, request)
+
+
+def _item_photo_variants(obj, request):
+    """URL миниатюр и WebP ({'thumb': ..., 'thumb_webp': ..., 'detail': ..., 'detail_webp': ...}); None — ещё не готовы."""
+    variants = obj.photo_variants or {}
+    if not obj.photo or variants.get('source') != obj.photo.name:
+        return None
+    storage = obj.photo.storage
+    return {key: _absolute_url(storage.url(name), request) for key, name in variants.items() if key != 'source'}
 
 
 class ItemListSerializer(serializers.ModelSerializer):
     sizes = SizeQuantitySerializer(many=True, read_only=True)
     photo = serializers.SerializerMethodField()
+    photo_variants = serializers.SerializerMethodField()
     workshop = WorkshopSerializer(read_only=True)
 
     class Meta:
         model = Item
-        fields = ['id', 'name', 'photo', 'item_description', 'price', 'wb_url', 'ozon_url', 'workshop', 'created_at', 'updated_at', 'sizes']
+        fields = ['id', 'name', 'photo', 'photo_variants', 'item_description', 'price', 'wb_url', 'ozon_url', 'workshop', 'created_at', 'updated_at', 'total_quantity', 'in_stock_sizes', 'stock_version', 'sizes']
 
     def get_photo(self, obj):
         return _item_photo_url(obj, self.context.get('request'))
 
+    def get_photo_variants(self, obj):
+        return _item_photo_variants(obj, self.context.get('request'))
+
+
+class SyncItemSerializer(ItemListSerializer):
+    """Товар для дельта-синхронизации: размеры передаются отдельным списком."""
+    sizes = None
+
+    class Meta(ItemListSerializer.Meta):
+        fields = [f for f in ItemListSerializer.Meta.fields if f != 'sizes']
+
+
+class SizeQuantitySyncSerializer(SizeQuantitySerializer):
+    class Meta(SizeQuantitySerializer.Meta):
+        fields = ['id', 'item_id', 'size_label', 'quantity', 'barcode']
+
 
 class PublicItemListSerializer(serializers.ModelSerializer):
     """Публичный список: без created_at, updated_at, item_description."""
     sizes = SizeQuantitySerializer(many=True, read_only=True)
     photo = serializers.SerializerMethodField()
+    photo_variants = serializers.SerializerMethodField()
     workshop = WorkshopSerializer(read_only=True)
 
     class Meta:
         model = Item
-        fields = ['id', 'name', 'photo', 'price', 'wb_url', 'ozon_url', 'workshop', 'sizes']
+        fields = ['id', 'name', 'photo', 'photo_variants', 'price', 'wb_url', 'ozon_url', 'workshop', 'total_quantity', 'in_stock_sizes', 'stock_version', 'sizes']
 
     def get_photo(self, obj):
         return _item_photo_url(obj, self.context.get('request'))
 
+    def get_photo_variants(self, obj):
+        return _item_photo_variants(obj, self.context.get('request'))
+
 
 class ItemDetailSerializer(serializers.ModelSerializer):
     sizes = SizeQuantitySerializer(many=True, read_only=True)
     photo = serializers.SerializerMethodField()
+    photo_variants = serializers.SerializerMethodField()
     workshop = WorkshopSerializer(read_only=True)
 
     class Meta:
         model = Item
-        fields = ['id', 'name', 'photo', 'item_description', 'price', 'wb_url', 'ozon_url', 'workshop', 'created_at', 'updated_at', 'sizes']
+        fields = ['id', 'name', 'photo', 'photo_variants', 'item_description', 'price', 'wb_url', 'ozon_url', 'workshop', 'created_at', 'updated_at', 'total_quantity', 'in_stock_sizes', 'stock_version', 'sizes']
 
     def get_photo(self, obj):
         return _item_photo_url(obj, self.context.get('request'))
 
+    def get_photo_variants(self, obj):
+        return _item_photo_variants(obj, self.context.get('request'))
+
 
 class PublicItemDetailSerializer(serializers.ModelSerializer):
     """Публичная полная информация по товару по id."""
     sizes = SizeQuantitySerializer(many=True, read_only=True)
     photo = serializers.SerializerMethodField()
+    photo_variants = serializers.SerializerMethodField()
     workshop = WorkshopSerializer(read_only=True)
 
     class Meta:
         model = Item
-        fields = ['id', 'name', 'photo', 'item_description', 'price', 'wb_url', 'ozon_url', 'workshop', 'created_at', 'updated_at', 'sizes']
+        fields = ['id', 'name', 'photo', 'photo_variants', 'item_description', 'price', 'wb_url', 'ozon_url', 'workshop', 'created_at', 'updated_at', 'total_quantity', 'in_stock_sizes', 'stock_version', 'sizes']
 
     def get_photo(self, obj):
         return _item_photo_url(obj, self.context.get('request'))
 
+    def get_photo_variants(self, obj):
+        return _item_photo_variants(obj, self.context.get('request'))
+
 
 class ItemCreateUpdateSerializer(serializers.ModelSerializer):
     photo = serializers.ImageField(required=False, allow_null=True, help_text='Фото товара')
@@ -208,6 +266,16 @@ class OrderStatusSerializer(serializers.Serializer):
     )
 
 
+class OrderBulkStatusSerializer(OrderStatusSerializer):
+    """Тело массовой смены статуса: id заказов и новый статус."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=ORDER_BULK_STATUS_LIMIT,
+        help_text='id заказов',
+    )
+
+
 class OrderCreateSerializer(serializers.Serializer):
     source = serializers.CharField(required=False, allow_blank=True, help_text='Источник заказа')
     delivery_address = serializers.CharField(required=False, allow_blank=True, help_text='Адрес доставки')
@@ -218,13 +286,16 @@ class OrderCreateSerializer(serializers.Serializer):
         from .services import create_order, get_workshop_for_user
         request = self.context.get('request')
         workshop = getattr(request, 'user', None) and get_workshop_for_user(request.user)
-        return create_order(
-            workshop=workshop,
-            source=validated_data.get('source', '') or '',
-            delivery_address=validated_data.get('delivery_address', '') or '',
-            client_phone=validated_data.get('client_phone', '') or '',
-            lines=[
-                (l['item_id'], l['size_label'], l['quantity'])
-                for l in validated_data['lines']
-            ],
-        )
+        try:
+            return create_order(
+                workshop=workshop,
+                source=validated_data.get('source', '') or '',
+                delivery_address=validated_data.get('delivery_address', '') or '',
+                client_phone=validated_data.get('client_phone', '') or '',
+                lines=[
+                    (l['item_id'], l['size_label'], l['quantity'])
+                    for l in validated_data['lines']
+                ],
+            )
+        except ValueError as e:
+            raise serializers.ValidationError({'detail': str(e)})
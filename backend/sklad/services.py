@@ -1,5 +1,20 @@
+import threading
+from collections import defaultdict
 from decimal import Decimal
-from .models import Item, Order, OrderLineItem, SizeQuantity, Supply, SupplyLineItem, Workshop
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, When
+from django.utils import timezone
+
+from .catalog_cache import bump_catalog_version
+from .sync import record_changes
+from .ledger import record_movements, record_order_movements
+from .rollups import add_rollups
+from .stock_summary import refresh_item_stock
+from .models import (
+    ChangeLogEntry, Item, Order, OrderLineItem, SizeQuantity, StockMovement, Supply, SupplyLineItem, SupplyNumberCounter, Workshop,
+)
 from django.contrib.auth.models import User
 
 
@@ -12,12 +27,138 @@ def get_or_create_size(item: Item, size_label: str) -> SizeQuantity:
     return size
 
 
+def is_barcode_taken(workshop_id, barcode, exclude_pk=None) -> bool:
+    """Штрихкод уже занят другим размером этого цеха."""
+    if not barcode or workshop_id is None:
+        return False
+    return SizeQuantity.objects.filter(workshop_id=workshop_id, barcode=barcode).exclude(pk=exclude_pk).exists()
+
+
 def get_workshop_for_user(user):
-    """Возвращает склад пользователя из привязки."""
+    """Возвращает склад пользователя из привязки (запоминается на объекте пользователя)."""
+    try:
+        return user._sklad_workshop
+    except AttributeError:
+        pass
     try:
-        return user.workshop_assignment.workshop
+        workshop = user.workshop_assignment.workshop
     except Exception:
-        return None
+        workshop = None
+    user._sklad_workshop = workshop
+    return workshop
+
+
+def allocate_supply_numbers(workshop: Workshop | None, count: int = 1) -> int:
+    """
+    Выделяет count подряд идущих номеров поставок цеха и возвращает первый.
+    Строка счётчика заблокирована до конца внешней транзакции. Строку для поставок
+    без цеха создаёт миграция 0024: NULL в OneToOne не уникален, и параллельный
+    get_or_create мог бы вставить две строки.
+    """
+    with transaction.atomic():
+        counter, _ = SupplyNumberCounter.objects.select_for_update().get_or_create(workshop=workshop)
+        first = counter.last_number + 1
+        counter.last_number += count
+        counter.save(update_fields=['last_number'])
+    return first
+
+
+_number_blocks = {}
+_number_blocks_lock = threading.Lock()
+
+
+def next_supply_number(workshop: Workshop | None) -> int:
+    """
+    Следующий номер поставки. При SUPPLY_NUMBER_BLOCK_SIZE > 1 процесс заранее забирает
+    блок номеров отдельной короткой транзакцией и раздаёт его из памяти — цеха с большим
+    потоком документов не ждут друг друга на строке счётчика. Цена: номера из разных
+    процессов идут не по порядку времени, а неиспользованный остаток блока пропадает
+    при перезапуске.
+    """
+    block_size = getattr(settings, 'SUPPLY_NUMBER_BLOCK_SIZE', 1)
+    if block_size <= 1 or transaction.get_connection().in_atomic_block:
+        # Внутри транзакции блок брать нельзя: при откате номера выдались бы повторно.
+        return allocate_supply_numbers(workshop)
+    key = workshop.pk if workshop else None
+    with _number_blocks_lock:
+        block = _number_blocks.get(key)
+        if block is None or block[0] > block[1]:
+            first = allocate_supply_numbers(workshop, block_size)
+            block = _number_blocks[key] = [first, first + block_size - 1]
+        number = block[0]
+        block[0] += 1
+    return number
+
+
+def _item_queryset(workshop: Workshop | None):
+    """Товары только из цеха пользователя (защита мультитенантности)."""
+    if workshop:
+        return Item.objects.filter(workshop=workshop)
+    return Item.objects.filter(workshop__isnull=True)
+
+
+def _aggregate_lines(lines: list[tuple]) -> dict[tuple, int]:
+    """Суммирует количество по (item_id, size_label) — строки с одним размером схлопываются."""
+    totals = defaultdict(int)
+    for item_id, size_label, quantity in lines:
+        totals[(str(item_id), size_label)] += quantity
+    return totals
+
+
+def _load_items(item_queryset, item_ids) -> dict[str, Item]:
+    """Все товары документа одним запросом; ValueError, если какого-то нет в цехе."""
+    items = {str(item.id): item for item in item_queryset.filter(id__in=set(item_ids))}
+    for item_id in item_ids:
+        if item_id not in items:
+            raise ValueError(f'Товар с id {item_id} не найден или не принадлежит вашему цеху.')
+    return items
+
+
+def _lock_sizes(keys) -> dict[tuple, SizeQuantity]:
+    """
+    Блокирует строки SizeQuantity для пар (item_id, size_label) одним запросом.
+    Порядок блокировки по id одинаков для всех транзакций — без взаимных блокировок.
+    """
+    item_ids = {item_id for item_id, _ in keys}
+    labels = {size_label for _, size_label in keys}
+    qs = (
+        SizeQuantity.objects.select_for_update()
+        .filter(item_id__in=item_ids, size_label__in=labels)
+        .order_by('id')
+    )
+    return {
+        (str(size.item_id), size.size_label): size
+        for size in qs
+        if (str(size.item_id), size.size_label) in keys
+    }
+
+
+def _ensure_sizes(keys, workshop_id) -> dict[tuple, SizeQuantity]:
+    """Блокирует размеры (item_id, size_label), недостающие создаёт с нулевым остатком."""
+    sizes = _lock_sizes(keys)
+    missing = [key for key in keys if key not in sizes]
+    if missing:
+        SizeQuantity.objects.bulk_create(
+            [
+                SizeQuantity(item_id=item_id, workshop_id=workshop_id, size_label=size_label, quantity=0)
+                for item_id, size_label in missing
+            ],
+            ignore_conflicts=True,
+        )
+        sizes = _lock_sizes(keys)
+    return sizes
+
+
+def _apply_size_deltas(deltas: dict) -> None:
+    """Применяет изменения остатков одним UPDATE: {size_id: delta}."""
+    if not deltas:
+        return
+    SizeQuantity.objects.filter(id__in=deltas.keys()).update(
+        quantity=Case(
+            *[When(id=size_id, then=F('quantity') + delta) for size_id, delta in deltas.items()],
+            output_field=IntegerField(),
+        )
+    )
 
 
 def create_supply(
@@ -27,51 +168,98 @@ def create_supply(
 ) -> Supply:
     """
     lines: [(item_id, size_label, quantity), ...]
+
+    Документ проводится одной транзакцией: товары и размеры читаются одним запросом
+    каждый, строки размеров блокируются, состав вставляется bulk_create, остатки
+    меняются одним UPDATE. Число запросов не зависит от количества строк.
     """
     if not lines:
         raise ValueError('No lines')
 
     workshop = get_workshop_for_user(created_by) if created_by else None
+    item_queryset = _item_queryset(workshop)
+    totals = _aggregate_lines(lines)
+    delta = 1 if supply_type == 'in' else -1
 
-    last = Supply.objects.filter(workshop=workshop).order_by('-number').first() if workshop else Supply.objects.filter(workshop__isnull=True).order_by('-number').first()
-    number = (last.number + 1) if last else 1
+    # Без блоков номер берётся внутри транзакции документа — нумерация без пропусков.
+    number = next_supply_number(workshop) if getattr(settings, 'SUPPLY_NUMBER_BLOCK_SIZE', 1) > 1 else None
 
-    supply = Supply.objects.create(
-        number=number,
-        type=supply_type,
-        workshop=workshop,
-        created_by=created_by,
-    )
-    delta = 1 if supply_type == 'in' else -1
+    with transaction.atomic():
+        items = _load_items(item_queryset, [item_id for item_id, _ in totals])
 
-    # Товары только из цеха пользователя (защита мультитенантности)
-    item_queryset = Item.objects.filter(workshop=workshop) if workshop else Item.objects.filter(workshop__isnull=True)
+        sizes = _ensure_sizes(totals.keys(), workshop.pk if workshop else None)
 
-    for item_id, size_label, quantity in lines:
-        try:
-            item = item_queryset.get(id=item_id)
-        except Item.DoesNotExist:
-            raise ValueError(f'Товар с id {item_id} не найден или не принадлежит вашему цеху.')
-        size = get_or_create_size(item, size_label)
-        if supply_type == 'out' and size.quantity < quantity:
-            raise ValueError(
-                f'Недостаточно на складе: {item.name}, размер {size_label} — доступно {size.quantity}, запрошено {quantity}.'
-            )
-        SupplyLineItem.objects.create(
+        if supply_type == 'out':
+            for (item_id, size_label), quantity in totals.items():
+                size = sizes[(item_id, size_label)]
+                if size.quantity < quantity:
+                    raise ValueError(
+                        f'Недостаточно на складе: {items[item_id].name}, размер {size_label} — доступно {size.quantity}, запрошено {quantity}.'
+                    )
+
+        if number is None:
+            number = allocate_supply_numbers(workshop)
+
+        supply = Supply.objects.create(
+            number=number,
+            type=supply_type,
+            workshop=workshop,
+            created_by=created_by,
+        )
+        SupplyLineItem.objects.bulk_create([
+            SupplyLineItem(supply=supply, item=items[str(item_id)], size_label=size_label, quantity=quantity)
+            for item_id, size_label, quantity in lines
+        ])
+        deltas = {sizes[key].id: quantity * delta for key, quantity in totals.items()}
+        _apply_size_deltas(deltas)
+        refresh_item_stock(items.keys())
+        record_movements(
+            supply.workshop_id,
+            deltas,
+            StockMovement.REASON_SUPPLY_IN if supply_type == 'in' else StockMovement.REASON_SUPPLY_OUT,
             supply=supply,
-            item=item,
-            size_label=size_label,
-            quantity=quantity
         )
-        new_qty = max(0, size.quantity + quantity * delta)
-        size.quantity = new_qty
-        size.save()
-        item.updated_at = supply.date
-        item.save(update_fields=['updated_at'])
+        Item.objects.filter(id__in=items.keys()).update(updated_at=supply.date)
+        metric = 'received' if supply_type == 'in' else 'shipped'
+        add_rollups(
+            supply.workshop_id,
+            timezone.localdate(supply.date),
+            {key: {metric: quantity} for key, quantity in totals.items()},
+        )
+        # Товары поставки в журнал уже записал refresh_item_stock
+        record_changes(supply.workshop_id, ChangeLogEntry.ENTITY_SIZE, deltas.keys())
+        bump_catalog_version(workshop.pk if workshop else None)
 
     return supply
 
 
+def _reserve_stock(totals: dict, items: dict) -> dict:
+    """
+    Списывает остатки условными UPDATE ... WHERE quantity >= n — по одному на размер.
+    Если строку обновить не удалось (остатка уже не хватает), бросает ValueError,
+    и вся транзакция заказа откатывается. Параллельные заказы не могут увести остаток в минус.
+    Возвращает списания {size_id: -quantity}.
+    """
+    sizes = _lock_sizes(totals.keys())
+    deltas = {}
+    for key, quantity in sorted(totals.items()):
+        size = sizes.get(key)
+        reserved = size and SizeQuantity.objects.filter(
+            id=size.id,
+            quantity__gte=quantity,
+        ).update(quantity=F('quantity') - quantity)
+        if not reserved:
+            available = (
+                SizeQuantity.objects.filter(id=size.id).values_list('quantity', flat=True).first()
+                if size else 0
+            )
+            raise ValueError(
+                f'Недостаточно на складе: {items[key[0]].name}, размер {key[1]} — доступно {available}, запрошено {quantity}.'
+            )
+        deltas[size.id] = -quantity
+    return deltas
+
+
 def create_order(
     workshop: Workshop | None,
     source: str,
@@ -82,61 +270,120 @@ def create_order(
     """
     lines: [(item_id, size_label, quantity), ...]
     total считается по ценам товаров (item.price * quantity).
-    При создании заказа остатки на складе уменьшаются.
+    При создании заказа остатки на складе уменьшаются — атомарно, вместе с созданием заказа.
     """
     if not lines:
         raise ValueError('Добавьте хотя бы одну позицию в заказ')
 
-    item_queryset = (
-        Item.objects.filter(workshop=workshop)
-        if workshop
-        else Item.objects.filter(workshop__isnull=True)
-    )
+    totals = _aggregate_lines(lines)
 
-    # Проверка наличия и списание
-    for item_id, size_label, quantity in lines:
-        try:
-            item = item_queryset.get(id=item_id)
-        except Item.DoesNotExist:
-            raise ValueError(f'Товар с id {item_id} не найден или не принадлежит вашему цеху.')
-        size = get_or_create_size(item, size_label)
-        if size.quantity < quantity:
-            raise ValueError(
-                f'Недостаточно на складе: {item.name}, размер {size_label} — доступно {size.quantity}, запрошено {quantity}.'
+    with transaction.atomic():
+        items = _load_items(_item_queryset(workshop), [item_id for item_id, _ in totals])
+        deltas = _reserve_stock(totals, items)
+        refresh_item_stock(items.keys())
+
+        total = sum(
+            ((items[str(item_id)].price or Decimal('0')) * quantity for item_id, _, quantity in lines),
+            Decimal('0'),
+        )
+        order = Order.objects.create(
+            workshop=workshop,
+            source=source or '',
+            delivery_address=delivery_address or '',
+            client_phone=client_phone or '',
+            total=total,
+        )
+        OrderLineItem.objects.bulk_create([
+            OrderLineItem(
+                order=order,
+                item=items[str(item_id)],
+                size_label=size_label,
+                quantity=quantity,
+                price=items[str(item_id)].price,
             )
+            for item_id, size_label, quantity in lines
+        ])
+        record_movements(order.workshop_id, deltas, StockMovement.REASON_ORDER, order=order)
+        add_rollups(
+            order.workshop_id,
+            timezone.localdate(order.created_at),
+            {
+                key: {'sold': quantity, 'revenue': (items[key[0]].price or Decimal('0')) * quantity}
+                for key, quantity in totals.items()
+            },
+        )
+        record_changes(order.workshop_id, ChangeLogEntry.ENTITY_SIZE, deltas.keys())
+        bump_catalog_version(workshop.pk if workshop else None)
 
-    order = Order.objects.create(
-        workshop=workshop,
-        source=source or '',
-        delivery_address=delivery_address or '',
-        client_phone=client_phone or '',
-        total=Decimal('0'),
-    )
-    total = Decimal('0')
+    return order
 
-    for item_id, size_label, quantity in lines:
-        item = item_queryset.get(id=item_id)
-        OrderLineItem.objects.create(
-            order=order,
-            item=item,
-            size_label=size_label,
-            quantity=quantity,
+
+def _restore_orders_stock(workshop_id, order_ids) -> None:
+    """
+    Возвращает на склад остатки заказов order_ids (вызывать внутри транзакции):
+    строки всех заказов суммируются по размеру и применяются одним UPDATE,
+    движения журнала и дневные итоги пишутся по одному INSERT/UPDATE на всю пачку.
+    """
+    lines = list(
+        OrderLineItem.objects.filter(order_id__in=order_ids).values_list(
+            'order_id', 'item_id', 'size_label', 'quantity', 'price',
         )
-        price = item.price or Decimal('0')
-        total += price * quantity
-        # Списываем со склада
-        size = get_or_create_size(item, size_label)
-        size.quantity -= quantity
-        size.save()
+    )
+    totals = _aggregate_lines([line[1:4] for line in lines])
+    if not totals:
+        return
+    sizes = _ensure_sizes(totals.keys(), workshop_id)
+    deltas = {sizes[key].id: quantity for key, quantity in totals.items()}
+    _apply_size_deltas(deltas)
+    refresh_item_stock(item_id for item_id, _ in totals)
 
-    order.total = total
-    order.save(update_fields=['total'])
-    return order
+    movements = defaultdict(int)
+    cancelled = defaultdict(lambda: {'cancelled': 0, 'revenue': Decimal('0')})
+    for order_id, item_id, size_label, quantity, price in lines:
+        key = (str(item_id), size_label)
+        movements[(order_id, sizes[key].id)] += quantity
+        cancelled[key]['cancelled'] += quantity
+        cancelled[key]['revenue'] -= (price or Decimal('0')) * quantity
+    record_order_movements(workshop_id, movements, StockMovement.REASON_ORDER_CANCEL)
+    add_rollups(workshop_id, timezone.localdate(), cancelled)
+    record_changes(workshop_id, ChangeLogEntry.ENTITY_SIZE, deltas.keys())
+    bump_catalog_version(workshop_id)
 
 
 def restore_order_stock(order: Order) -> None:
-    """Вернуть остатки на склад при отмене заказа."""
-    for line in order.line_items.select_related('item').all():
-        size = get_or_create_size(line.item, line.size_label)
-        size.quantity += line.quantity
+    """Вернуть остатки заказа на склад одной транзакцией. Статус не проверяется — см. set_orders_status."""
+    with transaction.atomic():
+        _restore_orders_stock(order.workshop_id, [order.pk])
+
+
+def set_orders_status(workshop_id, order_ids, new_status: str) -> list:
+    """
+    Переводит заказы цеха в статус new_status одним UPDATE и возвращает id заказов,
+    у которых статус действительно сменился; чужие и несуществующие id пропускаются.
+    Строки заказов блокируются до UPDATE, поэтому повторная или параллельная отмена
+    не вернёт остатки дважды: возвращаются только заказы, которые ещё не были отменены.
+    """
+    with transaction.atomic():
+        changed = list(
+            Order.objects.select_for_update()
+            .filter(workshop_id=workshop_id, id__in=order_ids)
+            .exclude(status=new_status)
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+        if not changed:
+            return []
+        Order.objects.filter(id__in=changed).update(status=new_status)
+        record_changes(workshop_id, ChangeLogEntry.ENTITY_ORDER, changed)
+        if new_status == Order.STATUS_CANCELLED:
+            _restore_orders_stock(workshop_id, changed)
+    return changed
+
+
+def adjust_size_quantity(size: SizeQuantity, quantity: int) -> None:
+    """Ручная корректировка остатка (PATCH размера) с записью в журнал движений."""
+    with transaction.atomic():
+        current = SizeQuantity.objects.select_for_update().values_list('quantity', flat=True).get(pk=size.pk)
+        size.quantity = quantity
         size.save()
+        record_movements(size.workshop_id, {size.pk: quantity - current}, StockMovement.REASON_ADJUSTMENT)
@@ -0,0 +1,82 @@
+"""
+Сигналы моделей: версия публичного каталога, кеш штрихкодов, кеш пользователей,
+журнал изменений для синхронизации, сводка остатков товара, производные фото товаров
+и поисковый индекс SQLite (после migrate). Массовые изменения через queryset.update() сигналов не вызывают —
+их отмечают сами сервисы.
+"""
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from .authentication import forget_user
+from .barcodes import barcode_cache
+from .catalog_cache import bump_catalog_version
+from .models import ChangeLogEntry, Item, Order, SizeQuantity, Supply, Workshop, WorkshopAssignment
+from .photos import schedule_variants, variants_stale
+from .search import install_sqlite_fts
+from .stock_summary import refresh_item_stock
+from .sync import record_changes
+
+
+def _log_change(instance, entity, kwargs):
+    # При удалении цеха каскадом удаляется и его журнал — писать в него нечего
+    if isinstance(kwargs.get('origin'), Workshop):
+        return
+    record_changes(instance.workshop_id, entity, [instance.pk], deleted='created' not in kwargs)
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+def item_changed(sender, instance, **kwargs):
+    bump_catalog_version(instance.workshop_id)
+    _log_change(instance, ChangeLogEntry.ENTITY_ITEM, kwargs)
+    if 'created' in kwargs and not kwargs.get('raw') and variants_stale(instance):
+        schedule_variants(instance)
+
+
+@receiver(post_save, sender=Workshop)
+def workshop_changed(sender, instance, created, **kwargs):
+    # Название цеха входит в данные товаров публичного каталога
+    if not created and not kwargs.get('raw'):
+        bump_catalog_version(instance.pk)
+
+
+@receiver(post_save, sender=SizeQuantity)
+@receiver(post_delete, sender=SizeQuantity)
+def size_changed(sender, instance, **kwargs):
+    barcode_cache.invalidate(instance.workshop_id)
+    bump_catalog_version(instance.workshop_id)
+    _log_change(instance, ChangeLogEntry.ENTITY_SIZE, kwargs)
+    # Каскадное удаление вместе с товаром или цехом — сводку обновлять не у кого
+    if not isinstance(kwargs.get('origin'), (Item, Workshop)):
+        refresh_item_stock([instance.item_id])
+
+
+@receiver(post_save, sender=Supply)
+@receiver(post_delete, sender=Supply)
+def supply_changed(sender, instance, **kwargs):
+    _log_change(instance, ChangeLogEntry.ENTITY_SUPPLY, kwargs)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def order_changed(sender, instance, **kwargs):
+    _log_change(instance, ChangeLogEntry.ENTITY_ORDER, kwargs)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    forget_user(instance.pk)
+
+
+@receiver(post_save, sender=WorkshopAssignment)
+@receiver(post_delete, sender=WorkshopAssignment)
+def assignment_changed(sender, instance, **kwargs):
+    forget_user(instance.user_id)
+
+
+@receiver(post_migrate)
+def search_index_installed(sender, using, **kwargs):
+    if sender.name == 'sklad':
+        install_sqlite_fts(using)
@@ -0,0 +1,77 @@
+"""
+Сводка остатков товара (денормализация SizeQuantity на Item).
+
+total_quantity — сумма остатков размеров, in_stock_sizes — число размеров с
+остатком > 0, stock_version — счётчик изменений размеров товара (клиент по нему
+понимает, что список размеров пора перечитать). Списки товаров отдают сводку
+без чтения размеров (?sizes=0).
+
+Сводку пересчитывает refresh_item_stock — один UPDATE с подзапросами по
+SizeQuantity — в той же транзакции, что и изменение размеров: сервисы
+поставок и заказов, импорт каталога, сигналы сохранения/удаления размера.
+Пересчитанные товары он же пишет в журнал синхронизации: сводка входит в
+данные товара /api/sync/. rebuild_item_stock пересчитывает цеха целиком (после массовой загрузки),
+stock_mismatches находит расхождения (команда check_item_stock).
+"""
+from collections import defaultdict
+
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import ChangeLogEntry, Item, SizeQuantity
+from .sync import record_changes
+
+
+def _summary():
+    """Выражения сводки для строки Item: (total_quantity, in_stock_sizes)."""
+    sizes = SizeQuantity.objects.filter(item_id=OuterRef('pk')).order_by().values('item_id')
+    total = sizes.annotate(total=Sum('quantity')).values('total')
+    in_stock = sizes.annotate(count=Count('id', filter=Q(quantity__gt=0))).values('count')
+    return (
+        Coalesce(Subquery(total, output_field=IntegerField()), 0),
+        Coalesce(Subquery(in_stock, output_field=IntegerField()), 0),
+    )
+
+
+def _refresh(queryset) -> int:
+    total, in_stock = _summary()
+    return queryset.update(total_quantity=total, in_stock_sizes=in_stock, stock_version=F('stock_version') + 1)
+
+
+def refresh_item_stock(item_ids) -> None:
+    """
+    Пересчитывает сводку товаров item_ids одним UPDATE и отмечает их в журнале изменений
+    (вызывать в транзакции изменения размеров).
+    """
+    item_ids = set(item_ids)
+    if not item_ids:
+        return
+    items = Item.objects.filter(id__in=item_ids)
+    by_workshop = defaultdict(list)
+    for workshop_id, item_id in items.values_list('workshop_id', 'id'):
+        by_workshop[workshop_id].append(item_id)
+    _refresh(items)
+    for workshop_id, ids in by_workshop.items():
+        record_changes(workshop_id, ChangeLogEntry.ENTITY_ITEM, ids)
+
+
+def rebuild_item_stock(workshop_ids: list = None) -> int:
+    """Пересчитывает сводку всех товаров цехов (None — всех товаров). Возвращает число товаров."""
+    qs = Item.objects.all()
+    if workshop_ids is not None:
+        qs = qs.filter(workshop_id__in=workshop_ids)
+    return _refresh(qs)
+
+
+def stock_mismatches(workshop_ids: list = None):
+    """Товары, у которых сводка расходится с размерами: значения (id, сохранённые, ожидаемые)."""
+    total, in_stock = _summary()
+    qs = Item.objects.all()
+    if workshop_ids is not None:
+        qs = qs.filter(workshop_id__in=workshop_ids)
+    return (
+        qs.annotate(expected_total=total, expected_in_stock=in_stock)
+        .exclude(total_quantity=F('expected_total'), in_stock_sizes=F('expected_in_stock'))
+        .order_by('id')
+        .values_list('id', 'total_quantity', 'in_stock_sizes', 'expected_total', 'expected_in_stock')
+    )
@@ -0,0 +1,128 @@
+"""
+Дельта-синхронизация для мобильного клиента.
+
+Каждое изменение товара, размера, поставки или заказа пишется в ChangeLogEntry.
+Токен синхронизации — (последний id журнала, время выдачи). Следующий запрос
+получает записи с id больше токена, а также записи последних SYNC_OVERLAP_SECONDS
+до выдачи токена: транзакция, взявшая меньший id, могла закоммититься позже.
+Повторно присланный объект безвреден — клиент просто перезаписывает его.
+Журнал хранится SYNC_LOG_RETENTION_DAYS дней (prune_change_log); по более старому
+токену изменения уже не восстановить — ответ reset.
+"""
+import base64
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .models import ChangeLogEntry, Item, Order, SizeQuantity, Supply
+from .serializers import (
+    OrderDetailSerializer,
+    SizeQuantitySyncSerializer,
+    SupplyDetailSerializer,
+    SyncItemSerializer,
+)
+
+
+def record_changes(workshop_id, entity: str, object_ids, deleted: bool = False) -> None:
+    """Пишет в журнал изменения объектов одним INSERT."""
+    now = timezone.now()
+    ChangeLogEntry.objects.bulk_create([
+        ChangeLogEntry(workshop_id=workshop_id, entity=entity, object_id=str(pk), deleted=deleted, created_at=now)
+        for pk in dict.fromkeys(object_ids)
+    ])
+
+
+def log_cutoff() -> datetime:
+    """Записи журнала старше этого момента могут быть удалены."""
+    return timezone.now() - timedelta(days=getattr(settings, 'SYNC_LOG_RETENTION_DAYS', 30))
+
+
+def encode_token(last_id: int, issued_at: datetime) -> str:
+    raw = f'{last_id}:{issued_at.timestamp():.6f}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_token(token: str) -> tuple[int, datetime]:
+    """ValueError — токен повреждён."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        last_id, ts = base64.urlsafe_b64decode(padded).decode().split(':')
+        return int(last_id), datetime.fromtimestamp(float(ts), tz=dt_timezone.utc)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError('Неверный токен синхронизации')
+
+
+_ENTITIES = {
+    ChangeLogEntry.ENTITY_ITEM: ('items', lambda ids: Item.objects.select_related('workshop').filter(id__in=ids), SyncItemSerializer),
+    ChangeLogEntry.ENTITY_SIZE: ('sizes', lambda ids: SizeQuantity.objects.filter(id__in=ids), SizeQuantitySyncSerializer),
+    ChangeLogEntry.ENTITY_SUPPLY: (
+        'supplies',
+        lambda ids: Supply.objects.select_related('created_by').prefetch_related('line_items__item').filter(id__in=ids),
+        SupplyDetailSerializer,
+    ),
+    ChangeLogEntry.ENTITY_ORDER: (
+        'orders',
+        lambda ids: Order.objects.prefetch_related('line_items__item').filter(id__in=ids),
+        OrderDetailSerializer,
+    ),
+}
+
+
+def _serialize(entity, ids, request):
+    """(данные существующих объектов, id удалённых)."""
+    _, queryset, serializer_class = _ENTITIES[entity]
+    objects = list(queryset(ids))
+    present = {str(obj.pk) for obj in objects}
+    data = serializer_class(objects, many=True, context={'request': request}).data
+    return data, [pk for pk in ids if pk not in present]
+
+
+def build_sync_payload(workshop_id, since: str | None, request) -> dict:
+    """
+    Ответ GET /api/sync/. Без since — весь каталог (товары и размеры) и токен;
+    с since — только изменённые с момента токена объекты и удалённые id.
+    Если изменений больше SYNC_MAX_CHANGES или токен старше срока хранения журнала —
+    reset: клиенту нужна полная загрузка.
+    """
+    log = ChangeLogEntry.objects.filter(workshop_id=workshop_id)
+    issued_at = timezone.now()
+    last_id = log.aggregate(m=Max('id'))['m'] or 0
+    payload = {'token': encode_token(last_id, issued_at), 'reset': False}
+    for name, _, _ in _ENTITIES.values():
+        payload[name] = []
+    payload['deleted'] = {name: [] for name, _, _ in _ENTITIES.values()}
+
+    if not since:
+        items = Item.objects.select_related('workshop').filter(workshop_id=workshop_id)
+        payload['items'] = SyncItemSerializer(items, many=True, context={'request': request}).data
+        payload['sizes'] = SizeQuantitySyncSerializer(
+            SizeQuantity.objects.filter(workshop_id=workshop_id), many=True
+        ).data
+        return payload
+
+    since_id, since_at = decode_token(since)
+    overlap = timedelta(seconds=getattr(settings, 'SYNC_OVERLAP_SECONDS', 30))
+    if since_at - overlap < log_cutoff():
+        # Часть нужных записей журнала уже удалена
+        payload['reset'] = True
+        return payload
+    changes = (
+        log.filter(Q(id__gt=since_id) | Q(created_at__gte=since_at - overlap))
+        .filter(id__lte=last_id)
+        .values_list('entity', 'object_id')
+        .distinct()
+    )
+    limit = getattr(settings, 'SYNC_MAX_CHANGES', 5000)
+    changed = {}
+    for n, (entity, object_id) in enumerate(changes.iterator()):
+        if n >= limit:
+            payload['reset'] = True
+            return payload
+        changed.setdefault(entity, []).append(object_id)
+
+    for entity, ids in changed.items():
+        name = _ENTITIES[entity][0]
+        payload[name], payload['deleted'][name] = _serialize(entity, ids, request)
+    return payload
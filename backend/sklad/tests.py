@@ -0,0 +1,167 @@
+"""
+Тесты: python manage.py test sklad
+
+Быстрые сериализаторы списков (sklad.fast_serializers) должны отдавать тот же JSON, что
+и DRF ModelSerializer, байт в байт — включая фото и производные, пустую цену и время
+в разных часовых поясах. Параллельные заказы не уводят остатки в минус
+(большой прогон — manage.py stress_orders).
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Prefetch, Sum
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from .fast_serializers import (
+    ITEM_FIELDS,
+    ORDER_FIELDS,
+    SUPPLY_FIELDS,
+    serialize_items,
+    serialize_orders,
+    serialize_supplies,
+)
+from .benchmarks import bench_workshop, place_orders_concurrently
+from .imaging import VARIANTS, variant_name
+from .models import Item, Order, OrderLineItem, SizeQuantity, Supply, SupplyLineItem, Workshop, WorkshopAssignment
+from .serializers import ItemListSerializer, OrderListSerializer, PublicItemListSerializer, SupplyDetailSerializer
+from .services import create_supply
+from .stock_summary import rebuild_item_stock
+
+TIMEZONES = ('UTC', 'Europe/Moscow', 'America/New_York', 'Asia/Kolkata')
+
+
+class FastSerializersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        workshop = Workshop.objects.create(name='Цех')
+        user = User.objects.create_user(username='кладовщик')
+        WorkshopAssignment.objects.create(user=user, workshop=workshop)
+        base = datetime(2024, 3, 31, 0, 30, tzinfo=dt_timezone.utc)
+
+        items = [
+            # Фото с готовыми производными, цена не задана
+            Item(workshop=workshop, name='С производными', price=None, photo='items/фото 1.jpg'),
+            # Производные от прежнего фото — в ответе их быть не должно
+            Item(workshop=workshop, name='Устаревшие', price=Decimal('1299.5'), photo='items/новое.jpg'),
+            Item(workshop=workshop, name='Фото без производных', price=Decimal('0.01'), photo='items/x.png',
+                 item_description='Описание'),
+            Item(workshop=workshop, name='Без фото', price=Decimal('99999999.99'), item_description='',
+                 wb_url='https://www.wildberries.ru/catalog/1/detail.aspx'),
+            Item(workshop=None, name='Без цеха', price=Decimal('10')),
+        ]
+        Item.objects.bulk_create(items)
+        items[0].photo_variants = {
+            'source': items[0].photo.name, **{v: variant_name(items[0].pk, items[0].photo.name, v) for v in VARIANTS},
+        }
+        items[1].photo_variants = {
+            'source': 'items/старое.jpg', **{v: variant_name(items[1].pk, 'items/старое.jpg', v) for v in VARIANTS},
+        }
+        for n, item in enumerate(items):
+            # Секунды без долей, с долями и переход через полночь / перевод часов в разных поясах
+            item.created_at = base + timedelta(hours=n * 7, microseconds=n * 123457 % 1000000)
+            item.updated_at = item.created_at + timedelta(days=n)
+        Item.objects.bulk_update(items, ['photo_variants', 'created_at', 'updated_at'])
+        SizeQuantity.objects.bulk_create([
+            SizeQuantity(item=item, workshop=item.workshop, size_label=label, quantity=quantity, barcode=barcode)
+            for n, item in enumerate(items)
+            for label, quantity, barcode in (('S', 0, None), ('M', 5, f'46{n:011d}'), ('XL', 2, None))
+        ])
+        rebuild_item_stock([workshop.pk, None])
+
+        orders = Order.objects.bulk_create([
+            Order(workshop=workshop, source='Ozon', delivery_address='г. Москва', client_phone='+79000000000',
+                  total=Decimal('1234.50'), status=status)
+            for status, _ in Order.STATUS_CHOICES
+        ])
+        for n, order in enumerate(orders):
+            order.created_at = base + timedelta(hours=n * 5, microseconds=n * 250000)
+        Order.objects.bulk_update(orders, ['created_at'])
+
+        # Поставка с автором и без него (данные без цеха)
+        supplies = [
+            create_supply('in', [(items[0].id, 'M', 3), (items[1].id, 'S', 1)], created_by=user),
+            create_supply('out', [(items[4].id, 'XL', 1)]),
+        ]
+        for n, supply in enumerate(supplies):
+            Supply.objects.filter(pk=supply.pk).update(date=base + timedelta(days=n, microseconds=n))
+
+    def setUp(self):
+        self.request = RequestFactory().get('/api/items/', HTTP_HOST='sklad.example')
+        self.items = Item.objects.order_by('created_at', 'id')
+        self.orders = Order.objects.order_by('-created_at', '-id')
+        self.supplies = Supply.objects.order_by('-date', '-id')
+
+    def assertSameJSON(self, drf, fast):
+        renderer = JSONRenderer()
+        for tz in TIMEZONES:
+            with self.subTest(timezone=tz), timezone.override(tz):
+                self.assertEqual(renderer.render(fast()).decode(), renderer.render(drf()).decode())
+
+    def test_items(self):
+        self.assertSameJSON(
+            lambda: ItemListSerializer(
+                self.items.select_related('workshop').prefetch_related('sizes'), many=True,
+                context={'request': self.request},
+            ).data,
+            lambda: serialize_items(self.items.values(*ITEM_FIELDS), self.request),
+        )
+
+    def test_public_items(self):
+        self.assertSameJSON(
+            lambda: PublicItemListSerializer(
+                self.items.select_related('workshop').prefetch_related('sizes'), many=True,
+                context={'request': self.request},
+            ).data,
+            lambda: serialize_items(self.items.values(*ITEM_FIELDS), self.request, public=True),
+        )
+
+    def test_orders(self):
+        self.assertSameJSON(
+            lambda: OrderListSerializer(self.orders.all(), many=True).data,
+            lambda: serialize_orders(self.orders.values(*ORDER_FIELDS)),
+        )
+
+    def test_supplies(self):
+        lines = Prefetch('line_items', queryset=SupplyLineItem.objects.select_related('item'))
+        self.assertSameJSON(
+            lambda: SupplyDetailSerializer(
+                self.supplies.select_related('created_by').prefetch_related(lines), many=True,
+            ).data,
+            lambda: serialize_supplies(self.supplies.values(*SUPPLY_FIELDS)),
+        )
+
+    def test_photo_variants(self):
+        """Производные отдаются только для текущего фото; пустая цена — null."""
+        rows = {row['name']: row for row in serialize_items(self.items.values(*ITEM_FIELDS), self.request)}
+        variants = rows['С производными']['photo_variants']
+        self.assertEqual(set(variants), set(VARIANTS))
+        self.assertTrue(variants['thumb'].startswith('http://sklad.example/'))
+        self.assertIsNone(rows['С производными']['price'])
+        self.assertIsNone(rows['Устаревшие']['photo_variants'])
+        self.assertIsNone(rows['Фото без производных']['photo_variants'])
+        self.assertIsNone(rows['Без фото']['photo'])
+
+
+class ConcurrentOrdersTests(TransactionTestCase):
+    """Потоки оформляют заказы по одним и тем же размерам — каждый со своим соединением."""
+
+    def test_no_oversell(self):
+        sizes, stock = ('S', 'M'), 10
+        with bench_workshop(items=2, sizes=sizes, quantity=stock) as (workshop, _, items):
+            counters = place_orders_concurrently(workshop, items, sizes, threads=4, orders=60)
+            remaining = SizeQuantity.objects.filter(workshop=workshop)
+            sold = OrderLineItem.objects.filter(order__workshop=workshop).aggregate(s=Sum('quantity'))['s'] or 0
+
+            self.assertEqual(sum(counters.values()), 60)
+            self.assertGreater(counters['placed'], 0)
+            if connection.features.has_select_for_update:
+                # На SQLite параллельные записи получают «database is locked» — это ошибки БД, не перепродажа
+                self.assertEqual(counters['errors'], 0)
+                self.assertGreater(counters['rejected'], 0)
+            self.assertFalse(remaining.filter(quantity__lt=0).exists())
+            self.assertEqual(remaining.aggregate(s=Sum('quantity'))['s'], stock * len(items) * len(sizes) - sold)
+            self.assertEqual(Order.objects.filter(workshop=workshop).count(), counters['placed'])
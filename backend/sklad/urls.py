@@ -9,8 +9,15 @@ from .views import (
     SupplyViewSet,
     OrderViewSet,
     SizeByBarcodeView,
+    SizeByBarcodeBatchView,
     PublicItemListView,
     PublicItemDetailView,
+    ExportView,
+    StockAtView,
+    SyncView,
+    MetricsView,
+    CatalogImportView,
+    SalesAnalyticsView,
 )
 from .auth_views import LoginView
 
@@ -28,6 +35,7 @@ urlpatterns = [
     path('auth/login/', LoginView.as_view(), name='login'),
     path('auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('sizes/by_barcode/', SizeByBarcodeView.as_view(), name='size-by-barcode'),
+    path('sizes/by_barcode/batch/', SizeByBarcodeBatchView.as_view(), name='size-by-barcode-batch'),
     path(
         'items/<uuid:item_pk>/sizes/',
         SizeQuantityListCreateView.as_view(),
@@ -38,5 +46,11 @@ urlpatterns = [
         SizeQuantityDetailView.as_view(),
         name='item-size-detail'
     ),
+    path('sync/', SyncView.as_view(), name='sync'),
+    path('stock/at/', StockAtView.as_view(), name='stock-at'),
+    path('export/<str:dataset>.<str:fmt>', ExportView.as_view(), name='export'),
+    path('import/items/', CatalogImportView.as_view(), name='import-items'),
+    path('analytics/sales/', SalesAnalyticsView.as_view(), name='analytics-sales'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path('', include(router.urls)),
 ]
@@ -1,18 +1,39 @@
-from drf_spectacular.utils import extend_schema, extend_schema_view
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date
+from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
+from .exports import DATASETS, FORMATS, export_rows, parse_bound, render
+from .imports import ImportFileError, import_catalog
+from .fast_serializers import (
+    ITEM_FIELDS,
+    ORDER_FIELDS,
+    SUPPLY_FIELDS,
+    aserialize_items,
+    serialize_items,
+    serialize_orders,
+    serialize_supplies,
+)
+from .barcodes import aresolve_barcodes, resolve_barcodes
+from .catalog_cache import acatalog_response, aitem_catalog_state, aworkshop_catalog_state
 from .models import Item, Order, SizeQuantity, Supply
 from .serializers import (
+    BARCODE_BATCH_LIMIT,
+    ORDER_BULK_STATUS_LIMIT,
+    BarcodeBatchSerializer,
+    CatalogImportSerializer,
     ItemListSerializer,
     ItemDetailSerializer,
     ItemCreateUpdateSerializer,
-    PublicItemListSerializer,
     PublicItemDetailSerializer,
     SizeQuantitySerializer,
     SupplyDetailSerializer,
@@ -21,49 +42,162 @@ from .serializers import (
     OrderDetailSerializer,
     OrderCreateSerializer,
     OrderStatusSerializer,
+    OrderBulkStatusSerializer,
+)
+from .services import (
+    adjust_size_quantity,
+    get_or_create_size,
+    get_workshop_for_user,
+    is_barcode_taken,
+    set_orders_status,
 )
-from .services import get_or_create_size, get_workshop_for_user, restore_order_stock
-from .mixins import WorkshopFilterMixin
+from .ledger import stock_at
+from .reorder import REORDER_LIST_LIMIT, reorder_list
+from .search import MAX_SEARCH_LIMIT, SEARCH_LIMIT, search_items, search_terms
+from .catalog_filters import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    ORDERINGS,
+    catalog_scope,
+    filter_catalog,
+    is_paged,
+    order_catalog,
+    parse_catalog_query,
+    parse_flag,
+)
+from .rollups import GROUPINGS, MAX_LIMIT, METRICS, default_period, rollup_report
+from .metrics import registry as metrics_registry
+from .mixins import AsyncViewMixin, IdempotencyMixin, WorkshopFilterMixin
+from .pagination import KeysetPagination
+from .sync import build_sync_payload
+
+
+def _limit_param(request, default: int, maximum: int):
+    """Query-параметр limit: целое от 1 до maximum; None — значение неверное."""
+    try:
+        limit = int(request.query_params.get('limit') or default)
+    except ValueError:
+        return None
+    return limit if 1 <= limit <= maximum else None
+
+
+def _limit_error(maximum: int) -> Response:
+    return Response({'limit': [f'Целое число от 1 до {maximum}']}, status=status.HTTP_400_BAD_REQUEST)
+
+
+def _fast_list(view, fields, serialize):
+    """list() вьюсета через .values() и быстрый сериализатор; пагинация — как обычно."""
+    queryset = view.filter_queryset(view.get_queryset()).prefetch_related(None).values(*fields)
+    page = view.paginate_queryset(queryset)
+    if page is not None:
+        return view.get_paginated_response(serialize(page))
+    return Response(serialize(queryset))
 
 
 @extend_schema(
     summary='Публичный список товаров',
-    description='Без авторизации. Поля: id, name, photo, price, wb_url, ozon_url, workshop, sizes (без created_at, updated_at, item_description). Query: workshop_id — фильтр по цеху.',
+    description=(
+        'Без авторизации. Поля: id, name, photo, photo_variants (миниатюры и WebP; null, пока не готовы), price, wb_url, '
+        'ozon_url, workshop, total_quantity, in_stock_sizes, stock_version, sizes (без created_at, updated_at, '
+        'item_description). Query: workshop_id — фильтр по цеху; sizes=0 — без списка размеров (остатки сводкой); '
+        'in_stock=true — есть размер в наличии; size_label — есть такой размер (с in_stock — в наличии); price_min, '
+        'price_max; ordering — created_at (по умолчанию), -created_at, price, -price, name; q — поиск по названию и '
+        'описанию (без ordering — по рангу, без limit — первые 50 совпадений). С limit/offset ответ постраничный: '
+        f'{{count, next_offset, results}}, limit — до {MAX_PAGE_SIZE}. Без них — список целиком. '
+        'Ответ с ETag/Last-Modified: при If-None-Match с той же версией каталога — 304.'
+    ),
+    parameters=[
+        OpenApiParameter('workshop_id', str, description='Фильтр по цеху'),
+        OpenApiParameter('in_stock', bool, description='Только товары в наличии'),
+        OpenApiParameter('sizes', bool, description='false — без списка размеров'),
+        OpenApiParameter('size_label', str, description='Товары с этим размером'),
+        OpenApiParameter('price_min', str, description='Цена от'),
+        OpenApiParameter('price_max', str, description='Цена до'),
+        OpenApiParameter('ordering', str, enum=list(ORDERINGS), description='Сортировка'),
+        OpenApiParameter('q', str, description='Поисковый запрос'),
+        OpenApiParameter('limit', int, description='Размер страницы'),
+        OpenApiParameter('offset', int, description='Сколько товаров пропустить'),
+    ],
     tags=['Публичное API'],
 )
-class PublicItemListView(APIView):
+class PublicItemListView(AsyncViewMixin, APIView):
     permission_classes = [AllowAny]
 
-    def get(self, request):
+    async def get(self, request):
         workshop_id = request.query_params.get('workshop_id')
-        if workshop_id:
-            qs = Item.objects.filter(workshop_id=workshop_id)
-        else:
-            qs = Item.objects.all()
-        qs = qs.select_related('workshop').prefetch_related('sizes').order_by('created_at')
-        serializer = PublicItemListSerializer(qs, many=True, context={'request': request})
-        return Response(serializer.data)
+        query, errors = parse_catalog_query(request.query_params)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        terms = search_terms(request.query_params.get('q'))
+        if terms:
+            query['q'] = ' '.join(terms)
+        with_sizes = query.get('sizes', True)
+
+        async def build():
+            if workshop_id:
+                qs = Item.objects.filter(workshop_id=workshop_id)
+            else:
+                qs = Item.objects.all()
+            qs = filter_catalog(qs, query)
+            if terms:
+                # Ранжирование (FTS5 / difflib) синхронное — в потоке
+                qs = await sync_to_async(search_items)(qs, query['q'])
+                if 'ordering' in query:
+                    qs = order_catalog(qs, query)
+            else:
+                qs = order_catalog(qs, query)
+            rows = qs.values(*ITEM_FIELDS)
+            if not is_paged(query):
+                return await aserialize_items(rows[:SEARCH_LIMIT] if terms else rows, request, True, with_sizes)
+            offset, limit = query.get('offset', 0), query.get('limit', DEFAULT_PAGE_SIZE)
+            page = [row async for row in rows[offset:offset + limit + 1]]
+            return {
+                'count': await qs.acount(),
+                'next_offset': offset + limit if len(page) > limit else None,
+                'results': await aserialize_items(page[:limit], request, True, with_sizes),
+            }
+
+        state = await aworkshop_catalog_state(workshop_id)
+        if workshop_id and state is None:
+            return Response({'count': 0, 'next_offset': None, 'results': []} if is_paged(query) else [])
+        return await acatalog_response(request, f'list:{workshop_id or "all"}{catalog_scope(query)}', state, build)
 
 
 @extend_schema(
     summary='Публичные полные данные товара по id',
-    description='Без авторизации. Вся информация по товару: name, photo, item_description, price, wb_url, ozon_url, workshop, created_at, updated_at, sizes.',
+    description='Без авторизации. Вся информация по товару: name, photo, photo_variants, item_description, price, wb_url, ozon_url, workshop, created_at, updated_at, sizes.',
     tags=['Публичное API'],
 )
-class PublicItemDetailView(APIView):
+class PublicItemDetailView(AsyncViewMixin, APIView):
     permission_classes = [AllowAny]
 
-    def get(self, request, pk):
-        try:
-            item = Item.objects.select_related('workshop').prefetch_related('sizes').get(pk=pk)
-        except Item.DoesNotExist:
+    async def get(self, request, pk):
+        state = await aitem_catalog_state(pk)
+        if state is None:
             return Response({'detail': 'Не найден'}, status=status.HTTP_404_NOT_FOUND)
-        serializer = PublicItemDetailSerializer(item, context={'request': request})
-        return Response(serializer.data)
+
+        async def build():
+            item = await Item.objects.select_related('workshop').prefetch_related('sizes').aget(pk=pk)
+            return PublicItemDetailSerializer(item, context={'request': request}).data
+
+        return await acatalog_response(request, f'item:{pk}', state, build)
 
 
 @extend_schema_view(
-    list=extend_schema(summary='Список товаров', description='Товары текущего цеха пользователя.'),
+    list=extend_schema(
+        summary='Список товаров',
+        description=(
+            'Товары текущего цеха пользователя. С cursor/page_size — постранично: {next, results}. '
+            'Остатки — сводкой (total_quantity, in_stock_sizes, stock_version) и списком sizes; sizes=0 — без списка. '
+            f'С q — поиск по названию и описанию (префиксы слов, опечатки в названии): до limit лучших '
+            f'совпадений по рангу списком, без постраничной выдачи (limit по умолчанию {SEARCH_LIMIT}, не больше {MAX_SEARCH_LIMIT}).'
+        ),
+        parameters=[
+            OpenApiParameter('q', str, description='Поисковый запрос'),
+            OpenApiParameter('limit', int, description='Сколько результатов поиска вернуть'),
+            OpenApiParameter('sizes', bool, description='false — без списка размеров'),
+        ],
+    ),
     retrieve=extend_schema(summary='Детали товара', description='Один товар по id со списком размеров и остатками.'),
     create=extend_schema(summary='Создать товар', description='name, item_description (опц.), photo (опц.), price, wb_url, ozon_url (опц.).'),
     update=extend_schema(summary='Обновить товар', description='Полное обновление полей товара (в т.ч. wb_url, ozon_url).'),
@@ -72,9 +206,16 @@ class PublicItemDetailView(APIView):
 )
 class ItemViewSet(WorkshopFilterMixin, ModelViewSet):
     parser_classes = [MultiPartParser, FormParser, JSONParser]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('created_at', 'id')
 
     def get_queryset(self):
-        return self.get_workshop_queryset(Item).select_related('workshop').prefetch_related('sizes')
+        return (
+            self.get_workshop_queryset(Item)
+            .select_related('workshop')
+            .prefetch_related('sizes')
+            .order_by(*self.keyset_ordering)
+        )
 
     def get_serializer_class(self):
         if self.action in ('list',):
@@ -83,6 +224,22 @@ class ItemViewSet(WorkshopFilterMixin, ModelViewSet):
             return ItemDetailSerializer
         return ItemCreateUpdateSerializer
 
+    def list(self, request, *args, **kwargs):
+        errors = {}
+        with_sizes = parse_flag(request.query_params, 'sizes', errors) is not False
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        q = request.query_params.get('q', '').strip()
+        if q:
+            # Поиск: лучшие совпадения по рангу, без постраничной выдачи
+            limit = _limit_param(request, SEARCH_LIMIT, MAX_SEARCH_LIMIT)
+            if limit is None:
+                return _limit_error(MAX_SEARCH_LIMIT)
+            found = search_items(self.filter_queryset(self.get_queryset()), q).prefetch_related(None)
+            return Response(serialize_items(found.values(*ITEM_FIELDS)[:limit], request, with_sizes=with_sizes))
+        # Формат ItemListSerializer, но без ModelSerializer (см. fast_serializers)
+        return _fast_list(self, ITEM_FIELDS, lambda rows: serialize_items(rows, request, with_sizes=with_sizes))
+
     def perform_create(self, serializer):
         workshop = self.get_workshop()
         serializer.save(workshop=workshop)
@@ -92,6 +249,30 @@ class ItemViewSet(WorkshopFilterMixin, ModelViewSet):
         instance.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @extend_schema(
+        summary='Рекомендации дозаказа',
+        description=(
+            'Размеры, которые скоро закончатся: остаток не выше точки дозаказа, сначала с наименьшим запасом в днях. '
+            'Скорость продаж (velocity, шт./день) и точки дозаказа пересчитываются по расписанию '
+            '(manage.py compute_reorder, поле computed_at); остаток, запас в днях (days_of_cover) '
+            'и рекомендуемое количество (suggested_quantity) — по текущему остатку. '
+            f'Query: all=true — все размеры со спросом, limit — не больше {REORDER_LIST_LIMIT} (по умолчанию 100).'
+        ),
+        parameters=[
+            OpenApiParameter('all', bool, description='Все размеры со спросом, а не только требующие дозаказа'),
+            OpenApiParameter('limit', int, description='Сколько строк вернуть'),
+        ],
+        responses={200: dict},
+    )
+    @action(detail=False, methods=['get'], url_path='reorder')
+    def reorder(self, request):
+        limit = _limit_param(request, 100, REORDER_LIST_LIMIT)
+        if limit is None:
+            return _limit_error(REORDER_LIST_LIMIT)
+        workshop = self.get_workshop()
+        include_all = request.query_params.get('all', '').lower() in ('1', 'true')
+        return Response(reorder_list(workshop.pk if workshop else None, include_all=include_all, limit=limit))
+
 
 @extend_schema_view(
     get=extend_schema(summary='Список размеров товара', description='Все размеры и остатки по товару item_pk.', tags=['Размеры и остатки']),
@@ -123,9 +304,19 @@ class SizeQuantityListCreateView(WorkshopFilterMixin, APIView):
         barcode = data.get('barcode') or None
         if not size_label:
             return Response({'size_label': ['Обязательное поле']}, status=status.HTTP_400_BAD_REQUEST)
-        size = get_or_create_size(item, str(size_label).strip())
-        size.barcode = barcode
-        size.save()
+        try:
+            with transaction.atomic():
+                size = get_or_create_size(item, str(size_label).strip())
+                if is_barcode_taken(item.workshop_id, barcode, exclude_pk=size.pk):
+                    transaction.set_rollback(True)
+                    return Response({'barcode': ['Штрихкод уже используется в этом цехе']}, status=status.HTTP_400_BAD_REQUEST)
+                size.barcode = barcode
+                size.save()
+        except IntegrityError:
+            # Тот же штрихкод мог сохранить параллельный запрос уже после проверки
+            if is_barcode_taken(item.workshop_id, barcode, exclude_pk=size.pk):
+                return Response({'barcode': ['Штрихкод уже используется в этом цехе']}, status=status.HTTP_400_BAD_REQUEST)
+            raise
         return Response(SizeQuantitySerializer(size).data, status=status.HTTP_201_CREATED)
 
 
@@ -134,25 +325,44 @@ class SizeQuantityListCreateView(WorkshopFilterMixin, APIView):
     description='Query: barcode. Возвращает item_id и size_label. Только товары цеха пользователя.',
     tags=['Размеры и остатки'],
 )
-class SizeByBarcodeView(WorkshopFilterMixin, APIView):
-    def get(self, request):
+class SizeByBarcodeView(AsyncViewMixin, WorkshopFilterMixin, APIView):
+    async def get(self, request):
         barcode = request.query_params.get('barcode', '').strip()
         if not barcode:
             return Response({'detail': 'barcode required'}, status=status.HTTP_400_BAD_REQUEST)
-        workshop = self.get_workshop()
-        qs = SizeQuantity.objects.select_related('item').filter(barcode=barcode)
-        if workshop:
-            qs = qs.filter(item__workshop=workshop)
-        else:
-            qs = qs.filter(item__workshop__isnull=True)
-        try:
-            size = qs.get()
-            return Response({
-                'item_id': str(size.item_id),
-                'size_label': size.size_label,
-            })
-        except SizeQuantity.DoesNotExist:
+        workshop = await self.aget_workshop()
+        found = await aresolve_barcodes(workshop.pk if workshop else None, [barcode])
+        if barcode not in found:
             return Response({'detail': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
+        item_id, size_label = found[barcode]
+        return Response({'item_id': item_id, 'size_label': size_label})
+
+
+@extend_schema(
+    summary='Поиск по списку штрихкодов',
+    description=(
+        f'Тело: {{"barcodes": [...]}} — до {BARCODE_BATCH_LIMIT} штрихкодов. Один запрос к БД на всю пачку. '
+        'Ответ: results — [{barcode, item_id, size_label}] в порядке запроса, not_found — ненайденные.'
+    ),
+    request=BarcodeBatchSerializer,
+    tags=['Размеры и остатки'],
+)
+class SizeByBarcodeBatchView(WorkshopFilterMixin, APIView):
+    parser_classes = [JSONParser]
+
+    def post(self, request):
+        ser = BarcodeBatchSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        barcodes = list(dict.fromkeys(b.strip() for b in ser.validated_data['barcodes'] if b.strip()))
+        workshop = self.get_workshop()
+        found = resolve_barcodes(workshop.pk if workshop else None, barcodes)
+        return Response({
+            'results': [
+                {'barcode': b, 'item_id': found[b][0], 'size_label': found[b][1]}
+                for b in barcodes if b in found
+            ],
+            'not_found': [b for b in barcodes if b not in found],
+        })
 
 
 @extend_schema_view(
@@ -172,10 +382,28 @@ class SizeQuantityDetailView(WorkshopFilterMixin, APIView):
         except SizeQuantity.DoesNotExist:
             return Response({'detail': 'Размер не найден'}, status=status.HTTP_404_NOT_FOUND)
         data = request.data or {}
-        for key in ('size_label', 'quantity', 'barcode'):
+        if 'barcode' in data and is_barcode_taken(size.workshop_id, data['barcode'], exclude_pk=size.pk):
+            return Response({'barcode': ['Штрихкод уже используется в этом цехе']}, status=status.HTTP_400_BAD_REQUEST)
+        for key in ('size_label', 'barcode'):
             if key in data:
                 setattr(size, key, data[key])
-        size.save()
+        if 'quantity' in data:
+            try:
+                quantity = int(data['quantity'])
+            except (TypeError, ValueError):
+                return Response({'quantity': ['Ожидается целое число']}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            if 'quantity' in data:
+                adjust_size_quantity(size, quantity)
+            else:
+                # Сводка остатков товара обновляется сигналом — в той же транзакции
+                with transaction.atomic():
+                    size.save()
+        except IntegrityError:
+            # Тот же штрихкод мог сохранить параллельный запрос уже после проверки
+            if is_barcode_taken(size.workshop_id, size.barcode, exclude_pk=size.pk):
+                return Response({'barcode': ['Штрихкод уже используется в этом цехе']}, status=status.HTTP_400_BAD_REQUEST)
+            raise
         return Response(SizeQuantitySerializer(size).data)
 
     def delete(self, request, item_pk, pk):
@@ -184,23 +412,35 @@ class SizeQuantityDetailView(WorkshopFilterMixin, APIView):
             size = SizeQuantity.objects.get(pk=pk, item_id=item_pk)
         except SizeQuantity.DoesNotExist:
             return Response(status=status.HTTP_204_NO_CONTENT)
-        size.delete()
+        # Сводка остатков товара обновляется сигналом — в той же транзакции
+        with transaction.atomic():
+            size.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 @extend_schema_view(
-    list=extend_schema(summary='Список поставок', description='Поставки цеха. Query: item_id — фильтр по товару.'),
+    list=extend_schema(summary='Список поставок', description='Поставки цеха, новые первыми. Query: item_id — фильтр по товару; cursor, page_size — постранично ({next, results}), без них — последние 100 списком.'),
     retrieve=extend_schema(summary='Детали поставки', description='Одна поставка с составом (line_items) и created_by_username.'),
-    create=extend_schema(summary='Создать поставку/отгрузку', description='Тело: type (in|out), lines: [{item_id, size_label, quantity}].'),
+    create=extend_schema(
+        summary='Создать поставку/отгрузку',
+        description='Тело: type (in|out), lines: [{item_id, size_label, quantity}]. Заголовок Idempotency-Key — повтор с тем же ключом вернёт первый ответ, не создавая документ.',
+    ),
     tags=['Поставки'],
 )
-class SupplyViewSet(WorkshopFilterMixin, ModelViewSet):
+class SupplyViewSet(IdempotencyMixin, WorkshopFilterMixin, ModelViewSet):
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-date', '-id')
+
     def get_queryset(self):
         qs = self.get_workshop_queryset(Supply)
         item_id = self.request.query_params.get('item_id')
         if item_id:
             qs = qs.filter(line_items__item_id=item_id).distinct()
-        return qs.prefetch_related('line_items').order_by('-date')[:100]
+        qs = qs.prefetch_related('line_items').order_by(*self.keyset_ordering)
+        if self.action == 'list' and not self.paginator.is_requested(self.request):
+            # Без cursor/page_size — прежний ответ: последние 100 документов списком
+            qs = qs[:100]
+        return qs
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve',):
@@ -209,7 +449,13 @@ class SupplyViewSet(WorkshopFilterMixin, ModelViewSet):
             return SupplyCreateSerializer
         return SupplyDetailSerializer
 
+    def list(self, request, *args, **kwargs):
+        return _fast_list(self, SUPPLY_FIELDS, serialize_supplies)
+
     def create(self, request, *args, **kwargs):
+        return self.idempotent(request, self._create)
+
+    def _create(self, request):
         serializer = SupplyCreateSerializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
         supply = serializer.save()
@@ -220,22 +466,29 @@ class SupplyViewSet(WorkshopFilterMixin, ModelViewSet):
 
 
 @extend_schema_view(
-    list=extend_schema(summary='Список заказов', description='Заказы цеха. Query: item_id — фильтр по товару.'),
+    list=extend_schema(summary='Список заказов', description='Заказы цеха, новые первыми. Query: item_id — фильтр по товару; cursor, page_size — постранично ({next, results}), без них — последние 100 списком.'),
     retrieve=extend_schema(summary='Детали заказа', description='Заказ с составом (line_items), суммой, адресом и телефоном.'),
     create=extend_schema(
         summary='Создать заказ',
-        description='Тело: source, delivery_address, client_phone, lines: [{item_id, size_label, quantity}]. Остатки на складе списываются. total считается по ценам товаров.',
+        description='Тело: source, delivery_address, client_phone, lines: [{item_id, size_label, quantity}]. Остатки на складе списываются. total считается по ценам товаров. Заголовок Idempotency-Key — повтор с тем же ключом вернёт первый ответ, не списывая остатки второй раз.',
     ),
     partial_update=extend_schema(summary='Частично обновить заказ', description='PATCH: можно изменить любые поля, в т.ч. status. При статусе «Отменено» остатки возвращаются на склад.'),
     tags=['Заказы'],
 )
-class OrderViewSet(WorkshopFilterMixin, ModelViewSet):
+class OrderViewSet(IdempotencyMixin, WorkshopFilterMixin, ModelViewSet):
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-created_at', '-id')
+
     def get_queryset(self):
         qs = self.get_workshop_queryset(Order)
         item_id = self.request.query_params.get('item_id')
         if item_id:
             qs = qs.filter(line_items__item_id=item_id).distinct()
-        return qs.prefetch_related('line_items').order_by('-created_at')[:100]
+        qs = qs.prefetch_related('line_items').order_by(*self.keyset_ordering)
+        if self.action == 'list' and not self.paginator.is_requested(self.request):
+            # Без cursor/page_size — прежний ответ: последние 100 заказов списком
+            qs = qs[:100]
+        return qs
 
     def get_serializer_class(self):
         if self.action in ('list',):
@@ -246,7 +499,13 @@ class OrderViewSet(WorkshopFilterMixin, ModelViewSet):
             return OrderCreateSerializer
         return OrderDetailSerializer
 
+    def list(self, request, *args, **kwargs):
+        return _fast_list(self, ORDER_FIELDS, serialize_orders)
+
     def create(self, request, *args, **kwargs):
+        return self.idempotent(request, self._create)
+
+    def _create(self, request):
         serializer = OrderCreateSerializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
         order = serializer.save()
@@ -256,12 +515,11 @@ class OrderViewSet(WorkshopFilterMixin, ModelViewSet):
         )
 
     def perform_update(self, serializer):
-        instance = serializer.instance
-        old_status = instance.status
-        serializer.save()
-        instance.refresh_from_db()
-        if old_status != Order.STATUS_CANCELLED and instance.status == Order.STATUS_CANCELLED:
-            restore_order_stock(instance)
+        # Статус меняется отдельно — через тот же сервис, что и set-status (возврат остатков при отмене)
+        new_status = serializer.validated_data.pop('status', None)
+        instance = serializer.save()
+        if new_status is not None and set_orders_status(instance.workshop_id, [instance.pk], new_status):
+            instance.refresh_from_db()
 
     @extend_schema(
         summary='Сменить статус заказа',
@@ -274,11 +532,220 @@ class OrderViewSet(WorkshopFilterMixin, ModelViewSet):
         order = self.get_object()
         ser = OrderStatusSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
-        new_status = ser.validated_data['status']
-        old_status = order.status
-        order.status = new_status
-        order.save(update_fields=['status'])
-        order.refresh_from_db()
-        if old_status != Order.STATUS_CANCELLED and new_status == Order.STATUS_CANCELLED:
-            restore_order_stock(order)
+        if set_orders_status(order.workshop_id, [order.pk], ser.validated_data['status']):
+            order.refresh_from_db()
         return Response(OrderDetailSerializer(order).data)
+
+    @extend_schema(
+        summary='Сменить статус нескольких заказов',
+        description=(
+            f'Тело: {{"ids": [1, 2, ...], "status": "shipped"}}, не больше {ORDER_BULK_STATUS_LIMIT} id. '
+            'Статус меняется одним UPDATE; при отмене остатки всех заказов возвращаются одной транзакцией. '
+            'Повтор безопасен: уже отменённые заказы остатки второй раз не возвращают. '
+            'Ответ: updated — id изменённых заказов, unchanged — уже были в этом статусе, '
+            'not_found — нет в цехе пользователя.'
+        ),
+        request=OrderBulkStatusSerializer,
+        responses={200: dict},
+    )
+    @action(detail=False, methods=['post'], url_path='bulk-set-status')
+    def bulk_set_status(self, request):
+        ser = OrderBulkStatusSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(ser.validated_data['ids']))
+        workshop = self.get_workshop()
+        workshop_id = workshop.pk if workshop else None
+        updated = set_orders_status(workshop_id, ids, ser.validated_data['status'])
+        existing = set(Order.objects.filter(workshop_id=workshop_id, id__in=ids).values_list('id', flat=True))
+        changed = set(updated)
+        return Response({
+            'updated': updated,
+            'unchanged': [pk for pk in ids if pk in existing and pk not in changed],
+            'not_found': [pk for pk in ids if pk not in existing],
+        })
+
+
+@extend_schema(
+    summary='Потоковая выгрузка',
+    description=(
+        'GET /api/export/{dataset}.{format}: dataset — items (товары с размерами и остатками), '
+        'supplies (поставки по позициям), orders (заказы по позициям); format — ndjson или csv. '
+        'Только данные цеха пользователя. Query: date_from, date_to (дата или ISO дата-время).'
+    ),
+    parameters=[
+        OpenApiParameter('date_from', str, description='Начало периода (включительно)'),
+        OpenApiParameter('date_to', str, description='Конец периода; дата включает весь день'),
+    ],
+    responses={200: None},
+    tags=['Выгрузка'],
+)
+class ExportView(WorkshopFilterMixin, APIView):
+    def get(self, request, dataset, fmt):
+        if dataset not in DATASETS or fmt not in FORMATS:
+            return Response({'detail': 'Не найден'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            date_from = parse_bound(request.query_params.get('date_from'))
+            date_to = parse_bound(request.query_params.get('date_to'), end=True)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        names, rows = export_rows(dataset, self.get_workshop(), date_from, date_to)
+        response = StreamingHttpResponse(render(fmt, names, rows), content_type=FORMATS[fmt])
+        response['Content-Disposition'] = f'attachment; filename="{dataset}.{fmt}"'
+        return response
+
+
+@extend_schema(
+    summary='Импорт каталога',
+    description=(
+        'multipart: file — CSV или XLSX, одна строка = один размер товара. Колонки как в выгрузке items: '
+        'item_id (опц.), name, price, item_description, wb_url, ozon_url, size_label, quantity, barcode. '
+        'Товар ищется по item_id, иначе по названию, иначе создаётся; пустая ячейка не меняет значение. '
+        'Строки с ошибками пропускаются. Ответ: счётчики и errors: [{row, errors: {поле: текст}}]. dry_run — только проверка.'
+    ),
+    request={'multipart/form-data': CatalogImportSerializer},
+    responses={200: None},
+    tags=['Выгрузка'],
+)
+class CatalogImportView(WorkshopFilterMixin, APIView):
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request):
+        ser = CatalogImportSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        upload = ser.validated_data['file']
+        fmt = upload.name.rsplit('.', 1)[-1].lower() if '.' in upload.name else ''
+        try:
+            report = import_catalog(self.get_workshop(), upload.file, fmt, dry_run=ser.validated_data['dry_run'])
+        except ImportFileError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report)
+
+
+@extend_schema(
+    summary='Остатки на дату',
+    description=(
+        'Query: at — момент времени (ISO дата-время или дата = начало дня), item_id (опц.). '
+        'Считается от ближайшего среза остатков плюс движения после него. '
+        'Ответ: [{size_id, item_id, size_label, quantity}] — только ненулевые остатки.'
+    ),
+    parameters=[
+        OpenApiParameter('at', str, required=True, description='Момент времени'),
+        OpenApiParameter('item_id', str, description='Фильтр по товару'),
+    ],
+    tags=['Размеры и остатки'],
+)
+class StockAtView(WorkshopFilterMixin, APIView):
+    def get(self, request):
+        try:
+            at = parse_bound(request.query_params.get('at'))
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if at is None:
+            return Response({'at': ['Обязательный параметр']}, status=status.HTTP_400_BAD_REQUEST)
+        workshop = self.get_workshop()
+        item_id = request.query_params.get('item_id') or None
+        try:
+            balances = stock_at(workshop.pk if workshop else None, at, item_id=item_id)
+        except DjangoValidationError:
+            return Response({'item_id': ['Неверный id товара']}, status=status.HTTP_400_BAD_REQUEST)
+        sizes = SizeQuantity.objects.filter(id__in=balances.keys()).values_list('id', 'item_id', 'size_label')
+        return Response([
+            {'size_id': str(size_id), 'item_id': str(item_id), 'size_label': label, 'quantity': balances[size_id]}
+            for size_id, item_id, label in sizes.order_by('item_id', 'size_label')
+        ])
+
+
+@extend_schema(
+    summary='Дельта-синхронизация',
+    description=(
+        'Query: since — токен из предыдущего ответа. Без since — весь каталог цеха (items, sizes). '
+        'С since — только изменённые с тех пор items, sizes, supplies, orders и id удалённых (deleted). '
+        'Ответ всегда содержит новый token. reset=true — изменений слишком много или токен старше срока хранения журнала, нужна полная загрузка без since.'
+    ),
+    parameters=[OpenApiParameter('since', str, description='Токен предыдущей синхронизации')],
+    tags=['Синхронизация'],
+)
+class SyncView(WorkshopFilterMixin, APIView):
+    def get(self, request):
+        workshop = self.get_workshop()
+        try:
+            payload = build_sync_payload(workshop.pk if workshop else None, request.query_params.get('since'), request)
+        except ValueError as e:
+            return Response({'since': [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(payload)
+
+
+@extend_schema(
+    summary='Аналитика продаж и поставок',
+    description=(
+        'Суммы по дневным итогам за период: sold (заказано, шт.), cancelled (отменено), revenue '
+        '(выручка нетто), received (принято), shipped (отгружено). Query: date_from, date_to (YYYY-MM-DD, '
+        'включительно; по умолчанию — последние 30 дней), item_id, size_label, group_by — day | item | size, '
+        'metric — поле сортировки для item/size (топ по убыванию), limit — размер топа. '
+        'Ответ: {date_from, date_to, totals, rows} (rows — только при group_by).'
+    ),
+    parameters=[
+        OpenApiParameter('date_from', str, description='Первый день периода'),
+        OpenApiParameter('date_to', str, description='Последний день периода'),
+        OpenApiParameter('item_id', str, description='Фильтр по товару'),
+        OpenApiParameter('size_label', str, description='Фильтр по размеру'),
+        OpenApiParameter('group_by', str, enum=list(GROUPINGS), description='Группировка строк'),
+        OpenApiParameter('metric', str, enum=list(METRICS), description='Сортировка топа (по умолчанию sold)'),
+        OpenApiParameter('limit', int, description=f'Размер топа (по умолчанию 50, не больше {MAX_LIMIT})'),
+    ],
+    tags=['Аналитика'],
+)
+class SalesAnalyticsView(WorkshopFilterMixin, APIView):
+    def get(self, request):
+        params = request.query_params
+        errors = {}
+        date_from, date_to = default_period()
+        bounds = {}
+        for name, default in (('date_from', date_from), ('date_to', date_to)):
+            value = params.get(name)
+            bounds[name] = parse_date(value) if value else default
+            if bounds[name] is None:
+                errors[name] = [f'Неверная дата: {value}']
+        group_by = params.get('group_by') or None
+        if group_by is not None and group_by not in GROUPINGS:
+            errors['group_by'] = [f'Допустимо: {", ".join(GROUPINGS)}']
+        metric = params.get('metric') or 'sold'
+        if metric not in METRICS:
+            errors['metric'] = [f'Допустимо: {", ".join(METRICS)}']
+        limit = _limit_param(request, 50, MAX_LIMIT)
+        if limit is None:
+            errors['limit'] = [f'Целое число от 1 до {MAX_LIMIT}']
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        workshop = self.get_workshop()
+        try:
+            report = rollup_report(
+                workshop.pk if workshop else None,
+                bounds['date_from'],
+                bounds['date_to'],
+                item_id=params.get('item_id') or None,
+                size_label=params.get('size_label') or None,
+                group_by=group_by,
+                metric=metric,
+                limit=limit,
+            )
+        except DjangoValidationError:
+            return Response({'item_id': ['Неверный id товара']}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report)
+
+
+@extend_schema(
+    summary='Метрики',
+    description=(
+        'Только для staff. Счётчики и гистограммы запросов этого процесса в текстовом формате Prometheus: '
+        'число запросов по маршруту, методу и статусу, длительность, число и время SQL-запросов, размер ответов.'
+    ),
+    responses={(200, 'text/plain'): str},
+    tags=['Служебное'],
+)
+class MetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')